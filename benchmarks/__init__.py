@@ -0,0 +1,3 @@
+# -*- coding: utf-8 -*-
+
+"""Performance benchmarks for pokemon_trainer, see `make bench`."""
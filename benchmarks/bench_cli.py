@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+"""
+End to end latency of the pokemon-trainer cli.
+
+Every sample is a fresh `python` process with its own throwaway HOME, talking to a local PokeAPI
+stand-in serving the recorded responses under tests/resources, so results don't depend on the
+network or on the caches of whoever runs it:
+
+    import     python -c 'import pokemon_trainer.cli'
+    <cmd>.cold the command with an empty pokebase cache and no tab completion data
+    <cmd>.warm the command again once a cold run has filled the caches
+
+Results are written as json and compared with a stored baseline, failing when a benchmark gets
+slower than the baseline by more than the tolerance. The fastest sample is compared since it is
+the least affected by whatever else the machine is doing. Timings only compare on the machine
+that made them, so the baseline isn't committed: the first run stores its results as the
+baseline (benchmarks/baseline/cli.json, ignored by git), later runs compare with it:
+
+    python -m benchmarks.bench_cli                    # run and compare, or store the first baseline
+    python -m benchmarks.bench_cli --update-baseline  # run and store as the new baseline
+"""
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import click
+
+from tests.helpers.standin import PokeApiStandIn
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_PATH = os.path.join(ROOT, 'benchmarks', 'baseline', 'cli.json')
+RESULTS_VERSION = 1
+
+RUN_CLI = 'import sys; from pokemon_trainer.cli import main; sys.exit(main(prog_name="pokemon-trainer"))'
+IMPORT_CLI = 'import pokemon_trainer.cli'
+
+COMMANDS = {
+    'species': ['species', 'bulbasaur'],
+    'type': ['type', 'grass'],
+    'move': ['move', 'pound'],
+    'install_completion': ['install-completion'],
+}
+
+
+def _environment(home):
+    env = dict(os.environ)
+    env['HOME'] = home
+    env['XDG_CACHE_HOME'] = os.path.join(home, '.cache')
+    env['PYTHONPATH'] = os.pathsep.join([ROOT] + [p for p in [env.get('PYTHONPATH')] if p])
+    env.pop('POKEMON_TRAINER_API_URL', None)
+    return env
+
+
+def _run(args, home):
+    """Time one python process, returning seconds."""
+    started = time.perf_counter()
+    process = subprocess.run([sys.executable] + args, env=_environment(home), cwd=home,
+                             stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    elapsed = time.perf_counter() - started
+    if process.returncode != 0:
+        raise click.ClickException('{} failed:\n{}'.format(' '.join(args[2:]) or args[1],
+                                                           process.stderr.decode('utf8', 'replace')))
+    return elapsed
+
+
+def _summary(samples):
+    return {
+        'runs': len(samples),
+        'min': round(min(samples), 6),
+        'median': round(statistics.median(samples), 6),
+        'max': round(max(samples), 6),
+    }
+
+
+def measure(repeat, commands=None):
+    """
+    :param repeat: samples per benchmark
+    :param commands: names from COMMANDS to run, defaults to all
+    :return: dict of benchmark name to summary
+    """
+    commands = sorted(COMMANDS.keys()) if commands is None else commands
+    samples = {'import': []}
+    for name in commands:
+        samples[name + '.cold'] = []
+        samples[name + '.warm'] = []
+
+    with PokeApiStandIn() as stand_in:
+        for _ in range(repeat):
+            home = tempfile.mkdtemp(prefix='pokemon-trainer-bench-')
+            try:
+                samples['import'].append(_run(['-c', IMPORT_CLI], home))
+            finally:
+                shutil.rmtree(home, ignore_errors=True)
+
+            for name in commands:
+                args = ['-c', RUN_CLI, '--api-url', stand_in.base_url] + COMMANDS[name]
+                home = tempfile.mkdtemp(prefix='pokemon-trainer-bench-')
+                try:
+                    samples[name + '.cold'].append(_run(args, home))
+                    samples[name + '.warm'].append(_run(args, home))
+                finally:
+                    shutil.rmtree(home, ignore_errors=True)
+
+    return {name: _summary(values) for name, values in samples.items()}
+
+
+def compare(results, baseline, tolerance, min_delta):
+    """
+    :return: list of (name, baseline min, min, regressed) for benchmarks in both
+    """
+    rows = []
+    for name in sorted(results.keys()):
+        if name not in baseline:
+            continue
+        before = baseline[name]['min']
+        after = results[name]['min']
+        regressed = after > before * (1 + tolerance) and after - before > min_delta
+        rows.append((name, before, after, regressed))
+    return rows
+
+
+@click.command()
+@click.option('--repeat', default=5, show_default=True, help='Samples per benchmark.')
+@click.option('--command', 'commands', multiple=True, type=click.Choice(sorted(COMMANDS.keys())),
+              help='Only benchmark these commands (repeatable). Defaults to all of them.')
+@click.option('--output', type=click.Path(dir_okay=False, writable=True),
+              help='Write the results json here as well as printing a summary.')
+@click.option('--baseline', type=click.Path(dir_okay=False), default=BASELINE_PATH, show_default=True)
+@click.option('--update-baseline', is_flag=True, default=False, help='Store the results as the new baseline.')
+@click.option('--tolerance', default=0.25, show_default=True,
+              help='Allowed slow down relative to the baseline, 0.25 is 25%.')
+@click.option('--min-delta', default=0.02, show_default=True,
+              help='Ignore slow downs smaller than this many seconds, they are noise.')
+def main(repeat, commands, output, baseline, update_baseline, tolerance, min_delta):
+    results = {
+        'version': RESULTS_VERSION,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'results': measure(repeat, list(commands) or None),
+    }
+
+    document = json.dumps(results, indent=2, sort_keys=True)
+    if output is not None:
+        with open(output, 'w') as f:
+            f.write(document + '\n')
+
+    if not update_baseline and not os.path.exists(baseline):
+        click.echo('no baseline at {}, storing these results as the baseline'.format(baseline))
+        update_baseline = True
+
+    if update_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(baseline)), exist_ok=True)
+        with open(baseline, 'w') as f:
+            f.write(document + '\n')
+        click.echo('baseline written to {}'.format(baseline))
+
+    stored = {}
+    if os.path.exists(baseline):
+        with open(baseline) as f:
+            stored = json.load(f)['results']
+
+    regressions = 0
+    click.echo('{:<28} {:>10} {:>10} {:>8}'.format('benchmark', 'baseline', 'min', 'change'))
+    rows = {name: (before, after, regressed) for name, before, after, regressed in
+            compare(results['results'], stored, tolerance, min_delta)}
+    for name in sorted(results['results'].keys()):
+        fastest = results['results'][name]['min']
+        if name in rows:
+            before, _, regressed = rows[name]
+            change = '{:+.0%}'.format((fastest - before) / before) if before > 0 else 'n/a'
+            flag = '  REGRESSION' if regressed else ''
+            regressions += 1 if regressed else 0
+            click.echo('{:<28} {:>9.3f}s {:>9.3f}s {:>8}{}'.format(name, before, fastest, change, flag))
+        else:
+            click.echo('{:<28} {:>10} {:>9.3f}s {:>8}'.format(name, '-', fastest, '-'))
+
+    if regressions > 0:
+        raise click.ClickException('{} benchmark(s) regressed against {}'.format(regressions, baseline))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+"""
+Memory held per loaded object, measured with tracemalloc and checked against a budget.
+
+Objects are built the way a roster load builds them: every Type carries its own relation Types
+(like Type.search), every Species its own Types and every Pokemon its own Species and a four
+move MoveSet whose moves carry their own Types. Each kind is built --count times and the memory
+still held afterwards is divided by the count:
+
+    type     a Type and its damage relations
+    species  a dual typed Species with its EV yield
+    pokemon  a Pokemon with its Species, EVs, stats and MoveSet
+    member   a Pokemon with its EVs, stats and MoveSet, sharing its Species and moves with the
+             others the way a roster loaded through one WarmCache does
+    team     a Team of six members shared with the others
+
+The command fails when any of them is over its budget, so a change that makes objects bigger
+shows up in `make bench-memory`:
+
+    python -m benchmarks.bench_memory
+    python -m benchmarks.bench_memory --count 2000 --output memory.json
+"""
+import gc
+import itertools
+import json
+import platform
+import tracemalloc
+
+import click
+
+from benchmarks import fixtures
+from pokemon_trainer.pokemon.moves import DamageClass, Move, MoveSet
+from pokemon_trainer.pokemon.pokedex import Pokemon, Species, StatSet
+from pokemon_trainer.pokemon.teams import Team
+from pokemon_trainer.pokemon.versions import Generation
+
+RESULTS_VERSION = 1
+
+# Bytes per object, about 15% over what they use today. Every relation Type has a TypeCoverage
+# of its own, twelve lists, so a Type is around 26 KiB.
+BUDGETS = {
+    'type': 30 * 1024,
+    'species': 60 * 1024,
+    'pokemon': 180 * 1024,
+    'member': 576,
+    'team': 320,
+}
+
+DUAL_TYPES = list(itertools.combinations(fixtures.TYPE_NAMES, 2))
+
+
+def make_species(i):
+    first, second = DUAL_TYPES[i % len(DUAL_TYPES)]
+    return Species(i + 1, 'species-%d' % (i + 1), types=[fixtures.make_type(first), fixtures.make_type(second)],
+                   evs=StatSet(attack=1, speed=1))
+
+
+def make_move(i):
+    name = fixtures.TYPE_NAMES[i % len(fixtures.TYPE_NAMES)]
+    return Move(i + 1, '%s-move-%d' % (name, i + 1), DamageClass.physical, fixtures.make_type(name),
+                Generation.generation_i, power=90, accuracy=100, pp=15)
+
+
+def make_pokemon(i):
+    move_set = MoveSet(*[make_move(i * 4 + j) for j in range(4)])
+    return Pokemon(i + 1, make_species(i), evs=StatSet(hp=4, attack=252, speed=252),
+                   stats=StatSet(hp=45, attack=49, defense=49, special_attack=65, special_defense=65, speed=45),
+                   move_set=move_set)
+
+
+def make_type(i):
+    return fixtures.make_type(fixtures.TYPE_NAMES[i % len(fixtures.TYPE_NAMES)])
+
+
+_SHARED = {}  # built by the warm up call, outside the measurement
+
+
+def make_member(i):
+    if 'species' not in _SHARED:
+        _SHARED['species'] = make_species(0)
+        _SHARED['moves'] = [make_move(j) for j in range(4)]
+    return Pokemon(i + 1, _SHARED['species'], evs=StatSet(hp=4, attack=252, speed=252),
+                   stats=StatSet(hp=45, attack=49, defense=49, special_attack=65, special_defense=65, speed=45),
+                   move_set=MoveSet(*_SHARED['moves']))
+
+
+def make_team(i):
+    if 'members' not in _SHARED:
+        _SHARED['members'] = [make_member(j) for j in range(6)]
+    return Team(i + 1, 'team-%d' % (i + 1), *_SHARED['members'])
+
+
+FACTORIES = {
+    'type': make_type,
+    'species': make_species,
+    'pokemon': make_pokemon,
+    'member': make_member,
+    'team': make_team,
+}
+
+
+def bytes_per_object(factory, count):
+    """Memory still held by `count` objects from `factory`, divided by `count`."""
+    factory(0)  # warm up caches, interned strings and the like
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before, _ = tracemalloc.get_traced_memory()
+        objects = [factory(i) for i in range(count)]
+        gc.collect()
+        after, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del objects
+    # The list holding the objects isn't part of them.
+    return (after - before - 8 * count) / float(count)
+
+
+def measure(count, kinds=None):
+    """
+    :return: dict of kind to {'bytes', 'budget'}
+    """
+    kinds = sorted(FACTORIES.keys()) if kinds is None else kinds
+    return {kind: {'bytes': int(round(bytes_per_object(FACTORIES[kind], count))), 'budget': BUDGETS[kind]}
+            for kind in kinds}
+
+
+@click.command()
+@click.option('--count', default=500, show_default=True, help='Objects of each kind to build.')
+@click.option('--kind', 'kinds', multiple=True, type=click.Choice(sorted(FACTORIES.keys())),
+              help='Only measure these kinds (repeatable). Defaults to all of them.')
+@click.option('--output', type=click.Path(dir_okay=False, writable=True), help='Also write the results json here.')
+def main(count, kinds, output):
+    results = measure(count, list(kinds) or None)
+
+    if output is not None:
+        document = {
+            'version': RESULTS_VERSION,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'results': results,
+        }
+        with open(output, 'w') as f:
+            f.write(json.dumps(document, indent=2, sort_keys=True) + '\n')
+
+    over = 0
+    click.echo('{:<12} {:>12} {:>12}'.format('object', 'bytes', 'budget'))
+    for kind in sorted(results.keys()):
+        size, budget = results[kind]['bytes'], results[kind]['budget']
+        flag = '  OVER BUDGET' if size > budget else ''
+        over += 1 if size > budget else 0
+        click.echo('{:<12} {:>12,} {:>12,}{}'.format(kind, size, budget, flag))
+
+    if over > 0:
+        raise click.ClickException('{} object(s) over their memory budget'.format(over))
+
+
+if __name__ == '__main__':
+    main()
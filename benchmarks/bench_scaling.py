@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+"""
+How roster operations scale with the size of the roster, to find the paths that grow faster than
+the roster does.
+
+For each size N a roster of N Pokemon and N/6 teams is generated (benchmarks.roster_generator),
+with Species.search and Move.search answered from a LocalCorpus so pokebase isn't involved, and
+these are timed:
+
+    parse      yaml.safe_load of the roster as cli.save writes it
+    from_dict  Roster.from_dict of the parsed data
+    save       cli.save to a file
+    analysis   the effective type coverage of every team
+    remove     Roster.remove_pokemon of 100 Pokemon, each emptying the team positions it holds
+
+The table shows seconds per size and the growth exponent k between sizes (time ~ N^k): about 1 is
+linear, 2 quadratic. Once a timing passes --max-seconds the larger sizes of that operation are
+skipped and shown as an estimate from the last exponent:
+
+    python -m benchmarks.bench_scaling
+    python -m benchmarks.bench_scaling --size 10 --size 1000 --size 100000 --plot
+"""
+import copy
+import json
+import math
+import os
+import platform
+import shutil
+import tempfile
+import time
+
+import click
+import yaml
+
+from benchmarks.roster_generator import LocalCorpus, generate
+from pokemon_trainer import cli
+from pokemon_trainer.pokemon.teams import Roster
+
+RESULTS_VERSION = 1
+SIZES = [10, 100, 1000, 10000, 100000]
+OPERATIONS = ['parse', 'from_dict', 'save', 'analysis', 'remove']
+REMOVALS = 100
+SUPER_LINEAR = 1.3
+
+
+def _timed(func):
+    started = time.perf_counter()
+    result = func()
+    return time.perf_counter() - started, result
+
+
+def measure_size(size, corpus, directory, operations):
+    """
+    :return: dict of operation to seconds for a roster of `size` Pokemon
+    """
+    data = generate(size, max(1, size // 6), corpus, seed=size)
+
+    timings = {}
+    if 'parse' in operations:
+        text = yaml.dump(data)
+        timings['parse'], _ = _timed(lambda: yaml.safe_load(text))
+
+    # Roster.from_dict consumes the dicts it is given, so every use gets a fresh copy.
+    roster = None
+    if operations & {'from_dict', 'save', 'analysis', 'remove'}:
+        seconds, roster = _timed(lambda: Roster.from_dict(copy.deepcopy(data)))
+        if 'from_dict' in operations:
+            timings['from_dict'] = seconds
+
+    if 'save' in operations:
+        timings['save'], _ = _timed(lambda: cli.save(roster, os.path.join(directory, 'saved-%d.yml' % size)))
+
+    if 'analysis' in operations:
+        timings['analysis'], _ = _timed(
+            lambda: [team.type_coverage().effective_coverage() for team in roster.teams.values()])
+
+    if 'remove' in operations:
+        # Rosters smaller than REMOVALS are scaled up as if they had REMOVALS Pokemon to remove.
+        victims = [roster.get_pokemon(i) for i in range(1, min(REMOVALS, size) + 1)]
+        seconds, _ = _timed(lambda: [roster.remove_pokemon(p) for p in victims])
+        timings['remove'] = seconds * REMOVALS / len(victims)
+
+    return timings
+
+
+def exponent(small, large, small_size, large_size):
+    if small is None or large is None or small <= 0 or large <= 0:
+        return None
+    return math.log(large / small) / math.log(float(large_size) / small_size)
+
+
+def measure(sizes, operations, max_seconds):
+    """
+    :return: {operation: {size: {'seconds': s, 'estimated': bool}}}
+    """
+    corpus = LocalCorpus()
+    results = {op: {} for op in operations}
+    directory = tempfile.mkdtemp(prefix='pokemon-trainer-scaling-')
+    try:
+        with corpus.installed():
+            for i, size in enumerate(sizes):
+                pending = set()
+                for op in operations:
+                    previous = [s for s in sizes[:i] if s in results[op]]
+                    if len(previous) > 0 and results[op][previous[-1]]['seconds'] > max_seconds:
+                        results[op][size] = _estimate(results[op], previous, size)
+                    else:
+                        pending.add(op)
+                if len(pending) > 0:
+                    for op, seconds in measure_size(size, corpus, directory, pending).items():
+                        results[op][size] = {'seconds': seconds, 'estimated': False}
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    return results
+
+
+def _estimate(timings, previous, size):
+    last = previous[-1]
+    k = exponent(timings[previous[-2]]['seconds'], timings[last]['seconds'], previous[-2], last) \
+        if len(previous) > 1 else 1.0
+    k = 1.0 if k is None else k
+    return {'seconds': timings[last]['seconds'] * (float(size) / last) ** k, 'estimated': True}
+
+
+def format_table(results, sizes):
+    lines = ['{:<10} '.format('operation') + ' '.join(['{:>11}'.format(s) for s in sizes]) + '   growth']
+    for op, timings in results.items():
+        cells = []
+        for size in sizes:
+            timing = timings.get(size)
+            if timing is None:
+                cells.append('{:>11}'.format('-'))
+            else:
+                cells.append('{:>10.4f}{}'.format(timing['seconds'], '~' if timing['estimated'] else 's'))
+        measured = [s for s in sizes if s in timings and not timings[s]['estimated']]
+        exponents = [exponent(timings[a]['seconds'], timings[b]['seconds'], a, b)
+                     for a, b in zip(measured, measured[1:])]
+        growth = ' '.join(['k=%.2f' % k for k in exponents if k is not None])
+        worst = max([k for k in exponents if k is not None] or [0])
+        flag = '  SUPER-LINEAR' if worst > SUPER_LINEAR else ''
+        lines.append('{:<10} '.format(op) + ' '.join(cells) + '   ' + growth + flag)
+    lines.append('(~ estimated, the previous size took longer than --max-seconds)')
+    return '\n'.join(lines)
+
+
+def format_plot(results, sizes, width=50):
+    """Log scale bars of the time for each operation and size."""
+    values = [t['seconds'] for timings in results.values() for t in timings.values() if t['seconds'] > 0]
+    if len(values) == 0:
+        return ''
+    low, high = math.log10(min(values)), math.log10(max(values))
+    span = max(high - low, 1e-9)
+    lines = ['log10 seconds from %.1f to %.1f' % (low, high)]
+    for op, timings in results.items():
+        lines.append(op)
+        for size in sizes:
+            if size not in timings:
+                continue
+            seconds = timings[size]['seconds']
+            bar = 1 + int(round((math.log10(seconds) - low) / span * (width - 1))) if seconds > 0 else 0
+            char = '~' if timings[size]['estimated'] else '#'
+            lines.append('  {:>7} |{:<{width}}| {:.4f}s'.format(size, char * bar, seconds, width=width))
+    return '\n'.join(lines)
+
+
+@click.command()
+@click.option('--size', 'sizes', type=int, multiple=True,
+              help='Roster sizes in Pokemon (repeatable). Defaults to {}.'.format(', '.join(map(str, SIZES))))
+@click.option('--operation', 'operations', multiple=True, type=click.Choice(OPERATIONS),
+              help='Only time these operations (repeatable). Defaults to all of them.')
+@click.option('--max-seconds', default=30.0, show_default=True,
+              help='Estimate the larger sizes of an operation once one of its timings goes over this.')
+@click.option('--plot', is_flag=True, default=False, help='Also draw an ascii plot of the timings.')
+@click.option('--output', type=click.Path(dir_okay=False, writable=True), help='Also write the results json here.')
+def main(sizes, operations, max_seconds, plot, output):
+    sizes = sorted(sizes) if len(sizes) > 0 else SIZES
+    operations = [op for op in OPERATIONS if op in operations] if len(operations) > 0 else OPERATIONS
+    results = measure(sizes, operations, max_seconds)
+
+    if output is not None:
+        document = {
+            'version': RESULTS_VERSION,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'results': {op: {str(size): timing for size, timing in timings.items()}
+                        for op, timings in results.items()},
+        }
+        with open(output, 'w') as f:
+            f.write(json.dumps(document, indent=2, sort_keys=True) + '\n')
+
+    click.echo(format_table(results, sizes))
+    if plot:
+        click.echo()
+        click.echo(format_plot(results, sizes))
+
+
+if __name__ == '__main__':
+    main()
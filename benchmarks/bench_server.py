@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+"""
+Throughput and latency of `pokemon-trainer serve` under concurrent clients.
+
+The server runs in this process with pokebase pointed at a local PokeAPI stand-in serving the
+recorded responses under tests/resources, with a throwaway pokebase cache, optionally with
+latency injected into the stand-in. Each client thread keeps one connection open and requests
+the paths below round robin for --seconds, after one request of each path warms the cache:
+
+    python -m benchmarks.bench_server
+    python -m benchmarks.bench_server --clients 32 --workers 8 --latency 0.05
+
+Prints requests per second and the p50/p90/p99 latency per path as seen by the clients.
+"""
+import asyncio
+import http.client
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+import click
+from pokebase import api
+
+from pokemon_trainer import metrics
+from pokemon_trainer.server import HISTOGRAM_LIMIT, Server
+from tests.helpers.standin import Faults, PokeApiStandIn
+
+PATHS = [
+    '/species/bulbasaur',
+    '/types/grass',
+    '/moves/pound',
+    '/coverage?species=bulbasaur&move=pound',
+    '/matchup?species=bulbasaur&type=grass&move=pound',
+    '/metrics',
+]
+
+
+def _get(connection, path, errors):
+    """:return: seconds the request took"""
+    started = time.perf_counter()
+    connection.request('GET', path)
+    response = connection.getresponse()
+    response.read()
+    if response.status != 200:
+        errors.append((path, response.status))
+    return time.perf_counter() - started
+
+
+def _client(port, paths, deadline, latencies, errors):
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+    i = 0
+    try:
+        while time.perf_counter() < deadline:
+            path = paths[i % len(paths)]
+            i += 1
+            latencies[path].append(_get(connection, path, errors))
+    finally:
+        connection.close()
+
+
+def measure(clients, workers, seconds, latency=0.0):
+    """
+    :return: (requests per second, dict of path to latencies, list of (path, status) errors)
+    """
+    cache = api.CACHE
+    directory = tempfile.mkdtemp(prefix='pokemon-trainer-bench-server-')
+    loop = asyncio.new_event_loop()
+    with PokeApiStandIn(faults=Faults(latency=latency)) as stand_in:
+        stand_in.use()
+        api.set_cache(os.path.join(directory, 'cache'))
+        server = Server(os.path.join(directory, 'roster.yml'), port=0, workers=workers)
+        loop.run_until_complete(server.start())
+        thread = threading.Thread(target=loop.run_forever, daemon=True)
+        thread.start()
+        try:
+            errors = []
+            connection = http.client.HTTPConnection('127.0.0.1', server.port, timeout=60)
+            for path in PATHS:  # warm the cache before timing
+                _get(connection, path, errors)
+            connection.close()
+            latencies = {path: [] for path in PATHS}
+
+            deadline = time.perf_counter() + seconds
+            # each client starts at a different path so the paths are requested concurrently
+            threads = [threading.Thread(target=_client, args=(server.port, PATHS[i % len(PATHS):] + PATHS[:i % len(PATHS)],
+                                                              deadline, latencies, errors))
+                       for i in range(clients)]
+            started = time.perf_counter()
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            elapsed = time.perf_counter() - started
+        finally:
+            loop.call_soon_threadsafe(server.close)
+            asyncio.run_coroutine_threadsafe(server.wait_closed(), loop).result(10)
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join()
+            loop.close()
+            api.set_cache(cache)
+            shutil.rmtree(directory, ignore_errors=True)
+    return sum([len(v) for v in latencies.values()]) / elapsed, latencies, errors
+
+
+@click.command(help=__doc__)
+@click.option('--clients', default=16, show_default=True, help='Concurrent client connections.')
+@click.option('--workers', default=4, show_default=True, help='Server worker threads.')
+@click.option('--seconds', default=5.0, show_default=True, help='How long to drive the server.')
+@click.option('--latency', default=0.0, show_default=True, help='Seconds of latency the stand-in adds.')
+def main(clients, workers, seconds, latency):
+    metrics.REGISTRY.histogram_limit = HISTOGRAM_LIMIT
+    rate, latencies, errors = measure(clients, workers, seconds, latency)
+    click.echo('{} clients, {} workers: {:.0f} requests/s'.format(clients, workers, rate))
+    click.echo('{:<50} {:>8} {:>10} {:>10} {:>10}'.format('path', 'requests', 'p50 ms', 'p90 ms', 'p99 ms'))
+    for path, values in latencies.items():
+        click.echo('{:<50} {:>8} {:>10.2f} {:>10.2f} {:>10.2f}'.format(
+            path, len(values), *[1000 * (metrics.percentile(values, p) or 0) for p in (50, 90, 99)]))
+    if len(errors) > 0:
+        raise click.ClickException('{} requests failed, the first {} {}'.format(len(errors), *errors[0]))
+
+
+if __name__ == '__main__':
+    main()
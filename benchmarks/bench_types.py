@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+"""
+Microbenchmarks for the TypeCoverage arithmetic behind all team analysis: `+=`, `-`, `unique`,
+`overlap`, `effective_coverage` and `damage_effectiveness_from_type`, applied to single types,
+dual types, movesets, full teams and batches of teams.
+
+Everything is built from the synthetic type chart in benchmarks.fixtures so no network or cache
+is needed. For every benchmark the throughput (best of --repeat timing runs, each at least
+--min-time seconds long) and the memory of a single operation, traced with tracemalloc, are
+reported: `peak` is the most memory held above the starting point during the operation and
+`retained` what is still allocated once its result is dropped.
+
+    python -m benchmarks.bench_types
+    python -m benchmarks.bench_types --filter effective --output types.json
+"""
+import gc
+import json
+import platform
+import time
+import tracemalloc
+
+import click
+
+from benchmarks import fixtures
+from pokemon_trainer.pokemon.types import TypeCoverage
+
+RESULTS_VERSION = 1
+
+
+def benchmarks(batch_size):
+    """
+    :param batch_size: number of teams in the batch benchmarks
+    :return: list of (name, callable) pairs in reporting order
+    """
+    chart = fixtures.type_chart()
+    moves = fixtures.move_list(chart)
+    single = chart['fire'].type_coverage()
+    dual = chart['fire'].type_coverage() + chart['flying'].type_coverage()
+    move_set = fixtures.move_set(moves).type_coverage()
+    team = fixtures.team(chart)
+    team_coverage = team.type_coverage()
+    member = team.get_position(1).type_coverage()
+    batch = fixtures.teams(chart, batch_size)
+    attackers = [chart[name] for name in fixtures.TYPE_NAMES]
+
+    def iadd(coverages):
+        def run():
+            coverage = TypeCoverage()
+            for c in coverages:
+                coverage += c
+            return coverage
+        return run
+
+    def damage_effectiveness(coverage):
+        def run():
+            return [coverage.damage_effectiveness_from_type(t) for t in attackers]
+        return run
+
+    def batch_coverage():
+        return [t.type_coverage().effective_coverage() for t in batch]
+
+    return [
+        ('iadd.single', iadd([single])),
+        ('iadd.dual', iadd([single, chart['flying'].type_coverage()])),
+        ('iadd.moveset', iadd([m.type_coverage() for m in fixtures.move_set(moves).moves()])),
+        ('iadd.team', iadd([p.type_coverage() for p in team.team()])),
+        ('sub.dual', lambda: dual - single),
+        ('sub.team', lambda: team_coverage - member),
+        ('unique.dual', dual.unique),
+        ('unique.team', team_coverage.unique),
+        ('overlap.dual', dual.overlap),
+        ('overlap.team', team_coverage.overlap),
+        ('damage_effectiveness.single', damage_effectiveness(single)),
+        ('damage_effectiveness.dual', damage_effectiveness(dual)),
+        ('effective_coverage.single', single.effective_coverage),
+        ('effective_coverage.dual', dual.effective_coverage),
+        ('effective_coverage.moveset', move_set.effective_coverage),
+        ('effective_coverage.team', team_coverage.effective_coverage),
+        ('team.type_coverage', team.type_coverage),
+        ('team.effective_coverage', lambda: team.type_coverage().effective_coverage()),
+        ('batch.%d.effective_coverage' % batch_size, batch_coverage),
+    ]
+
+
+def _time(func, min_time, repeat):
+    """Best ops/sec over `repeat` runs of at least `min_time` seconds each."""
+    loops = 1
+    while True:
+        elapsed = _timed_loops(func, loops)
+        if elapsed >= min_time:
+            break
+        loops *= 2 if elapsed <= 0 else max(2, min(10, int(min_time / elapsed) + 1))
+
+    best = elapsed
+    for _ in range(repeat - 1):
+        best = min(best, _timed_loops(func, loops))
+    return loops / best if best > 0 else float('inf')
+
+
+def _timed_loops(func, loops):
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        started = time.perf_counter()
+        for _ in range(loops):
+            func()
+        return time.perf_counter() - started
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+
+def _memory(func):
+    """(peak, retained) bytes allocated by a single call, measured with tracemalloc."""
+    func()  # warm up any lazily built state so it isn't charged to the operation
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        result = func()
+        _, peak = tracemalloc.get_traced_memory()
+        del result
+        gc.collect()
+        after, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak - before, max(0, after - before)
+
+
+def measure(min_time, repeat, batch_size, patterns=None):
+    """
+    :param patterns: only run benchmarks whose name contains one of these, defaults to all
+    :return: dict of benchmark name to {'ops_per_sec', 'peak_bytes', 'retained_bytes'}
+    """
+    results = {}
+    for name, func in benchmarks(batch_size):
+        if patterns and not any(p in name for p in patterns):
+            continue
+        peak, retained = _memory(func)
+        results[name] = {
+            'ops_per_sec': round(_time(func, min_time, repeat), 2),
+            'peak_bytes': peak,
+            'retained_bytes': retained,
+        }
+    return results
+
+
+@click.command()
+@click.option('--filter', 'patterns', multiple=True,
+              help='Only run benchmarks whose name contains this (repeatable).')
+@click.option('--min-time', default=0.2, show_default=True, help='Minimum seconds per timing run.')
+@click.option('--repeat', default=3, show_default=True, help='Timing runs per benchmark, the best is kept.')
+@click.option('--batch-size', default=1000, show_default=True, help='Number of teams in the batch benchmark.')
+@click.option('--output', type=click.Path(dir_okay=False, writable=True), help='Also write the results json here.')
+def main(patterns, min_time, repeat, batch_size, output):
+    results = measure(min_time, repeat, batch_size, list(patterns))
+
+    if output is not None:
+        document = {
+            'version': RESULTS_VERSION,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'results': results,
+        }
+        with open(output, 'w') as f:
+            f.write(json.dumps(document, indent=2, sort_keys=True) + '\n')
+
+    click.echo('{:<36} {:>12} {:>12} {:>12} {:>12}'.format('benchmark', 'ops/sec', 'usec/op', 'peak KiB',
+                                                           'retained KiB'))
+    for name, result in results.items():
+        ops = result['ops_per_sec']
+        click.echo('{:<36} {:>12,.1f} {:>12.2f} {:>12.1f} {:>12.1f}'.format(
+            name, ops, 1e6 / ops if ops > 0 else 0, result['peak_bytes'] / 1024, result['retained_bytes'] / 1024))
+
+
+if __name__ == '__main__':
+    main()
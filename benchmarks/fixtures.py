@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""
+Synthetic domain objects for benchmarks that must not touch the network: the full 18 type chart
+built as Type objects, plus species, moves, Pokemon and teams assembled from it.
+"""
+import itertools
+
+from pokemon_trainer.pokemon.moves import DamageClass, Move, MoveSet
+from pokemon_trainer.pokemon.pokedex import Pokemon, Species, StatSet
+from pokemon_trainer.pokemon.teams import Team
+from pokemon_trainer.pokemon.types import DamageRelation, Type
+from pokemon_trainer.pokemon.versions import Generation
+
+TYPE_NAMES = ['normal', 'fighting', 'flying', 'poison', 'ground', 'rock', 'bug', 'ghost', 'steel', 'fire', 'water',
+              'grass', 'electric', 'psychic', 'ice', 'dragon', 'dark', 'fairy']
+
+# attacking type -> (double damage to, half damage to, no damage to)
+TYPE_CHART = {
+    'normal': ([], ['rock', 'steel'], ['ghost']),
+    'fighting': (['normal', 'rock', 'steel', 'ice', 'dark'], ['flying', 'poison', 'bug', 'psychic', 'fairy'],
+                 ['ghost']),
+    'flying': (['fighting', 'bug', 'grass'], ['rock', 'steel', 'electric'], []),
+    'poison': (['grass', 'fairy'], ['poison', 'ground', 'rock', 'ghost'], ['steel']),
+    'ground': (['poison', 'rock', 'steel', 'fire', 'electric'], ['bug', 'grass'], ['flying']),
+    'rock': (['flying', 'bug', 'fire', 'ice'], ['fighting', 'ground', 'steel'], []),
+    'bug': (['grass', 'psychic', 'dark'], ['fighting', 'flying', 'poison', 'ghost', 'steel', 'fire', 'fairy'], []),
+    'ghost': (['ghost', 'psychic'], ['dark'], ['normal']),
+    'steel': (['rock', 'ice', 'fairy'], ['steel', 'fire', 'water', 'electric'], []),
+    'fire': (['bug', 'steel', 'grass', 'ice'], ['rock', 'fire', 'water', 'dragon'], []),
+    'water': (['ground', 'rock', 'fire'], ['water', 'grass', 'dragon'], []),
+    'grass': (['ground', 'rock', 'water'], ['flying', 'poison', 'bug', 'steel', 'fire', 'grass', 'dragon'], []),
+    'electric': (['flying', 'water'], ['grass', 'electric', 'dragon'], ['ground']),
+    'psychic': (['fighting', 'poison'], ['steel', 'psychic'], ['dark']),
+    'ice': (['flying', 'ground', 'grass', 'dragon'], ['steel', 'fire', 'water', 'ice'], []),
+    'dragon': (['dragon'], ['steel'], ['fairy']),
+    'dark': (['ghost', 'psychic'], ['fighting', 'dark', 'fairy'], []),
+    'fairy': (['fighting', 'dragon', 'dark'], ['poison', 'steel', 'fire'], []),
+}
+
+
+RELATIONS = [
+    (DamageRelation.DOUBLE_DAMAGE_TO, DamageRelation.DOUBLE_DAMAGE_FROM),
+    (DamageRelation.HALF_DAMAGE_TO, DamageRelation.HALF_DAMAGE_FROM),
+    (DamageRelation.NO_DAMAGE_TO, DamageRelation.NO_DAMAGE_FROM),
+]
+
+
+def type_id(name):
+    return TYPE_NAMES.index(name) + 1
+
+
+def make_type(name):
+    """
+    A new Type with its own relation Types, built the same way Type.search builds one.
+    """
+    type_ = Type(type_id(name), name)
+    for (to, from_), defenders in zip(RELATIONS, TYPE_CHART[name]):
+        for defender in defenders:
+            type_.set_damage_relation(to, Type(type_id(defender), defender))
+    for attacker, attacker_defenders in TYPE_CHART.items():
+        for (to, from_), defenders in zip(RELATIONS, attacker_defenders):
+            if name in defenders:
+                type_.set_damage_relation(from_, Type(type_id(attacker), attacker))
+    return type_
+
+
+def type_chart():
+    """
+    :return: dict of type name to a Type with every damage relation set, like Type.search returns
+    """
+    return {name: make_type(name) for name in TYPE_NAMES}
+
+
+def species_list(chart, count):
+    """`count` species cycling through every single and dual typing."""
+    typings = [[t] for t in TYPE_NAMES] + [list(pair) for pair in itertools.combinations(TYPE_NAMES, 2)]
+    species = []
+    for i in range(count):
+        typing = typings[i % len(typings)]
+        species.append(Species(i + 1, 'species-%d' % (i + 1), types=[chart[t] for t in typing],
+                               evs=StatSet(hp=1 + i % 3)))
+    return species
+
+
+def move_list(chart):
+    """One damaging move per type."""
+    return [Move(i + 1, '%s-move' % name, DamageClass.physical if i % 2 else DamageClass.special, chart[name],
+                 Generation.generation_i, power=90, accuracy=100, pp=15)
+            for i, name in enumerate(TYPE_NAMES)]
+
+
+def move_set(moves, offset=0):
+    return MoveSet(*[moves[(offset + i * 5) % len(moves)] for i in range(4)])
+
+
+def team(chart, team_id=1, offset=0):
+    """A full team of six dual typed Pokemon with four moves each."""
+    species = species_list(chart, offset + 6 + len(TYPE_NAMES))[-6:]
+    moves = move_list(chart)
+    members = [Pokemon(offset + i + 1, s, move_set=move_set(moves, offset + i)) for i, s in enumerate(species)]
+    return Team(team_id, 'team-%d' % team_id, *members)
+
+
+def teams(chart, count):
+    return [team(chart, i + 1, i) for i in range(count)]
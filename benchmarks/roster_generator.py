@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+"""
+Generate valid roster files of any size: N Pokemon with EVs, stats, items and movesets, and M
+teams of them, in the format `pokemon-trainer -f` loads.
+
+Species and moves come from a LocalCorpus of synthetic Species and Moves (ids 1-151 and 1-165 by
+default, the first generation's), which can also stand in for Species.search and Move.search so
+huge rosters load without pokebase:
+
+    python -m benchmarks.roster_generator --pokemon 10000 --teams 1500 --output roster.yml
+"""
+import random
+from contextlib import contextmanager
+
+import click
+import yaml
+
+from benchmarks import fixtures
+from pokemon_trainer.ev_trainer import EV_ITEMS
+from pokemon_trainer.pokemon.moves import DamageClass, Move
+from pokemon_trainer.pokemon.pokedex import Species, StatSet
+from pokemon_trainer.pokemon.teams import TeamPosition
+from pokemon_trainer.pokemon.versions import Generation
+
+
+class LocalCorpus(object):
+    """Synthetic Species and Moves by id and name, built on the benchmark type chart."""
+
+    def __init__(self, species_count=151, move_count=165):
+        chart = fixtures.type_chart()
+        self.species = {s.id: s for s in fixtures.species_list(chart, species_count)}
+        self.moves = {}
+        for i in range(move_count):
+            name = fixtures.TYPE_NAMES[i % len(fixtures.TYPE_NAMES)]
+            damage_class = [DamageClass.physical, DamageClass.special, DamageClass.status][i % 3]
+            self.moves[i + 1] = Move(i + 1, '%s-move-%d' % (name, i + 1), damage_class, chart[name],
+                                     Generation.generation_i, power=10 + (i * 7) % 141, accuracy=100, pp=5 + i % 36)
+        self._species_names = {s.name: s for s in self.species.values()}
+        self._move_names = {m.name: m for m in self.moves.values()}
+
+    def search_species(self, id_or_name):
+        return self._search(id_or_name, self.species, self._species_names, 'species')
+
+    def search_move(self, id_or_name):
+        return self._search(id_or_name, self.moves, self._move_names, 'move')
+
+    @staticmethod
+    def _search(id_or_name, by_id, by_name, kind):
+        try:
+            return by_id[int(id_or_name)]
+        except (TypeError, ValueError, KeyError):
+            pass
+        if id_or_name in by_name:
+            return by_name[id_or_name]
+        raise ValueError('Unknown %s %s' % (kind, id_or_name))
+
+    @contextmanager
+    def installed(self):
+        """Answer Species.search and Move.search from this corpus inside the block."""
+        species_search = Species.__dict__['search']
+        move_search = Move.__dict__['search']
+        corpus = self
+        Species.search = classmethod(lambda cls, id_or_name: corpus.search_species(id_or_name))
+        Move.search = classmethod(lambda cls, id_or_name: corpus.search_move(id_or_name))
+        try:
+            yield self
+        finally:
+            Species.search = species_search
+            Move.search = move_search
+
+
+def _evs(rng):
+    """A legal EV spread in multiples of 4: at most 252 per stat and 510 in total."""
+    values = [0] * len(StatSet.STATS)
+    budget = rng.choice([0, 128, 256, 508])
+    while budget > 0:
+        stat = rng.randrange(len(values))
+        gain = min(budget, 4 * rng.randint(1, 16), 252 - values[stat])
+        if gain <= 0:
+            if all(v >= 252 for v in values):
+                break
+            continue
+        values[stat] += gain
+        budget -= gain
+    return StatSet.from_values(values).to_dict()
+
+
+def _stats(rng):
+    return StatSet.from_values([rng.randint(20, 255) for _ in StatSet.STATS]).to_dict()
+
+
+def generate(pokemon, teams, corpus, seed=0, moves_per_pokemon=4):
+    """
+    :param pokemon: number of Pokemon
+    :param teams: number of teams, each of up to six distinct Pokemon from the roster
+    :param corpus: LocalCorpus to pick species and moves from
+    :param seed: seed for a repeatable roster
+    :param moves_per_pokemon: moves in each moveset, 0 for none
+    :return: roster dict as Roster.to_dict returns it
+    """
+    rng = random.Random(seed)
+    species_ids = sorted(corpus.species.keys())
+    moves = [corpus.moves[i] for i in sorted(corpus.moves.keys())]
+    items = [None] * 3 + sorted(EV_ITEMS.keys())
+    positions = [pos.name.lower() for pos in TeamPosition]
+
+    roster_pokemon = []
+    for i in range(1, pokemon + 1):
+        move_set = None
+        if moves_per_pokemon > 0:
+            chosen = rng.sample(moves, min(moves_per_pokemon, len(moves)))
+            move_set = {pos: chosen[j].to_dict() if j < len(chosen) else None
+                        for j, pos in enumerate(['first', 'second', 'third', 'fourth'])}
+        roster_pokemon.append({
+            'id': i,
+            'species': rng.choice(species_ids),
+            'nick_name': 'mon-%d' % i if rng.random() < 0.25 else None,
+            'pokerus': rng.random() < 0.05,
+            'item': rng.choice(items),
+            'evs': _evs(rng),
+            'stats': _stats(rng),
+            'move_set': move_set,
+        })
+
+    roster_teams = []
+    for t in range(1, teams + 1):
+        size = min(pokemon, rng.choice([6, 6, 6, 5, 4]))
+        members = rng.sample(range(1, pokemon + 1), size) if size > 0 else []
+        members += [None] * (len(positions) - len(members))
+        roster_teams.append({'id': t, 'name': 'team-%d' % t, 'team': dict(zip(positions, members))})
+
+    return {
+        'pokemon': roster_pokemon,
+        'teams': roster_teams,
+        'active_team': 1 if teams > 0 else None,
+    }
+
+
+@click.command()
+@click.option('--pokemon', default=100, show_default=True, help='Number of Pokemon.')
+@click.option('--teams', type=int, help='Number of teams. Defaults to one for every six Pokemon.')
+@click.option('--seed', default=0, show_default=True)
+@click.option('--species-count', default=151, show_default=True, help='Species ids to choose from, 1 to this.')
+@click.option('--move-count', default=165, show_default=True, help='Move ids to choose from, 1 to this.')
+@click.option('--output', type=click.Path(dir_okay=False, writable=True), required=True)
+def main(pokemon, teams, seed, species_count, move_count, output):
+    teams = pokemon // 6 if teams is None else teams
+    data = generate(pokemon, teams, LocalCorpus(species_count, move_count), seed=seed)
+    with open(output, 'w') as f:
+        yaml.dump(data, f)
+    click.echo('{} Pokemon and {} teams written to {}'.format(pokemon, teams, output))
+
+
+if __name__ == '__main__':
+    main()
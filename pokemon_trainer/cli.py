@@ -1,20 +1,32 @@
 # -*- coding: utf-8 -*-
 
 """Console script for pokemon_trainer."""
+import functools
+import time
 import os
+import json
+import shlex
 import click
 import click_completion
 import yaml
+import pokebase as pb
 from shutil import copyfile
 from .pokemon.moves import Move
 from .pokemon.teams import Roster
 from .pokemon.pokedex import Species
 from .pokemon.types import Type
+from .watch import RosterWatcher
+from . import daemon, memory, metrics, prefetch, profiling, tracing
+
+# Seconds importing this module took, measured and set by the launcher, which imports it. 0 when
+# the cli is imported some other way.
+IMPORT_SECONDS = 0.0
 
 TRAINER_FILENAME = '.pokemon-trainer'
 TRAINER_PATH = os.path.expanduser(os.path.join('~', TRAINER_FILENAME))
 COMPLETION_DATA_FILENAME = '.pokemon-trainer-complete'
 COMPLETION_DATA_PATH = os.path.expanduser(os.path.join('~', COMPLETION_DATA_FILENAME))
+OUTPUT_FORMATS = ['plain', 'json', 'ndjson']
 
 click_completion.init()
 moves_argument_type = click.STRING
@@ -51,34 +63,210 @@ if os.path.exists(COMPLETION_DATA_PATH):
         pass
 
 
+def format_option(f):
+    return click.option('--format', 'format_', type=click.Choice(OUTPUT_FORMATS), default='plain', show_default=True,
+                        help='Output format. json and ndjson skip the terminal formatting and print the raw data, '
+                             'one record per id_or_name.')(f)
+
+
+def echo_lookups(search, id_or_name, format_, echo=click.echo):
+    """
+    Search for each id_or_name and echo the result as soon as it is found, so output streams
+    instead of waiting for the whole batch.
+
+    :param search: callable taking an id or name, e.g. Species.search
+    :param id_or_name: ids or names to look up
+    :param format_: one of OUTPUT_FORMATS
+    :param echo: function to write the output with, like click.echo
+    :return:
+    """
+    if format_ == 'json':
+        echo('[', nl=False)
+    for i, id in enumerate(id_or_name):
+        try:
+            result = search(id)
+            record = None
+            if format_ != 'plain':
+                with profiling.phase('render'), metrics.timer('render.describe'), \
+                        tracing.span('describe', id_or_name=id):
+                    record = result.describe()
+        except ValueError as e:
+            result = "{} failed: {}".format(id, e)
+            record = {'id_or_name': id, 'error': str(e)}
+
+        with profiling.phase('render'), metrics.timer('render'), tracing.span('render', id_or_name=id):
+            if format_ == 'plain':
+                echo(result)
+            elif format_ == 'ndjson':
+                echo(json.dumps(record, sort_keys=True))
+            else:
+                echo('{}\n  {}'.format(',' if i > 0 else '', json.dumps(record, sort_keys=True)), nl=False)
+    if format_ == 'json':
+        echo('\n]' if len(id_or_name) > 0 else ']')
+
+
 def load(filename):
-    try:
-        with open(filename) as f:
-            return Roster.from_dict(yaml.safe_load(f))
-    except IOError:
-        pass  # Ignore missing tracking file.
+    with profiling.phase('load'), metrics.timer('roster.load'), tracing.span('load', filename=filename):
+        try:
+            with open(filename) as f:
+                return Roster.from_dict(yaml.safe_load(f))
+        except IOError:
+            pass  # Ignore missing tracking file.
 
-    return Roster()
+        return Roster()
 
 
 def save(roster, filename):
-    if os.path.exists(roster.filename):
-        copyfile(roster.filename,  roster.filename + '.bak')  # Create backup
+    with metrics.timer('roster.save'):
+        if os.path.exists(filename):
+            copyfile(filename, filename + '.bak')  # Create backup
 
-    with open(filename, "w") as f:
-        yaml.dump(roster.to_dict(), f)
+        with open(filename, "w") as f:
+            yaml.dump(roster.to_dict(), f)
 
 
 @click.group()
 @click.option('-f', '--file', type=click.Path(dir_okay=False, writable=True, resolve_path=True), default=TRAINER_PATH,
               show_default=True, help='File path to save/load trainer data from. Will be created if it does not exist.')
+@click.option('--api-url', envvar='POKEMON_TRAINER_API_URL', default=pb.api.BASE_URL, show_default=True,
+              help='Base url of the PokeAPI to query, e.g. a local mirror. Can also be set with POKEMON_TRAINER_API_URL.')
+@click.option('--profile', is_flag=True, default=False,
+              help='Time the phases of the command (import, load, fetch, coverage, render) and print a summary '
+                   'to stderr when it finishes.')
+@click.option('--profile-output', type=click.Path(dir_okay=False, writable=True),
+              help='Also write a profile of the whole command to this file. Implies --profile.')
+@click.option('--profile-format', type=click.Choice(profiling.PROFILE_FORMATS), default='pstats', show_default=True,
+              help='Format of --profile-output: cProfile stats for pstats/snakeviz, or collapsed stacks for '
+                   'flamegraph tools.')
+@click.option('--metrics-file', envvar='POKEMON_TRAINER_METRICS_FILE', type=click.Path(dir_okay=False, writable=True),
+              help='Append the metrics of every run (pokebase fetches, cache hits, latencies) to this file, see the '
+                   'stats command. Can also be set with POKEMON_TRAINER_METRICS_FILE.')
+@click.option('--trace', 'trace_file', type=click.Path(dir_okay=False, writable=True),
+              help='Write nested spans of searches, pokebase fetches, roster loading and rendering to this file as '
+                   'Chrome trace event json (open in chrome://tracing or ui.perfetto.dev), and print a count of '
+                   'the spans to stderr.')
+@click.option('--memory', 'memory_report', is_flag=True, default=False,
+              help='Trace memory allocations with tracemalloc and print, for loading the roster and for the rest of '
+                   'the command, the memory held and the modules and lines that allocated the most to stderr.')
+@click.option('--socket', 'socket_path', envvar='POKEMON_TRAINER_SOCKET', type=click.Path(dir_okay=False),
+              default=daemon.SOCKET_PATH, show_default=True,
+              help='Unix socket of the daemon (see the daemon command). Can also be set with POKEMON_TRAINER_SOCKET.')
+@click.option('--no-daemon', envvar='POKEMON_TRAINER_NO_DAEMON', is_flag=True, default=False,
+              help='Load the roster and search in this process even if a daemon is running. Implied by --api-url, '
+                   '--profile, --trace and --memory.')
 @click.pass_context
-def main(ctx, file):
+def main(ctx, file, api_url, profile, profile_output, profile_format, metrics_file, trace_file, memory_report,
+         socket_path, no_daemon):
+    if profile or profile_output is not None:
+        start_profiling(ctx, profile_output, profile_format)
+    if trace_file is not None:
+        start_tracing(ctx, trace_file)
+    if memory_report:
+        start_memory(ctx)
+    start_metrics(ctx, metrics_file)
+    pb.api.BASE_URL = api_url.rstrip('/')
     ctx.ensure_object(dict)
     if ctx.obj is None:
         ctx.obj = {}
     ctx.obj['filename'] = file
-    ctx.obj['roster'] = load(file)
+    ctx.obj['socket'] = socket_path
+    # The daemon queries its own api url, and only the socket round trip to it could be profiled,
+    # traced or memory traced, so those options keep the command in this process.
+    in_process = no_daemon or profile or profile_output is not None or trace_file is not None or memory_report or \
+        ctx.get_parameter_source('api_url') != click.core.ParameterSource.DEFAULT
+    ctx.obj['daemon'] = None if in_process else daemon.connect(socket_path)
+    if ctx.obj['daemon'] is None:
+        ctx.obj['roster'] = load(file)
+    memory.mark('load')
+
+
+def lookups(ctx, kind, search, id_or_name, format_):
+    """
+    echo_lookups with `search`, or have the daemon do it when one is running. Within a batch
+    the searches go through the batch's WarmCache.
+    """
+    client = ctx.obj.get('daemon')
+    if client is None:
+        cache = ctx.obj.get('cache')
+        if cache is not None:
+            search = functools.partial(cache.search, kind)
+        echo_lookups(search, id_or_name, format_)
+    else:
+        click.echo(client.lookups(kind, id_or_name, format_), nl=False)
+
+
+def start_profiling(ctx, output, output_format):
+    """
+    Profile the rest of the command, printing the phase summary (and writing the profile to `output`
+    if given) when the click context closes.
+    """
+    profiler = profiling.start(output_format if output is not None else None)
+    profiler.record('import', IMPORT_SECONDS)
+
+    def finish():
+        profiling.stop()
+        click.echo(profiler.summary(), err=True)
+        if output is not None:
+            profiler.write(output)
+            click.echo('profile written to {}'.format(output), err=True)
+
+    ctx.call_on_close(finish)
+
+
+def start_tracing(ctx, filename):
+    """
+    Trace the rest of the command, writing the spans to `filename` when the click context closes.
+    """
+    tracer = tracing.start()
+
+    def finish():
+        tracing.stop()
+        tracer.write(filename)
+        click.echo(tracer.summary(), err=True)
+        click.echo('trace written to {}'.format(filename), err=True)
+
+    ctx.call_on_close(finish)
+
+
+def start_memory(ctx):
+    """
+    Snapshot memory now, after the roster is loaded and when the click context closes, printing
+    what each of those steps allocated.
+    """
+    tracer = memory.start()
+
+    def finish():
+        tracer.mark('analysis')
+        memory.stop()
+        click.echo(tracer.report(), err=True)
+
+    ctx.call_on_close(finish)
+
+
+def start_metrics(ctx, filename):
+    """
+    Start collecting metrics for this run and, if `filename` is given, append them to it when the
+    click context closes. Runs of the stats command itself aren't recorded. pokebase is only
+    instrumented while a run is being recorded, otherwise it runs unpatched.
+    """
+    metrics.REGISTRY.clear()
+    ctx.ensure_object(dict)
+    ctx.obj['metrics_file'] = filename
+    if filename is None or ctx.invoked_subcommand == 'stats':
+        return
+
+    metrics.instrument_pokebase()
+    started = time.perf_counter()
+    command = ctx.invoked_subcommand
+
+    def finish():
+        metrics.uninstrument_pokebase()
+        try:
+            metrics.append_run(filename, command, time.perf_counter() - started + IMPORT_SECONDS)
+        except IOError as e:
+            click.echo('Unable to write metrics to {}: {}'.format(filename, e), err=True)
+
+    ctx.call_on_close(finish)
 
 
 @main.command()
@@ -110,7 +298,8 @@ def install_completion(rebuild):
 @main.command()
 @click.pass_context
 @click.argument('id_or_name', type=species_argument_type, nargs=-1)
-def species(ctx, id_or_name):
+@format_option
+def species(ctx, id_or_name, format_):
     """List details for a Pokemon species, where id_or_name is
     the pokedex name or ID of the Pokemon (e.g. 1 or 'bulbasaur'
     to lookup bulbasaur). Names support tab completion.
@@ -118,20 +307,18 @@ def species(ctx, id_or_name):
 
     :param ctx:
     :param id_or_name:
+    :param format_:
     :return:
     """
-    for id in id_or_name:
-        try:
-            click.echo(Species.search(id))
-        except ValueError as e:
-            click.echo("{} failed: {}".format(id, e))
+    lookups(ctx, 'species', Species.search, id_or_name, format_)
     return 0
 
 
 @main.command()
 @click.pass_context
 @click.argument('id_or_name', type=types_argument_type, nargs=-1)
-def type(ctx, id_or_name):
+@format_option
+def type(ctx, id_or_name, format_):
     """List details for a Pokemon/Move Type, where id_or_name is
     the name or ID of the type (e.g. 16 or \'dragon\' to
     lookup the dragon type). Names support tab completion.
@@ -139,19 +326,17 @@ def type(ctx, id_or_name):
 
     :param ctx:
     :param id_or_name:
+    :param format_:
     :return:
     """
-    for id in id_or_name:
-        try:
-            click.echo(Type.search(id))
-        except ValueError as e:
-            click.echo("{} failed: {}".format(id, e))
+    lookups(ctx, 'type', Type.search, id_or_name, format_)
     return 0
 
 @main.command()
 @click.pass_context
 @click.argument('id_or_name', type=moves_argument_type, nargs=-1)
-def move(ctx, id_or_name):
+@format_option
+def move(ctx, id_or_name, format_):
     """List details for a Move, where id_or_name is
     the name or ID of the move (e.g. 15 or \'cut\' to
     lookup the cut move). Names support tab completion.
@@ -159,18 +344,346 @@ def move(ctx, id_or_name):
 
     :param ctx:
     :param id_or_name:
+    :param format_:
+    :return:
+    """
+    lookups(ctx, 'move', Move.search, id_or_name, format_)
+    return 0
+
+
+@main.command()
+@click.pass_context
+@click.option('--kind', 'kinds', multiple=True, type=click.Choice(sorted(prefetch.KINDS.keys())),
+              help='Only download these kinds of resource (repeatable). Defaults to all of them.')
+@click.option('--learnsets', is_flag=True, default=False,
+              help='Also download the move learn methods and version groups the species\' learnsets refer to.')
+@click.option('--workers', default=8, show_default=True, help='Most downloads in flight at once.')
+@click.option('--rate', default=20.0, show_default=True, help='Most requests a second, 0 for no limit.')
+@click.option('--retries', default=5, show_default=True,
+              help='Times a request is retried after a 429, 5xx or connection error, backing off between tries.')
+def warm(ctx, kinds, learnsets, workers, rate, retries):
+    """Download every type, move and species into the pokebase cache
+    so later commands run offline. Resources already in the cache are
+    skipped, so an interrupted run resumes where it stopped.
+    \f
+
+    :param ctx:
+    :param kinds:
+    :param learnsets:
+    :param workers:
+    :param rate:
+    :param retries:
+    :return:
+    """
+    kinds = [prefetch.KINDS[k] for k in sorted(kinds or prefetch.KINDS.keys())]
+    prefetcher = prefetch.Prefetcher(workers=workers, rate=rate or None, retries=retries)
+    click.echo('Warming {} in {}'.format(', '.join(kinds), prefetcher.cache))
+    result = prefetcher.warm(kinds, learnsets=learnsets)
+    click.echo(result.summary())
+    if len(result.failed) > 0:
+        raise click.ClickException('{} resource(s) failed to download, run warm again to retry them'.format(
+            len(result.failed)))
+    return 0
+
+
+@main.command()
+@click.pass_context
+@click.option('--id', 'id_or_name', help='ID or name of the team. Defaults to the active team.')
+@click.option('--watch', is_flag=True, default=False,
+              help='Keep showing the team, redrawn whenever the roster file changes, until interrupted.')
+@click.option('--interval', default=1.0, show_default=True, help='Seconds between checks of the roster file with --watch.')
+def team(ctx, id_or_name, watch, interval):
+    """Show a team's Pokemon, their types and moves, and the team's
+    effective type coverage.
+    \f
+
+    :param ctx:
+    :param id_or_name:
+    :param watch:
+    :param interval:
     :return:
     """
-    for id in id_or_name:
+    if watch:
+        return watch_team(ctx.obj['filename'], id_or_name, interval)
+
+    client = ctx.obj.get('daemon')
+    try:
+        if client is not None:
+            click.echo(client.team(ctx.obj['filename'], id_or_name))
+            return 0
+        team_ = daemon.select_team(ctx.obj['roster'], id_or_name)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+
+    with profiling.phase('render'), metrics.timer('render'), tracing.span('render', team=team_.name):
+        click.echo(team_)
+    return 0
+
+
+def watch_team(filename, id_or_name, interval, polls=None):
+    """
+    Redraw the team whenever `filename` changes. Only the Pokemon and teams that changed are
+    built and rendered again, see pokemon_trainer.watch.
+    """
+    watcher = RosterWatcher(filename)
+    drawn = [None]
+
+    def draw(changed):
         try:
-            click.echo(Move.search(id))
+            text = watcher.report.report(watcher.report.find_team(id_or_name))
         except ValueError as e:
-            click.echo("{} failed: {}".format(id, e))
+            text = 'Error: {}'.format(e)
+        if text == drawn[0]:
+            return  # the change was to other teams
+        drawn[0] = text
+        click.clear()
+        click.echo(text)
+        click.echo('\nWatching {}, Ctrl-C to stop'.format(filename))
+
+    def error(e):
+        click.echo('Unable to load {}: {}'.format(filename, e), err=True)
+
+    try:
+        watcher.watch(draw, error, interval=interval, polls=polls)
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+@main.command('daemon')
+@click.pass_context
+@click.option('--stop', is_flag=True, default=False, help='Stop the running daemon.')
+def serve_daemon(ctx, stop):
+    """Run a daemon that keeps the roster and searched species,
+    types and moves in memory, and answers the species, type, move and
+    team commands over a Unix socket. Commands use it automatically
+    while it is running.
+    \f
+
+    :param ctx:
+    :param stop:
+    :return:
+    """
+    client = ctx.obj.get('daemon')
+    path = ctx.obj['socket']
+    if stop:
+        if client is None:
+            click.echo('No daemon is listening on {}'.format(path))
+        else:
+            client.shutdown()
+            click.echo('Stopped the daemon on {}'.format(path))
+        return 0
+    if client is not None:
+        raise click.ClickException('A daemon is already listening on {}'.format(path))
+
+    server = daemon.Daemon(path)
+    server.cache.add_roster(ctx.obj['filename'], ctx.obj['roster'])
+    click.echo('Listening on {}, stop with Ctrl-C or `pokemon-trainer daemon --stop`'.format(path))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    return 0
+
+
+@main.command()
+@click.pass_context
+@click.option('--host', default='127.0.0.1', show_default=True, help='Address to listen on.')
+@click.option('--port', default=8080, show_default=True, help='Port to listen on.')
+@click.option('--workers', default=4, show_default=True, help='Threads running searches and coverage analysis.')
+def serve(ctx, host, port, workers):
+    """Serve species, type and move lookups, team coverage and
+    matchups as json over HTTP, with metrics for Prometheus at /metrics.
+    See pokemon_trainer.server for the endpoints.
+    \f
+
+    :param ctx:
+    :param host:
+    :param port:
+    :param workers:
+    :return:
+    """
+    # asyncio adds ~50ms to the import of the cli, so only the serve command pays for it.
+    import asyncio
+    from . import server
+
+    metrics.REGISTRY.histogram_limit = server.HISTOGRAM_LIMIT
+    metrics.REGISTRY.clear()
+    metrics.instrument_pokebase()
+    http_server = server.Server(ctx.obj['filename'], host=host, port=port, workers=workers)
+    if 'roster' in ctx.obj:
+        http_server.cache.add_roster(ctx.obj['filename'], ctx.obj['roster'])
+
+    async def run():
+        await http_server.start()
+        click.echo('Serving on http://{}:{}, stop with Ctrl-C'.format(host, http_server.port))
+        await http_server.serve_forever()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+    except OSError as e:
+        raise click.ClickException('Unable to serve on {}:{}: {}'.format(host, port, e))
+    finally:
+        http_server.close()
     return 0
 
 
+def roster_changed(ctx):
+    """
+    Save the roster after a command changed it, or within a batch remember to save it once the
+    batch is done.
+    """
+    if ctx.obj.get('batch'):
+        ctx.obj['roster_changed'] = True
+    else:
+        save(ctx.obj['roster'], ctx.obj['filename'])
+
+
 @main.command()
 @click.pass_context
-@click.option('--id', help='ID or name of the team')
-def team(ctx, id_or_name, active):
-    pass
+@click.argument('commands_file', type=click.File('r'), default='-')
+@click.option('--keep-going', is_flag=True, default=False, help='Run the remaining commands after one fails.')
+def batch(ctx, commands_file, keep_going):
+    """Run pokemon-trainer commands read one per line from
+    COMMANDS_FILE (stdin by default) in this process, e.g.
+    'species bulbasaur --format json'. The roster is loaded once,
+    searches are shared by every command, and the roster is saved once
+    at the end. Blank lines and lines starting with # are skipped.
+    \f
+
+    :param ctx:
+    :param commands_file:
+    :param keep_going:
+    :return:
+    """
+    start_batch(ctx)
+    stdout = click.get_text_stream('stdout')
+    failed = 0
+    try:
+        for number, line in enumerate(commands_file, start=1):
+            try:
+                args = shlex.split(line, comments=True)
+            except ValueError as e:
+                args, error = None, click.ClickException('line {}: {}'.format(number, e))
+            else:
+                error = None
+            if args is not None and len(args) == 0:
+                continue
+            if error is None:
+                error = invoke_command(ctx, args)
+                if error is not None:
+                    error = click.ClickException('line {}: {}'.format(number, error.format_message()))
+            stdout.flush()
+            if error is not None:
+                failed += 1
+                error.show()
+                if not keep_going:
+                    break
+    finally:
+        if ctx.obj.get('roster_changed'):
+            save(ctx.obj['roster'], ctx.obj['filename'])
+    if failed > 0:
+        raise click.ClickException('{} batch command{} failed'.format(failed, '' if failed == 1 else 's'))
+    return 0
+
+
+@main.command('shell')
+@click.pass_context
+@click.option('--save-delay', default=2.0, show_default=True,
+              help='Seconds without further changes before roster changes are saved.')
+def interactive_shell(ctx, save_delay):
+    """Run commands interactively, with the roster and searches kept
+    in memory between them and tab completion of commands, options and
+    names. Roster changes are saved once they settle and when leaving.
+    \f
+
+    :param ctx:
+    :param save_delay:
+    :return:
+    """
+    from .shell import Shell
+
+    # The shell keeps the roster itself rather than asking a daemon.
+    ctx.obj['daemon'] = None
+    if 'roster' not in ctx.obj:
+        ctx.obj['roster'] = load(ctx.obj['filename'])
+    start_batch(ctx)
+    shell = Shell(ctx, save_delay=save_delay)
+    intro = shell.intro
+    while True:
+        try:
+            shell.cmdloop(intro)
+            break
+        except KeyboardInterrupt:
+            click.echo('^C')
+            intro = ''
+    return 0
+
+
+BATCH_EXCLUDED_COMMANDS = ['batch', 'daemon', 'serve', 'shell', 'install-completion']
+
+
+def start_batch(ctx):
+    """
+    Have the commands invoked with invoke_command share one WarmCache for their searches, and
+    remember roster changes instead of saving them, see roster_changed.
+    """
+    ctx.obj['batch'] = True
+    if ctx.obj.get('daemon') is None and 'cache' not in ctx.obj:
+        ctx.obj['cache'] = daemon.WarmCache()
+
+
+def invoke_command(ctx, args):
+    """
+    Invoke a command of a batch or the shell with `ctx` as its parent context.
+
+    :param args: command name and its arguments, e.g. ['species', 'bulbasaur']
+    :return: ClickException describing why it failed, or None
+    """
+    name = args[0]
+    command = main.get_command(ctx, name)
+    if command is None or name in BATCH_EXCLUDED_COMMANDS:
+        return click.ClickException('{} is not a command that can run in a {}'.format(name, ctx.info_name))
+    try:
+        with command.make_context(name, args[1:], parent=ctx) as sub_ctx:
+            command.invoke(sub_ctx)
+    except click.exceptions.Exit:
+        pass  # --help
+    except click.ClickException as e:
+        return e
+    return None
+
+
+@main.command()
+@click.pass_context
+@click.option('--command', 'commands', multiple=True,
+              help='Only summarize runs of this command (repeatable), e.g. species.')
+def stats(ctx, commands):
+    """Summarize the metrics recorded with --metrics-file: runs per
+    command, pokebase fetches per run, the cache hit rate and p50/p90/p99
+    latencies in milliseconds.
+    \f
+
+    :param ctx:
+    :param commands:
+    :return:
+    """
+    filename = ctx.obj.get('metrics_file')
+    if filename is None:
+        raise click.UsageError('No metrics file, pass --metrics-file or set POKEMON_TRAINER_METRICS_FILE')
+    if not os.path.exists(filename):
+        click.echo('No metrics recorded in {} yet'.format(filename))
+        return 0
+
+    runs = metrics.read_runs(filename)
+    if len(commands) > 0:
+        runs = [run for run in runs if run.get('command') in commands]
+    if len(runs) == 0:
+        click.echo('No matching runs in {}'.format(filename))
+        return 0
+    click.echo(metrics.format_summary(metrics.summarize(runs)))
+    return 0
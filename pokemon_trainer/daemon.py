@@ -0,0 +1,241 @@
+# -*- coding: utf-8 -*-
+
+"""
+A long running process holding searched species, types and moves and hydrated rosters in memory,
+answering the cli over a Unix domain socket.
+
+`pokemon-trainer daemon` starts it. While it is running, the species, type, move and team
+commands send their lookups to it instead of loading the roster and searching pokebase
+themselves, so repeated invocations skip the roster parse and the searches. The launcher skips
+importing the cli as well.
+
+The protocol is one json object per line each way. A request has a 'command', and the response
+either the rendered output or an 'error':
+
+    {"command": "lookups", "kind": "species", "id_or_name": ["bulbasaur"], "format": "plain"}
+    {"text": "bulbasaur\\n..."}
+
+Only the Daemon imports the rest of pokemon_trainer, so clients of this module start quickly.
+"""
+import json
+import os
+import socket
+import socketserver
+import threading
+
+SOCKET_FILENAME = '.pokemon-trainer.sock'
+SOCKET_PATH = os.path.expanduser(os.path.join('~', SOCKET_FILENAME))
+TIMEOUT = 60.0
+# How long connect waits for the daemon to answer before the cli runs the command itself, so a
+# hung daemon doesn't stall every command.
+CONNECT_TIMEOUT = 0.25
+
+
+def request(path, message, timeout=TIMEOUT):
+    """
+    Send one request to the daemon listening on `path`.
+
+    :return: the response dict
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+        s.settimeout(timeout)
+        s.connect(path)
+        with s.makefile('rwb') as f:
+            f.write(json.dumps(message).encode('utf8') + b'\n')
+            f.flush()
+            line = f.readline()
+    if len(line) == 0:
+        raise IOError('The daemon on %s closed the connection' % path)
+    return json.loads(line.decode('utf8'))
+
+
+def connect(path=SOCKET_PATH, timeout=CONNECT_TIMEOUT):
+    """
+    :return: a Client for the daemon listening on `path`, or None if none is or it doesn't
+    answer within `timeout` seconds
+    """
+    if not os.path.exists(path):
+        return None
+    client = Client(path)
+    try:
+        client.ping(timeout)
+    except (IOError, ValueError):
+        return None
+    return client
+
+
+def select_team(roster, id_or_name=None):
+    """
+    :return: the roster's team `id_or_name`, or its active team when that is None
+    """
+    if id_or_name is not None:
+        return roster.find_team(id_or_name)
+    if roster.active_team() is None:
+        raise ValueError('No active team, pass a team id or name')
+    return roster.active_team()
+
+
+class Client(object):
+
+    def __init__(self, path=SOCKET_PATH):
+        self.path = path
+
+    def call(self, command, timeout=TIMEOUT, **kwargs):
+        kwargs['command'] = command
+        response = request(self.path, kwargs, timeout)
+        if 'error' in response:
+            raise ValueError(response['error'])
+        return response
+
+    def ping(self, timeout=TIMEOUT):
+        return self.call('ping', timeout)
+
+    def lookups(self, kind, id_or_name, format_='plain'):
+        """
+        :param kind: 'species', 'type' or 'move'
+        :return: the output of the `kind` command for `id_or_name`, rendered by the daemon
+        """
+        return self.call('lookups', kind=kind, id_or_name=list(id_or_name), format=format_)['text']
+
+    def team(self, filename, id_or_name=None):
+        """:return: the team rendered by the daemon"""
+        return self.call('team', file=filename, id_or_name=id_or_name)['text']
+
+    def shutdown(self):
+        return self.call('shutdown')
+
+
+class WarmCache(object):
+    """
+    Searched species, types and moves and loaded rosters, shared by everything a long running
+    process serves. Safe to use from several threads.
+    """
+
+    def __init__(self):
+        from . import cli
+        self.load = cli.load
+        self.searches = {'species': cli.Species.search, 'type': cli.Type.search, 'move': cli.Move.search}
+        self.searched = {}  # (kind, id or name) -> result
+        self.rosters = {}  # filename -> (mtime, Roster)
+        # pokebase changes the working directory while it looks things up, one search at a time.
+        self._search_lock = threading.Lock()
+        self._roster_lock = threading.Lock()
+
+    def search(self, kind, id_or_name):
+        """
+        :param kind: 'species', 'type' or 'move'
+        :return: the search result, searched the first time it is asked for
+        """
+        if kind not in self.searches:
+            raise ValueError('Unknown kind %s' % kind)
+        key = (kind, str(id_or_name))
+        if key not in self.searched:
+            with self._search_lock:
+                if key not in self.searched:
+                    self.searched[key] = self.searches[kind](id_or_name)
+        return self.searched[key]
+
+    def roster(self, filename):
+        """The roster in `filename`, loaded again only when the file changes."""
+        mtime = _mtime(filename)
+        with self._roster_lock:
+            if filename not in self.rosters or self.rosters[filename][0] != mtime:
+                with self._search_lock:
+                    self.rosters[filename] = (mtime, self.load(filename))
+            return self.rosters[filename][1]
+
+    def add_roster(self, filename, roster):
+        with self._roster_lock:
+            self.rosters[filename] = (_mtime(filename), roster)
+
+
+def _mtime(filename):
+    try:
+        return os.stat(filename).st_mtime_ns
+    except OSError:
+        return None
+
+
+class Daemon(object):
+    """
+    :param path: socket to listen on
+    :param cache: WarmCache to answer from, a new one by default
+    """
+
+    def __init__(self, path, cache=None):
+        from . import cli
+        self.path = path
+        self.cache = WarmCache() if cache is None else cache
+        self.echo_lookups = cli.echo_lookups
+        self._server = None
+
+    def handle(self, message):
+        """
+        :param message: request dict
+        :return: response dict
+        """
+        command = message.get('command')
+        try:
+            if command == 'ping':
+                return {'pid': os.getpid()}
+            if command == 'lookups':
+                kind = message['kind']
+                if kind not in self.cache.searches:
+                    raise ValueError('Unknown kind %s' % kind)
+                output = []
+                self.echo_lookups(lambda id_or_name: self.cache.search(kind, id_or_name), message['id_or_name'],
+                                  message.get('format', 'plain'), echo=_collect(output))
+                return {'text': ''.join(output)}
+            if command == 'team':
+                return {'text': str(select_team(self.cache.roster(message['file']), message.get('id_or_name')))}
+            if command == 'shutdown':
+                threading.Thread(target=self.shutdown, daemon=True).start()
+                return {}
+            return {'error': 'Unknown command %s' % command}
+        except KeyError as e:
+            return {'error': 'Missing %s' % e}
+        except ValueError as e:
+            return {'error': str(e)}
+
+    def serve_forever(self):
+        if os.path.exists(self.path):
+            if connect(self.path) is not None:
+                raise ValueError('A daemon is already listening on %s' % self.path)
+            os.remove(self.path)  # left behind by a daemon that didn't stop cleanly
+        self._server = _Server(self.path, _handler_class(self))
+        os.chmod(self.path, 0o600)
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+            if os.path.exists(self.path):
+                os.remove(self.path)
+
+    def shutdown(self):
+        if self._server is not None:
+            self._server.shutdown()
+
+
+def _collect(output):
+    """An echo for echo_lookups appending to the list `output`."""
+    def echo(message=None, nl=True):
+        output.append(('' if message is None else str(message)) + ('\n' if nl else ''))
+    return echo
+
+
+class _Server(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+
+def _handler_class(daemon):
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            line = self.rfile.readline()
+            try:
+                response = daemon.handle(json.loads(line.decode('utf8')))
+            except ValueError as e:
+                response = {'error': 'Bad request: %s' % e}
+            self.wfile.write(json.dumps(response).encode('utf8') + b'\n')
+
+    return Handler
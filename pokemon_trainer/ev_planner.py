@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+
+from .ev_trainer import EV_ITEMS
+from .pokemon.pokedex import StatSet
+
+
+class TrainingStep(object):
+    """
+    Battle `species` `count` times while holding `item` (None for no item). `evs` is the
+    EV gain of a single one of those battles, after the item and pokerus are applied.
+    """
+
+    def __init__(self, species, item, count, evs):
+        self.species = species
+        self.item = item
+        self.count = count
+        self.evs = evs
+
+    def total(self):
+        return self.evs * self.count
+
+    def __eq__(self, other):
+        if type(other) is not TrainingStep:
+            return False
+        return (self.species.id, self.item, self.count, self.evs) == \
+               (other.species.id, other.item, other.count, other.evs)
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __str__(self):
+        item = 'no item' if self.item is None else self.item
+        return '%dx %s (%s)' % (self.count, self.species.name, item)
+
+
+class TrainingPlan(object):
+
+    def __init__(self, current, steps):
+        self.current = current
+        self.steps = steps
+
+    def battles(self):
+        return sum([step.count for step in self.steps])
+
+    def evs(self):
+        evs = self.current.clone()
+        for step in self.steps:
+            evs += step.total()
+        return evs
+
+    def __str__(self):
+        if len(self.steps) == 0:
+            return 'Nothing to train'
+        lines = [str(step) for step in self.steps]
+        lines.append('%d battles' % self.battles())
+        return '\n'.join(lines)
+
+
+def plan(target, species, current=None, items=None, pokerus=False):
+    """
+    Find the fewest single stat battles that take `current` EVs to at least `target` in every stat
+    without going over StatSet.MAX_STAT in any stat or StatSet.MAX_EV in total, so none of the gains
+    are wasted.
+
+    Only battles that raise a single stat are considered (a species' yield, after the held item and
+    pokerus, touching exactly one stat), which is how spreads are trained in practice and keeps the
+    search small enough to be exact: one coin change table per stat over the distinct yields, then a
+    knapsack across stats over the EVs left to spare. Multi stat yields are skipped, so the plan is
+    the minimum over single stat battles, and a plan that also used multi stat yields could be shorter.
+
+    :param target: StatSet of EVs to reach
+    :param species: iterable of Species to choose battles from, e.g. the whole pokedex
+    :param current: StatSet of EVs the Pokemon already has, defaults to none
+    :param items: names from ev_trainer.EV_ITEMS that can be held, defaults to all of them
+    :param pokerus: whether the Pokemon has pokerus
+    :return: TrainingPlan
+    """
+    current = StatSet() if current is None else current
+    items = sorted(EV_ITEMS.keys()) if items is None else list(items)
+    for item in items:
+        if item not in EV_ITEMS:
+            raise ValueError("Invalid item '%s'" % item)
+    for stat, value in zip(StatSet.STATS, target.values()):
+        if value > StatSet.MAX_STAT:
+            raise ValueError('Target %s of %d is over the maximum of %d' % (stat, value, StatSet.MAX_STAT))
+    if target.total() > StatSet.MAX_EV:
+        raise ValueError('Target total of %d is over the maximum of %d' % (target.total(), StatSet.MAX_EV))
+
+    deficits = [max(0, t - c) for t, c in zip(target.values(), current.values())]
+    spare = StatSet.MAX_EV - current.total() - sum(deficits)
+    if spare < 0:
+        raise ValueError('Current EVs total %d, there is no room left to reach the target' % current.total())
+
+    battles = _single_stat_battles(species, items, pokerus)
+
+    # Every way of training each stat that isn't beaten by one with fewer left over EVs.
+    tables = []
+    stat_options = []
+    for i, deficit in enumerate(deficits):
+        limit = min(StatSet.MAX_STAT - current.values()[i], deficit + spare) if deficit > 0 else 0
+        tables.append(_fewest_battles(limit, sorted(battles[i].keys())))
+        stat_options.append(_stat_options(deficit, tables[i][0]))
+
+    # Knapsack across stats on the spare EVs: best[spent] = (battles, amounts chosen per stat).
+    best = {0: (0, [])}
+    for options in stat_options:
+        combined = {}
+        for spent, (count, amounts) in best.items():
+            for amount, (option_count, over) in options.items():
+                total_spent = spent + over
+                if total_spent > spare:
+                    continue
+                candidate = (count + option_count, amounts + [amount])
+                if total_spent not in combined or candidate[0] < combined[total_spent][0]:
+                    combined[total_spent] = candidate
+        best = combined
+        if len(best) == 0:
+            raise ValueError('No combination of battles reaches the target %s' % target.to_dict())
+
+    _, amounts = min(best.values(), key=lambda choice: choice[0])
+    steps = []
+    for i, amount in enumerate(amounts):
+        steps += _steps_for_amount(amount, tables[i][1], battles[i])
+    return TrainingPlan(current, steps)
+
+
+def _single_stat_battles(species, items, pokerus):
+    """
+    Map each stat index to {EV gain: (species, item, evs)} for every battle that raises only that
+    stat. The first species (by id) and no item, then item name order, win ties.
+    """
+    battles = [{} for _ in StatSet.STATS]
+    by_yield = {}
+    for s in sorted(species, key=lambda s: s.id):
+        by_yield.setdefault(s.evs.values(), s)
+
+    for s in by_yield.values():
+        for item in [None] + items:
+            evs = s.evs if item is None else EV_ITEMS[item](s.evs)
+            if pokerus:
+                evs = evs * 2
+            stats = [i for i, value in enumerate(evs.values()) if value != 0]
+            if len(stats) != 1 or evs.values()[stats[0]] < 0:
+                continue
+            stat = stats[0]
+            gain = evs.values()[stat]
+            if gain not in battles[stat] or _preferred((s, item), battles[stat][gain]):
+                battles[stat][gain] = (s, item, evs)
+    return battles
+
+
+def _preferred(choice, existing):
+    if choice[0].id != existing[0].id:
+        return choice[0].id < existing[0].id
+    if existing[1] is None:
+        return False
+    return choice[1] is None or choice[1] < existing[1]
+
+
+def _fewest_battles(limit, gains):
+    """Unbounded coin change: fewest[x] is the fewest battles gaining exactly x EVs, last[x] the final gain used."""
+    fewest = [0] + [None] * limit
+    last = [None] * (limit + 1)
+    for x in range(1, limit + 1):
+        for gain in gains:
+            if gain <= x and fewest[x - gain] is not None:
+                if fewest[x] is None or fewest[x - gain] + 1 < fewest[x]:
+                    fewest[x] = fewest[x - gain] + 1
+                    last[x] = gain
+    return fewest, last
+
+
+def _stat_options(deficit, fewest):
+    """{amount: (battles, EVs over deficit)} for amounts at least deficit, dropping dominated ones."""
+    options = {}
+    best_so_far = None
+    for amount in range(deficit, len(fewest)):
+        count = fewest[amount]
+        if count is not None and (best_so_far is None or count < best_so_far):
+            options[amount] = (count, amount - deficit)
+            best_so_far = count
+    return options
+
+
+def _steps_for_amount(amount, last, battles):
+    counts = {}
+    while amount > 0:
+        gain = last[amount]
+        counts[gain] = counts.get(gain, 0) + 1
+        amount -= gain
+
+    steps = []
+    for gain in sorted(counts.keys(), reverse=True):
+        species, item, evs = battles[gain]
+        steps.append(TrainingStep(species, item, counts[gain], evs))
+    return steps
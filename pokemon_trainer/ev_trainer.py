@@ -16,7 +16,36 @@ EV_ITEMS = {
 }
 
 
+def read_battle_log(stream):
+    """
+    Read a battle log, one battle per line as `species [count]` where species is a pokedex
+    name or id and count defaults to 1. Blank lines and lines starting with # are skipped.
+    Repeated species are summed, so the result has one entry per species.
+
+    :param stream: iterable of lines, e.g. an open file
+    :return: dict of species name or id to number of battles, in the order first seen
+    """
+    battles = {}
+    for line_number, line in enumerate(stream, 1):
+        line = line.strip()
+        if len(line) == 0 or line.startswith('#'):
+            continue
+
+        fields = line.split()
+        if len(fields) > 2:
+            raise ValueError("Invalid battle on line %d: '%s'" % (line_number, line))
+        try:
+            count = int(fields[1]) if len(fields) == 2 else 1
+        except ValueError:
+            raise ValueError("Invalid battle count on line %d: '%s'" % (line_number, line))
+
+        species = fields[0].lower()
+        battles[species] = battles.get(species, 0) + count
+    return battles
+
+
 class Pokemon(object):
+    __slots__ = ('id', 'species', '_name', 'pokerus', '_item', 'evs')
 
     @classmethod
     def from_dict(cls, dict):
@@ -62,7 +91,7 @@ class Pokemon(object):
             self._name = name.strip()
 
     def set_item(self, item):
-        if item is not None and item not in ITEMS:
+        if item is not None and item not in EV_ITEMS:
             raise ValueError("Invalid item '%s'" % item)
         self._item = item if item is not None else None
 
@@ -94,12 +123,10 @@ class Pokemon(object):
         These values are altered by pokerus and any item held. The EV
         increment can be multiplied by number to simulate multiple battles.
         '''
-        evs = species.evs.clone()
+        evs = species.evs
         if self.item is not None:
-            evs = ITEMS[self.item](evs)
-        if self.pokerus:
-            evs *= 2
-        self.evs += evs * number
+            evs = EV_ITEMS[self.item](evs)
+        self.evs += evs * (number * 2 if self.pokerus else number)
 
 
 class EvTrainer(object):
@@ -168,6 +195,42 @@ class EvTrainer(object):
             self.counter += 1
         return self.counter
 
+    def ingest(self, stream, search=None):
+        """
+        Apply a whole battle log (see read_battle_log) to every active Pokemon at once. Each species
+        is only searched once, gains for all active Pokemon are summed in a StatMatrix, and the
+        MAX_STAT/MAX_EV caps are enforced once on the final totals rather than after every battle.
+
+        :param stream: iterable of battle log lines
+        :param search: callable resolving a species name or id to a Species, Species.search by default
+        :return: total number of battles applied
+        """
+        search = Species.search if search is None else search
+        active = self.get_active()
+        battles = read_battle_log(stream)
+
+        species = {}
+        counts = {}
+        for name, count in battles.items():
+            s = search(name)
+            species[s.id] = s
+            counts[s.id] = counts.get(s.id, 0) + count
+
+        items = [p.item for p in active]
+        pokerus = [p.pokerus for p in active]
+        gains = StatMatrix(len(active))
+        for species_id, count in counts.items():
+            gains.add(StatMatrix.yields(len(active), species[species_id].evs, count, items, pokerus, EV_ITEMS))
+
+        evs = StatMatrix.from_stat_sets([p.evs for p in active]).add(gains, cap=True)
+        for p, stat_set in zip(active, evs):
+            p.evs = stat_set
+        return sum(counts.values())
+
+    def ingest_file(self, filename, search=None):
+        with open(filename) as f:
+            return self.ingest(f, search)
+
     def track(self, pokemon):
         self.pokemon[pokemon.id] = pokemon
 
@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+
+"""
+Entry point of the pokemon-trainer console script.
+
+While a daemon is running, plain species, type, move and team invocations are answered by it
+without importing the cli, whose imports (pokebase, requests, click) take most of a short
+command's time. Everything else, and anything the launcher doesn't recognize, goes to cli.main.
+"""
+import os
+import re
+import sys
+import time
+
+from . import daemon
+
+# The cli's defaults, see cli.TRAINER_PATH and cli.OUTPUT_FORMATS.
+TRAINER_PATH = os.path.expanduser(os.path.join('~', '.pokemon-trainer'))
+OUTPUT_FORMATS = ['plain', 'json', 'ndjson']
+LOOKUP_COMMANDS = ['species', 'type', 'move']
+TRUE_VALUES = ['1', 'true', 't', 'yes', 'y', 'on']
+
+_ANSI_ESCAPE = re.compile('\x1b\\[[0-9;]*m')
+
+
+def _option(args):
+    """
+    :return: (name, value, remaining args) of the option at the start of `args`, value None if
+    it is missing
+    """
+    name, sep, value = args[0].partition('=')
+    if sep:
+        return name, value, args[1:]
+    if len(args) < 2:
+        return name, None, []
+    return name, args[1], args[2:]
+
+
+def parse(args):
+    """
+    :param args: command line arguments, without the program name
+    :return: dict of what to ask the daemon, or None if the cli should handle the command
+    """
+    if os.environ.get('POKEMON_TRAINER_NO_DAEMON', '').lower() in TRUE_VALUES:
+        return None
+    if os.environ.get('POKEMON_TRAINER_API_URL'):
+        return None  # the daemon queries its own api url
+    options = {'file': TRAINER_PATH, 'socket': os.environ.get('POKEMON_TRAINER_SOCKET') or daemon.SOCKET_PATH}
+
+    while len(args) > 0 and args[0].startswith('-'):
+        name, value, args = _option(args)
+        if value is None or name not in ['-f', '--file', '--socket']:
+            return None
+        options['socket' if name == '--socket' else 'file'] = value
+    if len(args) == 0:
+        return None
+    options['file'] = os.path.realpath(options['file'])
+    command, args = args[0], args[1:]
+
+    if command in LOOKUP_COMMANDS:
+        options.update({'command': command, 'format': 'plain', 'id_or_name': []})
+        while len(args) > 0:
+            if args[0] == '--':
+                options['id_or_name'] += args[1:]
+                break
+            if args[0].startswith('-'):
+                name, value, args = _option(args)
+                if name != '--format' or value not in OUTPUT_FORMATS:
+                    return None
+                options['format'] = value
+            else:
+                options['id_or_name'].append(args[0])
+                args = args[1:]
+        return options
+
+    if command == 'team':
+        options.update({'command': command, 'id_or_name': None})
+        while len(args) > 0:
+            name, value, args = _option(args)
+            if name != '--id' or value is None:
+                return None
+            options['id_or_name'] = value
+        return options
+    return None
+
+
+def answer(options, stdout=None, stderr=None):
+    """
+    Have the daemon answer the command `parse` returned.
+
+    :return: the exit code, or None if no daemon answered
+    """
+    stdout = sys.stdout if stdout is None else stdout
+    stderr = sys.stderr if stderr is None else stderr
+    if not os.path.exists(options['socket']):
+        return None
+    client = daemon.Client(options['socket'])
+    try:
+        if options['command'] == 'team':
+            text = client.team(options['file'], options['id_or_name']) + '\n'
+        else:
+            text = client.lookups(options['command'], options['id_or_name'], options['format'])
+    except ValueError as e:
+        stderr.write('Error: %s\n' % e)
+        return 1
+    except IOError:
+        return None
+
+    if not stdout.isatty():
+        text = _ANSI_ESCAPE.sub('', text)
+    stdout.write(text)
+    stdout.flush()
+    return 0
+
+
+def main(args=None):
+    args = sys.argv[1:] if args is None else list(args)
+    options = parse(args)
+    if options is not None:
+        code = answer(options)
+        if code is not None:
+            sys.exit(code)
+
+    imported = 'pokemon_trainer.cli' in sys.modules
+    started = time.perf_counter()
+    from . import cli
+    if not imported:
+        cli.IMPORT_SECONDS = time.perf_counter() - started
+    cli.main(args)
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+
+"""
+tracemalloc snapshots for the cli's --memory option.
+
+`mark(label)` takes a snapshot when memory tracing is on and does nothing otherwise. The report
+shows, for the span between each pair of marks, how much memory was allocated and still held,
+the peak, and the modules and source lines that allocated the most.
+"""
+import os
+import sys
+import tracemalloc
+
+_tracer = None
+
+IGNORED = ['<frozen importlib._bootstrap>', '<frozen importlib._bootstrap_external>', '<unknown>',
+           tracemalloc.__file__]
+
+
+def start(frames=1):
+    global _tracer
+    if _tracer is not None:
+        raise ValueError('Memory tracing is already running')
+    _tracer = MemoryTracer(frames)
+    _tracer.mark('start')
+    return _tracer
+
+
+def mark(label):
+    if _tracer is not None:
+        _tracer.mark(label)
+
+
+def stop():
+    global _tracer
+    tracer = _tracer
+    _tracer = None
+    if tracer is not None:
+        tracer.stop()
+    return tracer
+
+
+class MemoryTracer(object):
+
+    def __init__(self, frames=1):
+        self.marks = []  # (label, snapshot, traced bytes, peak bytes since the previous mark)
+        self._started_tracemalloc = not tracemalloc.is_tracing()
+        if self._started_tracemalloc:
+            tracemalloc.start(frames)
+
+    def mark(self, label):
+        current, peak = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot().filter_traces(
+            [tracemalloc.Filter(False, filename) for filename in IGNORED])
+        self.marks.append((label, snapshot, current, peak))
+        tracemalloc.reset_peak()
+
+    def stop(self):
+        if self._started_tracemalloc and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    def report(self, limit=10):
+        """
+        :param limit: allocation sites and modules listed per span
+        :return: text report of every span between consecutive marks
+        """
+        lines = []
+        for (_, before, before_bytes, _), (label, after, after_bytes, peak) in zip(self.marks, self.marks[1:]):
+            differences = after.compare_to(before, 'lineno')
+            lines.append('%s: %+.1f KiB held, %.1f KiB peak' % (
+                label, (after_bytes - before_bytes) / 1024.0, peak / 1024.0))
+
+            modules = {}
+            for stat in differences:
+                name = module_name(stat.traceback[0].filename)
+                size, count = modules.get(name, (0, 0))
+                modules[name] = (size + stat.size_diff, count + stat.count_diff)
+            lines.append('  {:<44} {:>11} {:>9}'.format('module', 'KiB', 'blocks'))
+            for name, (size, count) in sorted(modules.items(), key=lambda item: -item[1][0])[:limit]:
+                lines.append('  {:<44} {:>+11.1f} {:>+9}'.format(name, size / 1024.0, count))
+
+            lines.append('  {:<44} {:>11} {:>9}'.format('allocation site', 'KiB', 'blocks'))
+            for stat in sorted(differences, key=lambda s: -s.size_diff)[:limit]:
+                frame = stat.traceback[0]
+                site = '%s:%d' % (module_name(frame.filename), frame.lineno)
+                lines.append('  {:<44} {:>+11.1f} {:>+9}'.format(site, stat.size_diff / 1024.0, stat.count_diff))
+            lines.append('')
+        return '\n'.join(lines).rstrip('\n')
+
+
+def module_name(filename):
+    """Dotted module name for a source file on sys.path, e.g. 'pokemon_trainer.pokemon.types'."""
+    path = os.path.abspath(filename)
+    for root in sorted([os.path.abspath(p) for p in sys.path if p], key=len, reverse=True):
+        if path.startswith(root + os.sep):
+            relative = os.path.splitext(os.path.relpath(path, root))[0]
+            parts = relative.split(os.sep)
+            if parts[-1] == '__init__':
+                parts = parts[:-1]
+            return '.'.join(parts)
+    return os.path.basename(filename)
@@ -0,0 +1,343 @@
+# -*- coding: utf-8 -*-
+
+"""
+In process counters and histograms for pokebase fetches, cache hits and the latency of searches,
+roster load/save and rendering.
+
+Metrics are always collected into REGISTRY, which is cheap. The cli can append a snapshot per run
+to a metrics file as a json line, and `pokemon-trainer stats` summarizes that file per command.
+"""
+import collections
+import functools
+import json
+import math
+import os
+import threading
+import time
+
+import pokebase as pb
+
+
+class Counter(object):
+
+    def __init__(self, name):
+        self.name = name
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+
+class Histogram(object):
+    """
+    Keeps every observation, a command makes few enough of them to summarize exactly. Long running
+    processes pass a `limit` to keep only the latest observations for the percentiles, while the
+    count and sum still cover all of them.
+    """
+
+    def __init__(self, name, limit=None):
+        self.name = name
+        self.values = [] if limit is None else collections.deque(maxlen=limit)
+        self._count = 0
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        with self._lock:
+            self.values.append(value)
+            self._count += 1
+            self._sum += value
+
+    def count(self):
+        return self._count
+
+    def sum(self):
+        return self._sum
+
+    def percentile(self, percent):
+        return percentile(self.values, percent)
+
+
+class _Timer(object):
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+        self._started = None
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self._started)
+        return False
+
+
+class Registry(object):
+    """
+    :param histogram_limit: observations each histogram keeps for its percentiles, None for all
+    """
+
+    def __init__(self, histogram_limit=None):
+        self.counters = {}
+        self.histograms = {}
+        self.histogram_limit = histogram_limit
+        self._lock = threading.Lock()
+
+    def counter(self, name):
+        with self._lock:
+            if name not in self.counters:
+                self.counters[name] = Counter(name)
+            return self.counters[name]
+
+    def histogram(self, name):
+        with self._lock:
+            if name not in self.histograms:
+                self.histograms[name] = Histogram(name, self.histogram_limit)
+            return self.histograms[name]
+
+    def timer(self, name):
+        """Context manager observing the seconds spent in the block in histogram `name`."""
+        return _Timer(self.histogram(name))
+
+    def clear(self):
+        with self._lock:
+            self.counters = {}
+            self.histograms = {}
+
+    def snapshot(self):
+        """
+        :return: json serializable dict of {'counters': {name: value}, 'histograms': {name: [values]}}
+        """
+        with self._lock:
+            return {
+                'counters': {name: c.value for name, c in self.counters.items()},
+                'histograms': {name: [round(v, 6) for v in h.values] for name, h in self.histograms.items()},
+            }
+
+
+REGISTRY = Registry()
+
+
+def counter(name):
+    return REGISTRY.counter(name)
+
+
+def histogram(name):
+    return REGISTRY.histogram(name)
+
+
+def timer(name):
+    return REGISTRY.timer(name)
+
+
+def timed(name):
+    """
+    Decorator observing each call's duration in histogram `name` and counting the calls that
+    raise in counter `name.errors`.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            except Exception:
+                REGISTRY.counter(name + '.errors').inc()
+                raise
+            finally:
+                REGISTRY.histogram(name).observe(time.perf_counter() - started)
+        return wrapper
+    return decorator
+
+
+def percentile(values, percent):
+    """Nearest rank percentile of `values`, None when there are none."""
+    if len(values) == 0:
+        return None
+    ordered = sorted(values)
+    rank = max(1, int(math.ceil(percent / 100.0 * len(ordered))))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+class _CountingRequests(object):
+    """Stands in for the `requests` module inside pokebase.api, counting and timing every GET."""
+
+    def __init__(self, requests):
+        self.requests = requests
+        self._local = threading.local()
+
+    def get(self, *args, **kwargs):
+        self._local.count = getattr(self._local, 'count', 0) + 1
+        REGISTRY.counter('pokebase.requests').inc()
+        with REGISTRY.timer('pokebase.request_seconds'):
+            return self.requests.get(*args, **kwargs)
+
+    def made(self):
+        """Number of GETs made by the current thread so far."""
+        return getattr(self._local, 'count', 0)
+
+    def __getattr__(self, name):
+        return getattr(self.requests, name)
+
+
+_originals = {}
+
+
+def instrument_pokebase():
+    """
+    Wrap pokebase's lookups so every resource loaded counts as a cache hit (read from pokebase's
+    disk cache) or a miss (downloaded). Safe to call more than once.
+    """
+    if len(_originals) > 0:
+        return
+
+    requests = _CountingRequests(pb.api.requests)
+    local = threading.local()
+
+    def counted(lookup):
+        @functools.wraps(lookup)
+        def wrapper(*args, **kwargs):
+            # lookup_data calls lookup_resource the first time a kind of resource is used, only
+            # the outermost lookup is counted.
+            depth = getattr(local, 'depth', 0)
+            if depth > 0:
+                return lookup(*args, **kwargs)
+
+            made = requests.made()
+            local.depth = depth + 1
+            try:
+                with REGISTRY.timer('pokebase.lookup_seconds'):
+                    data = lookup(*args, **kwargs)
+            finally:
+                local.depth = depth
+            REGISTRY.counter('pokebase.cache_hits' if requests.made() == made else 'pokebase.cache_misses').inc()
+            return data
+        return wrapper
+
+    _originals.update(requests=pb.api.requests, lookup_data=pb.api.lookup_data,
+                      lookup_resource=pb.api.lookup_resource)
+    pb.api.requests = requests
+    pb.api.lookup_data = counted(_originals['lookup_data'])
+    pb.api.lookup_resource = counted(_originals['lookup_resource'])
+
+
+def uninstrument_pokebase():
+    for name, value in _originals.items():
+        setattr(pb.api, name, value)
+    _originals.clear()
+
+
+def append_run(filename, command, seconds, registry=REGISTRY):
+    """
+    Append a run of `command` and a snapshot of `registry` to `filename` as one json line.
+    """
+    record = {'command': command, 'time': round(time.time(), 3), 'seconds': round(seconds, 6)}
+    record.update(registry.snapshot())
+    directory = os.path.dirname(os.path.abspath(filename))
+    os.makedirs(directory, exist_ok=True)
+    with open(filename, 'a') as f:
+        f.write(json.dumps(record, sort_keys=True) + '\n')
+
+
+def read_runs(filename):
+    """
+    :return: list of the run records in `filename`, skipping lines that aren't valid json
+    """
+    runs = []
+    with open(filename) as f:
+        for line in f:
+            try:
+                runs.append(json.loads(line))
+            except ValueError:
+                continue  # e.g. a line cut short by a crash
+    return runs
+
+
+def summarize(runs, percentiles=(50, 90, 99)):
+    """
+    Group runs by command, pooling their histograms and summing their counters.
+
+    :return: {command: {'runs': n, 'seconds': [percentile values], 'counters': {name: total},
+        'histograms': {name: (count, [percentile values])}}}
+    """
+    grouped = {}
+    for run in runs:
+        grouped.setdefault(run.get('command') or '-', []).append(run)
+
+    summary = {}
+    for command, command_runs in grouped.items():
+        counters = {}
+        observations = {}
+        for run in command_runs:
+            for name, value in run.get('counters', {}).items():
+                counters[name] = counters.get(name, 0) + value
+            for name, values in run.get('histograms', {}).items():
+                observations.setdefault(name, []).extend(values)
+
+        durations = [run['seconds'] for run in command_runs if 'seconds' in run]
+        summary[command] = {
+            'runs': len(command_runs),
+            'seconds': [percentile(durations, p) for p in percentiles],
+            'counters': counters,
+            'histograms': {name: (len(values), [percentile(values, p) for p in percentiles])
+                           for name, values in observations.items()},
+        }
+    return summary
+
+
+def format_prometheus(registry=REGISTRY, prefix='pokemon_trainer', quantiles=(0.5, 0.9, 0.99)):
+    """
+    :return: the registry in the Prometheus text format, counters as `<prefix>_<name>_total` and
+    histograms as summaries of the observations they keep
+    """
+    with registry._lock:
+        counters = sorted(registry.counters.items())
+        histograms = sorted(registry.histograms.items())
+
+    lines = []
+    for name, c in counters:
+        metric = '%s_%s_total' % (prefix, _prometheus_name(name))
+        lines += ['# TYPE %s counter' % metric, '%s %s' % (metric, c.value)]
+    for name, h in histograms:
+        metric = '%s_%s' % (prefix, _prometheus_name(name))
+        with h._lock:
+            values, count, total = list(h.values), h.count(), h.sum()
+        lines.append('# TYPE %s summary' % metric)
+        for q in quantiles:
+            value = percentile(values, q * 100)
+            lines.append('%s{quantile="%s"} %s' % (metric, q, 'NaN' if value is None else repr(value)))
+        lines += ['%s_sum %r' % (metric, total), '%s_count %d' % (metric, count)]
+    return '\n'.join(lines) + '\n'
+
+
+def _prometheus_name(name):
+    return ''.join([c if c.isalnum() or c == '_' else '_' for c in name])
+
+
+def format_summary(summary, percentiles=(50, 90, 99)):
+    headers = ['p%d ms' % p for p in percentiles]
+    lines = []
+    for command in sorted(summary.keys()):
+        stats = summary[command]
+        counters = stats['counters']
+        hits = counters.get('pokebase.cache_hits', 0)
+        misses = counters.get('pokebase.cache_misses', 0)
+        lines.append('%s: %d run%s, %.1f pokebase fetches/run, cache hit rate %s' % (
+            command, stats['runs'], '' if stats['runs'] == 1 else 's',
+            counters.get('pokebase.requests', 0) / float(stats['runs']),
+            '{:.0%}'.format(hits / float(hits + misses)) if hits + misses > 0 else 'n/a'))
+
+        lines.append('  {:<28} {:>7} '.format('metric', 'count') + ' '.join(['{:>10}'.format(h) for h in headers]))
+        rows = [('run', stats['runs'], stats['seconds'])]
+        rows += [(name, count, values) for name, (count, values) in sorted(stats['histograms'].items())]
+        for name, count, values in rows:
+            lines.append('  {:<28} {:>7} '.format(name, count) +
+                         ' '.join(['{:>10}'.format('-' if v is None else '%.2f' % (v * 1000)) for v in values]))
+        for name, value in sorted(counters.items()):
+            if name.endswith('.errors'):
+                lines.append('  {:<28} {:>7}'.format(name, value))
+        lines.append('')
+    return '\n'.join(lines).rstrip('\n')
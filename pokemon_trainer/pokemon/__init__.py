@@ -0,0 +1,7 @@
+# -*- coding: utf-8 -*-
+
+from .versions import *
+from .types import *
+from .moves import *
+from .pokedex import *
+from .teams import *
@@ -1,9 +1,15 @@
 # -*- coding: utf-8 -*-
 
+import bisect
+import json
+import os
+from array import array
 from enum import Enum
-from .types import Type, TypeCoverage
+from .types import DamageRelation, Type, TypeCoverage
 from .versions import Generation
 from .util import *
+from ..metrics import timed
+from ..tracing import span, traced
 import pokebase as pb
 import textwrap
 
@@ -14,26 +20,43 @@ class DamageClass(Enum):
     special = 3
 
 
-class Move(object):
+class Move(Fingerprinted):
 
     FIELDS = ["accuracy", "effect_chance", "effect_entries", "crit_rate", "drain", "flinch_chance", "healing", "max_hits", "max_turns",
               "min_hits", "min_turns", "stat_chance", "power", "pp"]
 
+    __slots__ = ('id', 'name', 'damage_class', 'type_', 'generation') + tuple(FIELDS)
+
+    # FrozenMoves search returned, so every move set with a move shares one.
+    interned = Interned()
+
     def __init__(self, id, name, damage_class, type_, generation, **kwargs):
+        """
+        :param kwargs: any of Move.FIELDS, the others are None
+        """
         self.id = id
         self.name = name
         self.damage_class = damage_class
         self.type_ = type_
         self.generation = generation
-        self.__dict__.update(kwargs)
+        for field in Move.FIELDS:
+            setattr(self, field, kwargs.pop(field, None))
+        if len(kwargs) > 0:
+            raise TypeError('Unknown move fields %s' % ', '.join(sorted(kwargs)))
 
     @staticmethod
     def resource_list():
         return pb.APIResourceList('move')
 
     @classmethod
+    @timed('move.search')
+    @traced('Move.search', 'id_or_name')
     def search(cls, id_or_name):
-        move = pb.move(id_or_name)
+        found = Move.interned.get(id_or_name)
+        if found is not None:
+            return found
+        with span('pokebase.move', id_or_name=id_or_name):
+            move = pb.move(id_or_name)
         damage_class = DamageClass[move.damage_class.name]
         type_ = Type.search(move.type.name)
         generation = Generation[move.generation.name.replace('-', '_')]
@@ -47,7 +70,7 @@ class Move(object):
                     data[field] = move.__dict__[field]
             elif 'meta' in move.__dict__ and field in move.meta.__dict__:
                 data[field] = move.meta.__dict__[field]
-        return cls(move.id, move.name, damage_class, type_, generation, **data)
+        return Move.interned.add(id_or_name, cls(move.id, move.name, damage_class, type_, generation, **data).freeze())
 
     @classmethod
     def from_dict(cls, data):
@@ -59,13 +82,29 @@ class Move(object):
     def type_coverage(self):
         return self.type_.type_coverage()
 
-    def __eq__(self, other):
-        if type(other) is not Move:
-            return False
-        return self.to_dict() == other.to_dict()
+    def effective_coverage(self):
+        return self.type_.effective_coverage()
+
+    def freeze(self):
+        """:return: FrozenMove with the same content"""
+        fields = {f: getattr(self, f) for f in Move.FIELDS}
+        return FrozenMove(self.id, self.name, self.damage_class, self.type_, self.generation, **fields)
+
+    def describe(self):
+        data = {
+            'id': self.id, 'name': self.name, 'damage_class': self.damage_class.name,
+            'type': self.type_.name, 'generation': self.generation.name
+        }
+        for field in Move.FIELDS:
+            data[field] = getattr(self, field)
+        data['coverage'] = self.effective_coverage().without(DamageRelation.damage_from()).to_dict()
+        return data
+
+    def _fingerprint_fields(self):
+        return self.id, self.name, self.damage_class.name
 
-    def __hash__(self):
-        return hash(str(self.to_dict()))
+    def _fingerprint_children(self):
+        return self.type_.fingerprint(),
 
     def __cmp__(self, other):
         return self.name.__cmp__(other.name)
@@ -73,7 +112,7 @@ class Move(object):
     def __str__(self):
         meta_fields = ["effect_chance", "crit_rate", "drain", "flinch_chance", "healing", "max_hits", "max_turns",
                        "min_hits", "min_turns", "stat_chance"]
-        meta = [(f, self.__dict__[f]) for f in meta_fields if self.__dict__[f] is not None]
+        meta = [(f, getattr(self, f)) for f in meta_fields if getattr(self, f) is not None]
 
         formatter = CliFormatter()
 
@@ -95,18 +134,40 @@ class Move(object):
             'pp': self.pp
         }
         return formatter.format(template, **template_data) + \
-               '\n\n' + str(self.type_coverage().effective_offensive_coverage()) + \
+               '\n\n' + str(self.effective_coverage().without(DamageRelation.damage_from())) + \
                '\n\nMeta\n' + formatter.format('{0:table_no_header}', meta)
 
 
-class MoveSet(object):
+class FrozenMove(Frozen, Move):
+    """
+    A Move that can't be changed, as Move.search returns them. Its type is a FrozenType, so its
+    coverage is computed once.
+    """
+    __slots__ = ('_memo',)
+
+    def __init__(self, id, name, damage_class, type_, generation, **kwargs):
+        super(FrozenMove, self).__init__(id, name, damage_class, type_.freeze(), generation, **kwargs)
+        self._freeze()
+
+
+class MoveSet(Fingerprinted):
+    SLOTS = ['first', 'second', 'third', 'fourth']
+
+    __slots__ = ('revision',) + tuple(SLOTS)
 
     def __init__(self, first, second=None, third=None, fourth=None):
+        self.revision = 0
         self.first = first
         self.second = second
         self.third = third
         self.fourth = fourth
 
+    def __setattr__(self, name, value):
+        # Count changes to the moves, so coverage cached from them can tell it is stale.
+        if name in MoveSet.SLOTS:
+            super(MoveSet, self).__setattr__('revision', self.revision + 1)
+        super(MoveSet, self).__setattr__(name, value)
+
     def moves(self):
         tmp = [self.first, self.second, self.third, self.fourth]
         return [m for m in tmp if m is not None]
@@ -131,6 +192,7 @@ class MoveSet(object):
         }
 
     @classmethod
+    @traced('MoveSet.from_dict')
     def from_dict(cls, data):
         moves = {
             'first': Move.from_dict(data['first']),
@@ -146,14 +208,194 @@ class MoveSet(object):
             coverage += move.type_coverage()
         return coverage
 
-    def __eq__(self, other):
-        if type(other) is not MoveSet:
-            return False
-        return self.to_dict() == other.to_dict()
-
-    def __hash__(self):
-        return hash(str(self.to_dict()))
+    def _fingerprint_children(self):
+        return tuple([m.fingerprint() if m is not None else None
+                      for m in [self.first, self.second, self.third, self.fourth]])
 
     def __str__(self):
         return '1. {0: <16} 2. {1}\n3. {2: <16} 4. {3}'.format(self.first.name, self._name_or_empty(self.second),
                                                                self._name_or_empty(self.third), self._name_or_empty(self.fourth))
+
+
+class MoveTable(object):
+    """
+    Every move in the local pokebase cache as columns: one compact array per field, a row per move,
+    so questions like "special fire moves with power 90 or more, introduced by generation IV" are
+    answered from the arrays and indexes, without building a Move for every move in the cache.
+    Moves are only built, with `search`, for the rows a query returns.
+
+    Power, accuracy and pp are None for some moves (e.g. status moves have no power), they are
+    stored as MoveTable.MISSING, which sorts before every value and never matches a bound.
+
+    :param search: function returning the Move of a name, Move.search by default
+    """
+
+    COLUMNS = ['id', 'power', 'accuracy', 'pp', 'type_id', 'damage_class', 'generation']
+    MISSING = -1
+
+    def __init__(self, search=None):
+        self.search = Move.search if search is None else search
+        self.names = []
+        self.type_names = {}  # type id -> name
+        self.columns = {name: array('h') for name in MoveTable.COLUMNS}
+        self.columns['id'] = array('l')
+        self._rows = {}  # move id -> row
+        self._index = None
+
+    @classmethod
+    def from_cache(cls, cache=None, search=None):
+        """
+        Build the table from the moves saved under `<cache>/move`, e.g. by `pokemon-trainer warm`.
+        pokebase saves a move once per name or id it was looked up by, each move is added once.
+
+        :param cache: pokebase cache directory, pokebase's current one by default
+        """
+        table = cls(search=search)
+        directory = os.path.join(pb.api.CACHE if cache is None else cache, 'move')
+        if not os.path.isdir(directory):
+            return table
+        for filename in sorted(os.listdir(directory)):
+            if not filename.endswith('.json') or filename == 'resource.json':
+                continue
+            with open(os.path.join(directory, filename)) as f:
+                table.add(json.load(f))
+        return table
+
+    def add(self, data):
+        """
+        :param data: decoded json of a move, as PokeAPI returns it
+        :return: the move's row, None if it isn't added: it is in the table already, or its damage
+            class or generation isn't one Move knows
+        """
+        try:
+            damage_class = DamageClass[data['damage_class']['name']]
+            generation = Generation[data['generation']['name'].replace('-', '_')]
+        except KeyError:
+            return None
+        if data['id'] in self._rows:
+            return None
+
+        type_id = extract_id_or_name(data['type']['url'])
+        self.type_names[type_id] = data['type']['name']
+        row = len(self.names)
+        self.names.append(data['name'])
+        values = {
+            'id': data['id'], 'type_id': type_id, 'damage_class': damage_class.value, 'generation': generation.value,
+            'power': data.get('power'), 'accuracy': data.get('accuracy'), 'pp': data.get('pp'),
+        }
+        for name, column in self.columns.items():
+            column.append(MoveTable.MISSING if values[name] is None else values[name])
+        self._rows[data['id']] = row
+        self._index = None
+        return row
+
+    def __len__(self):
+        return len(self.names)
+
+    def row(self, row):
+        """:return: dict of the row's name and columns, MISSING values as None"""
+        data = {'name': self.names[row]}
+        for name, column in self.columns.items():
+            data[name] = None if column[row] == MoveTable.MISSING else column[row]
+        data['type'] = self.type_names[data['type_id']]
+        data['damage_class'] = DamageClass(data['damage_class']).name
+        data['generation'] = Generation(data['generation']).name
+        return data
+
+    def _indexes(self):
+        """
+        Rows sorted by power with their powers (bisected for power ranges), and the rows of each
+        type and damage class, rebuilt on first use after moves are added.
+        """
+        if self._index is None:
+            power = self.columns['power']
+            by_power = array('l', sorted(range(len(self)), key=power.__getitem__))
+            by_value = {}
+            for name in ['type_id', 'damage_class']:
+                rows = {}
+                for row, value in enumerate(self.columns[name]):
+                    rows.setdefault(value, array('l')).append(row)
+                by_value[name] = rows
+            self._index = (by_power, array('h', [power[row] for row in by_power]), by_value)
+        return self._index
+
+    def query(self, type_=None, damage_class=None, min_power=None, max_power=None, min_generation=None,
+              max_generation=None, min_accuracy=None, order_by='power', descending=False, limit=None):
+        """
+        Rows of the moves matching every condition given.
+
+        :param type_: Type, type name or type id
+        :param damage_class: DamageClass or its name
+        :param min_power: lowest power, inclusive
+        :param max_power: highest power, inclusive
+        :param min_generation: Generation or its number, the earliest the move was introduced in
+        :param max_generation: Generation or its number, the latest the move was introduced in
+        :param min_accuracy: lowest accuracy, inclusive
+        :param order_by: a column in MoveTable.COLUMNS, or 'name'
+        :param descending: sort the highest first
+        :param limit: return at most this many rows
+        :return: list of rows
+        """
+        by_power, powers, by_value = self._indexes()
+        candidates = []
+        if min_power is not None or max_power is not None:
+            start = bisect.bisect_left(powers, max(min_power or 0, 0))
+            end = bisect.bisect_right(powers, max_power) if max_power is not None else len(powers)
+            candidates.append(by_power[start:end])
+        filters = []
+        if type_ is not None:
+            type_id = self._type_id(type_)
+            if type_id is None:
+                return []  # no move of an unknown type
+            candidates.append(by_value['type_id'].get(type_id, ()))
+            filters.append(('type_id', type_id, type_id))
+        if damage_class is not None:
+            value = (damage_class if isinstance(damage_class, DamageClass) else DamageClass[damage_class]).value
+            candidates.append(by_value['damage_class'].get(value, ()))
+            filters.append(('damage_class', value, value))
+        if min_power is not None or max_power is not None:
+            filters.append(('power', max(min_power or 0, 0), max_power))
+        if min_generation is not None or max_generation is not None:
+            filters.append(('generation', _generation_number(min_generation), _generation_number(max_generation)))
+        if min_accuracy is not None:
+            filters.append(('accuracy', max(min_accuracy, 0), None))
+
+        # scan the smallest index's rows, checking the rest of the conditions against the columns
+        rows = min(candidates, key=len) if len(candidates) > 0 else range(len(self))
+        for name, low, high in filters:
+            column = self.columns[name]
+            rows = [row for row in rows
+                    if (low is None or column[row] >= low) and (high is None or column[row] <= high)]
+
+        if order_by == 'name':
+            key = self.names.__getitem__
+        elif order_by in self.columns:
+            key = self.columns[order_by].__getitem__
+        else:
+            raise ValueError('Unknown column %s, expected name or one of %s' % (order_by, ', '.join(MoveTable.COLUMNS)))
+        rows = sorted(sorted(rows), key=key, reverse=descending)  # equal keys in row order
+        return rows if limit is None else rows[:limit]
+
+    def moves(self, rows):
+        """:return: list of the Moves of `rows`, from `search`"""
+        return [self.search(self.names[row]) for row in rows]
+
+    def find(self, **conditions):
+        """:return: list of the Moves matching `conditions`, see query"""
+        return self.moves(self.query(**conditions))
+
+    def _type_id(self, type_):
+        if isinstance(type_, Type):
+            return type_.id
+        if isinstance(type_, int):
+            return type_
+        for id, name in self.type_names.items():
+            if name == type_:
+                return id
+        return None
+
+
+def _generation_number(generation):
+    if generation is None or isinstance(generation, int):
+        return generation
+    return generation.value
@@ -2,11 +2,31 @@
 
 import pokebase as pb
 import math
+import operator
+from array import array
 from .types import *
 from .moves import MoveSet
+from ..metrics import timed
+from ..tracing import span, traced
+
+
+def _stat_property(index):
+    def get_stat(self):
+        return self._values[index]
+
+    def set_stat(self, value):
+        self._values[index] = int(value)
+
+    return property(get_stat, set_stat)
 
 
 class StatSet(object):
+    """
+    The six battle stats (or EVs) of a Pokemon, stored as a fixed width list ordered like
+    StatSet.STATS rather than as individual instance attributes.
+    """
+
+    __slots__ = ('_values',)
 
     STATS = ['hp', 'attack', 'defense', 'special_attack', 'special_defense', 'speed']
     LABELS = ['HP', 'Attack', 'Defense', 'Special Attack', 'Special Defense', 'Speed']
@@ -20,36 +40,58 @@ class StatSet(object):
 
     def __init__(self, hp=0, attack=0, defense=0, special_attack=0,
                  special_defense=0, speed=0):
-        self.hp = int(hp)
-        self.attack = int(attack)
-        self.defense = int(defense)
-        self.special_attack = int(special_attack)
-        self.special_defense = int(special_defense)
-        self.speed = int(speed)
+        self._values = [int(hp), int(attack), int(defense), int(special_attack), int(special_defense), int(speed)]
+
+    hp = _stat_property(0)
+    attack = _stat_property(1)
+    defense = _stat_property(2)
+    special_attack = _stat_property(3)
+    special_defense = _stat_property(4)
+    speed = _stat_property(5)
+
+    @classmethod
+    def from_values(cls, values):
+        """
+        Build a StatSet from a sequence of six ints ordered like StatSet.STATS.
+        :param values:
+        :return: StatSet
+        :raises ValueError: unless exactly six values are given
+        """
+        stat_set = cls.__new__(cls)
+        stat_set._values = StatSet._checked_values(values)
+        return stat_set
+
+    @staticmethod
+    def _checked_values(values):
+        values = [int(v) for v in values]
+        if len(values) != len(StatSet.STATS):
+            raise ValueError('Expected %d stat values, got %d' % (len(StatSet.STATS), len(values)))
+        return values
+
+    def values(self):
+        return tuple(self._values)
+
+    def total(self):
+        return sum(self._values)
 
     def __iadd__(self, other):
-        for stat in StatSet.STATS:
-            self.__dict__[stat] += other.__dict__[stat]
+        self._values = [a + b for a, b in zip(self._values, other._values)]
         return self
 
     def __add__(self, other):
-        evs = self.clone()
-        evs += other
-        return evs
+        return StatSet.from_values([a + b for a, b in zip(self._values, other._values)])
 
     def __imul__(self, integer):
-        for stat in StatSet.STATS:
-            self.__dict__[stat] *= integer
+        self._values = [v * integer for v in self._values]
         return self
 
     def __mul__(self, integer):
-        evs = self.clone()
-        for stat in StatSet.STATS:
-            evs.__dict__[stat] *= integer
-        return evs
+        return StatSet.from_values([v * integer for v in self._values])
 
     def __eq__(self, other):
-        return self.__dict__ == other.__dict__
+        if not isinstance(other, StatSet):
+            return False
+        return self.values() == other.values()
 
     def __ne__(self, other):
         return not self.__eq__(other)
@@ -59,28 +101,208 @@ class StatSet(object):
         for i in range(len(StatSet.STATS)):
             if i % math.floor(len(StatSet.STATS)/2) == 0:
                 stats += '\n'
-            stats += '{}. {0: <8}'.format(StatSet.LABELS[i], self.__dict__[StatSet.STATS[i]])
+            stats += '{}. {: <8}'.format(StatSet.LABELS[i], self._values[i])
         return stats
 
     def clone(self):
-        return StatSet(**self.to_dict())
+        return StatSet.from_values(self._values)
+
+    def freeze(self):
+        """:return: FrozenStatSet with the same values"""
+        return FrozenStatSet.from_values(self._values)
 
     def to_dict(self):
-        dict = {}
-        for stat in StatSet.STATS:
-            dict[stat] = self.__dict__[stat]
-        return dict
+        return dict(zip(StatSet.STATS, self._values))
+
+
+class FrozenStatSet(StatSet):
+    """
+    A StatSet that can't be changed, e.g. the EV yield of a FrozenSpecies. Like a tuple, += and *=
+    make a new StatSet rather than changing it.
+    """
+
+    __slots__ = ()
+
+    def __init__(self, hp=0, attack=0, defense=0, special_attack=0,
+                 special_defense=0, speed=0):
+        object.__setattr__(self, '_values', (int(hp), int(attack), int(defense), int(special_attack),
+                                             int(special_defense), int(speed)))
+
+    @classmethod
+    def from_values(cls, values):
+        stat_set = cls.__new__(cls)
+        object.__setattr__(stat_set, '_values', tuple(StatSet._checked_values(values)))
+        return stat_set
+
+    def freeze(self):
+        return self
+
+    def __setattr__(self, name, value):
+        raise AttributeError('FrozenStatSet is read only, can\'t set %s' % name)
+
+    __iadd__ = StatSet.__add__
+    __imul__ = StatSet.__mul__
+
+    def __hash__(self):
+        return hash(self._values)
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+
+def _capped_row(current, gains):
+    """
+    Add gains to a row of EVs the way the games do: a stat stops growing at MAX_STAT and all
+    gains stop once the row totals MAX_EV, with earlier stats in StatSet.STATS filled first.
+    """
+    total = sum(current)
+    row = []
+    for value, gain in zip(current, gains):
+        gain = max(0, min(gain, StatSet.MAX_STAT - value, StatSet.MAX_EV - total))
+        total += gain
+        row.append(value + gain)
+    return row
+
+
+class StatMatrix(object):
+    """
+    StatSets for many Pokemon packed into one flat, row major int array (one row of
+    len(StatSet.STATS) values per Pokemon), so EV gains can be applied to every row in one
+    pass instead of cloning a StatSet per Pokemon per battle.
+    """
+
+    WIDTH = len(StatSet.STATS)
 
+    def __init__(self, rows=0):
+        self._values = array('l', [0]) * (rows * StatMatrix.WIDTH)
 
-class Species(object):
+    @classmethod
+    def from_stat_sets(cls, stat_sets):
+        matrix = cls()
+        for stat_set in stat_sets:
+            matrix._values.extend(stat_set._values)
+        return matrix
+
+    @classmethod
+    def yields(cls, rows, evs, number=1, items=None, pokerus=None, item_effects=None):
+        """
+        Build the EV gains for battling a species `number` times, one row per Pokemon. Held items and
+        pokerus are applied the same way as ev_trainer.Pokemon.battle, but each distinct (item, pokerus)
+        combination is only computed once.
+
+        :param rows: number of Pokemon
+        :param evs: StatSet EV yield of the species battled
+        :param number: number of battles
+        :param items: per row held item names (or None), keys into item_effects
+        :param pokerus: per row pokerus flags
+        :param item_effects: map of item name to a `StatSet -> StatSet` function, e.g. ev_trainer.EV_ITEMS
+        :return: StatMatrix of gains
+        """
+        items = [None] * rows if items is None else items
+        pokerus = [False] * rows if pokerus is None else pokerus
+        if len(items) != rows or len(pokerus) != rows:
+            raise ValueError('Expected %d items and pokerus flags, got %d and %d' % (rows, len(items), len(pokerus)))
+
+        gains = {}
+        matrix = cls()
+        for item, has_pokerus in zip(items, pokerus):
+            key = (item, bool(has_pokerus))
+            if key not in gains:
+                gain = evs
+                if item is not None:
+                    gain = item_effects[item](gain)
+                gains[key] = gain * (number * 2 if has_pokerus else number)
+            matrix._values.extend(gains[key]._values)
+        return matrix
+
+    def __len__(self):
+        return len(self._values) // StatMatrix.WIDTH
+
+    def __getitem__(self, row):
+        start = self._offset(row)
+        return StatSet.from_values(self._values[start:start + StatMatrix.WIDTH])
+
+    def __setitem__(self, row, stat_set):
+        start = self._offset(row)
+        self._values[start:start + StatMatrix.WIDTH] = array('l', stat_set._values)
+
+    def __iter__(self):
+        for row in range(len(self)):
+            yield self[row]
+
+    def __eq__(self, other):
+        if type(other) is not StatMatrix:
+            return False
+        return self._values == other._values
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def to_stat_sets(self):
+        return list(self)
+
+    def totals(self):
+        width = StatMatrix.WIDTH
+        return [sum(self._values[i:i + width]) for i in range(0, len(self._values), width)]
+
+    def add(self, gains, cap=False):
+        """
+        Add a StatMatrix of gains (same number of rows) to every row in place.
+        :param gains: StatMatrix
+        :param cap: enforce StatSet.MAX_STAT and StatSet.MAX_EV on the result
+        :return: self
+        """
+        if len(gains) != len(self):
+            raise ValueError('Cannot add %d rows of gains to %d rows' % (len(gains), len(self)))
+
+        if not cap:
+            self._values = array('l', map(operator.add, self._values, gains._values))
+            return self
+
+        width = StatMatrix.WIDTH
+        values = array('l')
+        for i in range(0, len(self._values), width):
+            values.extend(_capped_row(self._values[i:i + width], gains._values[i:i + width]))
+        self._values = values
+        return self
+
+    def battle(self, evs, number=1, items=None, pokerus=None, item_effects=None, cap=True):
+        """
+        Apply the EV yield of battling a species `number` times to every row, see StatMatrix.yields.
+        :return: self
+        """
+        return self.add(StatMatrix.yields(len(self), evs, number, items, pokerus, item_effects), cap=cap)
+
+    def _offset(self, row):
+        if row < 0:
+            row += len(self)
+        if row < 0 or row >= len(self):
+            raise IndexError('StatMatrix row %d out of range' % row)
+        return row * StatMatrix.WIDTH
+
+
+class Species(Fingerprinted):
+    __slots__ = ('id', 'name', 'types', 'evs')
+
+    # FrozenSpecies search returned, so every Pokemon of a species shares one and its coverage.
+    interned = Interned()
 
     @staticmethod
     def resource_list():
         return pb.APIResourceList('pokemon')
 
     @classmethod
+    @timed('species.search')
+    @traced('Species.search', 'id_or_name')
     def search(cls, id_or_name):
-        pokemon = pb.pokemon(id_or_name)
+        species = Species.interned.get(id_or_name)
+        if species is not None:
+            return species
+        with span('pokebase.pokemon', id_or_name=id_or_name):
+            pokemon = pb.pokemon(id_or_name)
 
         battle_evs = {}
         for stat in pokemon.stats:
@@ -91,7 +313,8 @@ class Species(object):
         for t in pokemon.types:
             types.append(Type.search(t.type.name))
 
-        return cls(pokemon.id, pokemon.name, types=types, evs=StatSet(**battle_evs))
+        return Species.interned.add(id_or_name, cls(pokemon.id, pokemon.name, types=types,
+                                                    evs=StatSet(**battle_evs)).freeze())
 
     def __init__(self, id, name, types=[], evs=None):
         self.id = int(id)
@@ -100,21 +323,21 @@ class Species(object):
         self.evs = StatSet() if evs is None else evs
 
     def weak_to_types(self):
-        coverage = self.type_coverage().effective_defensive_coverage()
+        coverage = self.effective_defensive_coverage()
         return coverage[DamageRelation.DOUBLE_DAMAGE_FROM] + coverage[DamageRelation.QUADRUPLE_DAMAGE_FROM]
 
     def is_weak_to(self, type_):
         return type_ in self.weak_to_types()
 
     def immune_to_types(self):
-        coverage = self.type_coverage().effective_defensive_coverage()
+        coverage = self.effective_defensive_coverage()
         return coverage[DamageRelation.NO_DAMAGE_FROM]
 
     def is_immune_to(self, type_):
         return type_ in self.immune_to_types()
 
     def resistant_to_types(self):
-        coverage = self.type_coverage().effective_defensive_coverage()
+        coverage = self.effective_defensive_coverage()
         return coverage[DamageRelation.HALF_DAMAGE_FROM] + coverage[DamageRelation.QUARTER_DAMAGE_FROM]
 
     def is_resistant_to(self, type_):
@@ -126,22 +349,60 @@ class Species(object):
             coverage += species_t.type_coverage()
         return coverage
 
+    def effective_coverage(self):
+        return self.type_coverage().effective_coverage()
+
+    def effective_defensive_coverage(self):
+        return self.effective_coverage().without(DamageRelation.damage_to())
+
+    def freeze(self):
+        """:return: FrozenSpecies with the same content"""
+        return FrozenSpecies(self.id, self.name, types=self.types, evs=self.evs)
+
+    def describe(self):
+        return {
+            'id': self.id, 'name': self.name, 'types': [t.name for t in self.types],
+            'evs': self.evs.to_dict(),
+            'coverage': self.effective_defensive_coverage().to_dict()
+        }
+
     def __str__(self):
         type_ = ', '.join([t.name for t in self.types])
         return CliFormatter().format('#{id:0>3} {name:bold} ({type})', id=self.id, name=self.name, type=type_) + \
-               '\n\n' + str(self.type_coverage().effective_defensive_coverage())
+               '\n\n' + str(self.effective_defensive_coverage())
 
-    def __eq__(self, other):
-        return self.__dict__ == other.__dict__
+    def _fingerprint_fields(self):
+        return self.id, self.name
 
-    def __hash__(self):
-        return hash(str(self.to_dict()))
+    def _fingerprint_children(self):
+        return tuple([t.fingerprint() for t in self.types]), self.evs.values()
 
     def __cmp__(self, other):
         return self.name.__cmp__(other.name)
 
 
-class Pokemon(object):
+class FrozenSpecies(Frozen, Species):
+    """
+    A Species that can't be changed, as Species.search returns them, with a tuple of FrozenTypes and
+    a FrozenStatSet of EVs. Its coverage and effective coverage are computed once, type_coverage()
+    and effective_coverage() return copies.
+    """
+    __slots__ = ('_memo',)
+
+    def __init__(self, id, name, types=(), evs=None):
+        super(FrozenSpecies, self).__init__(id, name, tuple([t.freeze() for t in types]),
+                                            FrozenStatSet() if evs is None else evs.freeze())
+        self._freeze()
+
+    def type_coverage(self):
+        return self._memoized('type_coverage', super(FrozenSpecies, self).type_coverage)
+
+    def effective_coverage(self):
+        return self._memoized('effective_coverage', super(FrozenSpecies, self).effective_coverage)
+
+
+class Pokemon(Fingerprinted):
+    __slots__ = ('id', '_species', 'nick_name', 'pokerus', 'item', 'evs', 'stats', '_move_set', '_revision')
 
     def __init__(self, id, species, nick_name=None, pokerus=False, item=None, evs=None, stats=None, move_set=None):
         self.id = id
@@ -155,15 +416,29 @@ class Pokemon(object):
 
     name = property(lambda self: self.get_name(),
                     lambda self, name: self.set_name(name))
-
-    def __eq__(self, other):
-        if type(other) is not Pokemon:
-            return False
-
-        return self.to_dict() == other.to_dict()
-
-    def __hash__(self):
-        return hash(str(self.to_dict()))
+    species = property(lambda self: self._species,
+                       lambda self, species: self._set_coverage_attribute('_species', species))
+    move_set = property(lambda self: self._move_set,
+                        lambda self, move_set: self._set_coverage_attribute('_move_set', move_set))
+
+    def _set_coverage_attribute(self, name, value):
+        self._revision = getattr(self, '_revision', 0) + 1
+        setattr(self, name, value)
+
+    def coverage_revision(self):
+        """
+        :return: a value that changes whenever the species or the moves change, and with them
+        type_coverage()
+        """
+        return self._revision, self._move_set.revision if self._move_set is not None else None
+
+    def _fingerprint_fields(self):
+        return self.id, self.nick_name, self.pokerus, self.item
+
+    def _fingerprint_children(self):
+        # the species by id, as to_dict() saves it
+        return (self._species.id, self.evs.values(), self.stats.values(),
+                self._move_set.fingerprint() if self._move_set is not None else None)
 
     def __cmp__(self, other):
         return self.get_name().__cmp__(other.get_name())
@@ -183,13 +458,14 @@ class Pokemon(object):
 
     @classmethod
     def from_dict(cls, data):
-        data['species'] = Species.search(data['species'])
-        data['evs'] = StatSet(**data['evs'])
-        data['stats'] = StatSet(**data['stats'])
-
-        if 'move_set' in data and data['move_set'] is not None:
-            data['move_set'] = MoveSet.from_dict(**data['move_set'])
-        return cls(**data)
+        with span('Pokemon.from_dict', id=data.get('id'), species=data.get('species')):
+            data['species'] = Species.search(data['species'])
+            data['evs'] = StatSet(**data['evs'])
+            data['stats'] = StatSet(**data['stats'])
+
+            if 'move_set' in data and data['move_set'] is not None:
+                data['move_set'] = MoveSet.from_dict(data['move_set'])
+            return cls(**data)
 
     def to_dict(self):
         return {
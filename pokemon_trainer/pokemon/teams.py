@@ -3,6 +3,8 @@
 from enum import Enum
 from .types import TypeCoverage
 from .pokedex import Pokemon
+from .util import Fingerprinted
+from ..tracing import traced
 
 
 class TeamPosition(Enum):
@@ -14,47 +16,60 @@ class TeamPosition(Enum):
     sixth = 6
 
 
-class Team(object):
+class Team(Fingerprinted):
+    __slots__ = ('id', 'name', '_team', '_coverage', '_contributions', '_listeners')
 
     def __init__(self, id, name, first=None, second=None, third=None, fourth=None, fifth=None, sixth=None):
         self.id = id
         self.name = name
-        self._team = {
-            TeamPosition.first: first,
-            TeamPosition.second: second,
-            TeamPosition.third: third,
-            TeamPosition.fourth: fourth,
-            TeamPosition.fifth: fifth,
-            TeamPosition.sixth: sixth
-        }
-
-    def get_position(self, position_num):
+        # the members in TeamPosition order, position.value - 1 indexes a position
+        self._team = [first, second, third, fourth, fifth, sixth]
+        # Sum of the members' coverage, built on first use and then kept up to date as members
+        # change, with what each position added to it: position -> (pokemon, its
+        # coverage_revision() then, its type_coverage() then).
+        self._coverage = None
+        self._contributions = None
+        self._listeners = ()
+
+    @staticmethod
+    def _position(position_num):
         if isinstance(position_num, TeamPosition):
-            return self._team[position_num]
+            return position_num
         elif isinstance(position_num, int):
-            return self._team[TeamPosition(position_num)]
+            return TeamPosition(position_num)
         else:
             raise ValueError('Parameter \'position_num\' should be type TeamPosition or int, got %s' % (type(position_num)))
 
+    def get_position(self, position_num):
+        return self._team[Team._position(position_num).value - 1]
+
     def set_position(self, position_num, pokemon):
-        if isinstance(position_num, TeamPosition):
-            self._team[position_num] = pokemon
-        elif isinstance(position_num, int):
-            self._team[TeamPosition(position_num)] = pokemon
-        else:
-            raise ValueError('Parameter \'position_num\' should be type TeamPosition or int, got %s' % (type(position_num)))
+        position = Team._position(position_num)
+        previous = self._team[position.value - 1]
+        self._team[position.value - 1] = pokemon
+        if self._coverage is not None:
+            self._replace_contribution(position, pokemon)
+        for listener in self._listeners:
+            listener(self, position, previous, pokemon)
+
+    def add_listener(self, listener):
+        """
+        :param listener: called as listener(team, position, previous Pokemon, Pokemon) after each
+            set_position
+        """
+        self._listeners += (listener,)
+
+    def remove_listener(self, listener):
+        self._listeners = tuple([registered for registered in self._listeners if registered != listener])
 
     def is_full(self):
-        for pos in TeamPosition:
-            if self._team[pos] is None:
-                return False
-        return True
+        return None not in self._team
 
     def team(self, ordered=True):
         if ordered:
-            return [self._team[pos] for pos in TeamPosition]
+            return list(self._team)
         else:
-            return [val for val in self._team.values() if val is not None]
+            return [val for val in self._team if val is not None]
 
     def position_on_team(self, pokemon):
         if pokemon is not None and pokemon in self.team():
@@ -62,12 +77,48 @@ class Team(object):
         return None
 
     def type_coverage(self):
-        coverage = TypeCoverage()
-        for pokemon in self.team():
+        return self._team_coverage().copy()
+
+    def coverage_with(self, position_num, pokemon):
+        """
+        The team's coverage if `pokemon` took `position_num`, without changing the team. Only the
+        position's coverage is taken out and the new Pokemon's added, the other members aren't
+        looked at.
+
+        :param position_num: TeamPosition or int
+        :param pokemon: Pokemon to put in the position, None to leave it empty
+        :return: TypeCoverage
+        """
+        position = Team._position(position_num)
+        coverage = self._team_coverage().copy()
+        if position in self._contributions:
+            coverage -= self._contributions[position][2]
+        if pokemon is not None:
             coverage += pokemon.type_coverage()
         return coverage
 
+    def _team_coverage(self):
+        if self._coverage is None:
+            self._coverage = TypeCoverage()
+            self._contributions = {}
+            for position in TeamPosition:
+                self._replace_contribution(position, self._team[position.value - 1])
+        else:
+            for position, (pokemon, revision, _) in list(self._contributions.items()):
+                if pokemon.coverage_revision() != revision:
+                    self._replace_contribution(position, pokemon)
+        return self._coverage
+
+    def _replace_contribution(self, position, pokemon):
+        if position in self._contributions:
+            self._coverage -= self._contributions.pop(position)[2]
+        if pokemon is not None:
+            contribution = pokemon.type_coverage()
+            self._coverage += contribution
+            self._contributions[position] = (pokemon, pokemon.coverage_revision(), contribution)
+
     @classmethod
+    @traced('Team.from_dict')
     def from_dict(cls, data, pokemon_list=[]):
         existing_pokemon = {}
         if pokemon_list is not None:
@@ -87,30 +138,28 @@ class Team(object):
     def to_dict(self):
         data = {'id': self.id, 'name': self.name}
         team = {}
-        for pos in TeamPosition:
-            team[pos.name.lower()] = self._team[pos].id if self._team[pos] is not None else None
+        for pos, pokemon in zip(TeamPosition, self._team):
+            team[pos.name.lower()] = pokemon.id if pokemon is not None else None
         data['team'] = team
         return data
 
-    def __eq__(self, other):
-        if type(other) is not Team:
-            return False
-
-        return self.to_dict() == other.to_dict()
+    def _fingerprint_fields(self):
+        return self.id, self.name
 
-    def __hash__(self):
-        return hash(str(self.to_dict()))
+    def _fingerprint_children(self):
+        # the members by id, as to_dict() saves them
+        return tuple([p.id if p is not None else None for p in self._team])
 
     def __str__(self):
         coverage = self.type_coverage().effective_coverage()
         team = ''
-        for pos in TeamPosition:
-            if self._team[pos] is not None:
-                name = self._team[pos].name
-                species_types = '/'.join([t.name for t in self._team[pos].species.types])
+        for pos, pokemon in zip(TeamPosition, self._team):
+            if pokemon is not None:
+                name = pokemon.name
+                species_types = '/'.join([t.name for t in pokemon.species.types])
                 move_types = 'None'
-                if self._team[pos].move_set is not None:
-                    move_types = ', '.join([m.type_.name for m in self._team[pos].move_set.moves()])
+                if pokemon.move_set is not None:
+                    move_types = ', '.join([m.type_.name for m in pokemon.move_set.moves()])
                 team += '\n%d: %s (%s; moves: %s)' %(pos.value, name, species_types, move_types)
             else:
                 team += '\n%d: Empty' % pos.value
@@ -118,7 +167,7 @@ class Team(object):
         return 'Team - %-10s %s\n\nEffective Coverage\n%s' % (self.name, team, coverage)
 
 
-class Roster(object):
+class Roster(Fingerprinted):
 
     def __init__(self, pokemon=[], teams=[], active_team_id=None):
         self.pokemon = {}
@@ -126,8 +175,11 @@ class Roster(object):
             self.pokemon[p.id] = p
 
         self.teams = {}
+        # pokemon id -> set of (team id, TeamPosition) it holds, kept up to date by listening to
+        # the teams' set_position
+        self._positions = {}
         for t in teams:
-            self.teams[t.id] = t
+            self.add_team(t)
         self._active_team = active_team_id
 
     def active_team(self):
@@ -142,32 +194,75 @@ class Roster(object):
 
     def remove_team(self, team):
         if team is not None and team.id in self.teams:
-            del self.teams[team.id]
+            self._unindex_team(self.teams.pop(team.id))
             if self._active_team == team.id:
                 self._active_team = None
 
     def add_team(self, team, active=False):
+        if team.id in self.teams:
+            self._unindex_team(self.teams[team.id])
         self.teams[team.id] = team
+        for position in TeamPosition:
+            self._position_changed(team, position, None, team.get_position(position))
+        team.add_listener(self._position_changed)
         if active:
             self._active_team = team.id
 
+    def _unindex_team(self, team):
+        team.remove_listener(self._position_changed)
+        for position in TeamPosition:
+            self._position_changed(team, position, team.get_position(position), None)
+
+    def _position_changed(self, team, position, previous, pokemon):
+        if previous is not None and previous.id in self._positions:
+            self._positions[previous.id].discard((team.id, position))
+            if len(self._positions[previous.id]) == 0:
+                del self._positions[previous.id]
+        if pokemon is not None:
+            self._positions.setdefault(pokemon.id, set()).add((team.id, position))
+
+    def positions_of(self, pokemon):
+        """
+        :param pokemon: Pokemon, or its id
+        :return: sorted list of (team id, TeamPosition) the Pokemon holds
+        """
+        pokemon_id = pokemon.id if isinstance(pokemon, Pokemon) else pokemon
+        return sorted(self._positions.get(pokemon_id, ()), key=lambda p: (p[0], p[1].value))
+
     def get_team(self, team_id):
         return self.teams[team_id]
 
+    def find_team(self, id_or_name):
+        """
+        :param id_or_name: team id, or name
+        :return: the matching Team
+        """
+        try:
+            if int(id_or_name) in self.teams:
+                return self.teams[int(id_or_name)]
+        except (TypeError, ValueError):
+            pass
+        for t in self.teams.values():
+            if t.name == id_or_name:
+                return t
+        raise ValueError('Unknown team %s' % id_or_name)
+
     def add_pokemon(self, pokemon):
         self.pokemon[pokemon.id] = pokemon
 
     def remove_pokemon(self, pokemon):
-        if pokemon is not None and pokemon.id in self.pokemon:
+        if pokemon is None:
+            return
+        if pokemon.id in self.pokemon:
             del self.pokemon[pokemon.id]
-        for t in self.teams.values():
-            if t.position_on_team(pokemon) is not None:
-                t.set_position(t.position_on_team(pokemon), None)
+        for team_id, position in self.positions_of(pokemon):
+            self.teams[team_id].set_position(position, None)
 
     def get_pokemon(self, pokemon_id):
         return self.pokemon[pokemon_id]
 
     @classmethod
+    @traced('Roster.from_dict')
     def from_dict(cls, data):
         pokemon = []
         if 'pokemon' in data and data['pokemon'] is not None:
@@ -189,11 +284,6 @@ class Roster(object):
         }
         return data
 
-    def __eq__(self, other):
-        if type(other) is not Roster:
-            return False
-
-        return self.to_dict() == other.to_dict()
-
-    def __hash__(self):
-        return hash(str(self.to_dict()))
+    def _fingerprint_children(self):
+        return (tuple([p.fingerprint() for p in self.pokemon.values()]),
+                tuple([t.fingerprint() for t in self.teams.values()]), self._active_team)
@@ -3,6 +3,9 @@
 from enum import Enum
 from typing import List
 from .util import *
+from ..metrics import timed
+from ..profiling import phase
+from ..tracing import span, traced
 import pokebase as pb
 from inspect import Signature
 
@@ -76,7 +79,11 @@ class DamageRelation(Enum):
                 DamageRelation.NORMAL_DAMAGE_FROM, DamageRelation.DOUBLE_DAMAGE_FROM, DamageRelation.QUADRUPLE_DAMAGE_FROM]
 
 
-class Type(object):
+class Type(Fingerprinted):
+    __slots__ = ('id', 'name', '_type_coverage')
+
+    # FrozenTypes search returned, so every search for a type shares one and its effective coverage.
+    interned = Interned()
 
     def __init__(self, id, name, type_coverage=None):
         self.id = id
@@ -86,12 +93,26 @@ class Type(object):
     def type_coverage(self):
         return self._type_coverage
 
+    def effective_coverage(self):
+        return self.type_coverage().effective_coverage()
+
+    def freeze(self):
+        """:return: FrozenType with the same content"""
+        return FrozenType(self.id, self.name, self._type_coverage.clone())
+
     def set_damage_relation(self, relation, type_):
         self._type_coverage[relation].append(type_)
 
     def to_dict(self):
         return {'id': self.id, 'name': self.name}
 
+    def describe(self):
+        """
+        Plain data view of the type and its effective damage relations, suitable for json serialization.
+        :return: dict
+        """
+        return {'id': self.id, 'name': self.name, 'coverage': self.effective_coverage().to_dict()}
+
     @classmethod
     def from_dict(cls, data):
         return Type.search(data['id'])
@@ -101,25 +122,34 @@ class Type(object):
         return pb.APIResourceList('type')
 
     @classmethod
+    @timed('type.search')
+    @traced('Type.search', 'id_or_name')
     def search(cls, id_or_name):
-        pb_type_ = pb.type_(id_or_name)
-        type_ = cls(pb_type_.id, pb_type_.name)
+        type_ = Type.interned.get(id_or_name)
+        if type_ is not None:
+            return type_
+        with span('pokebase.type', id_or_name=id_or_name):
+            pb_type_ = pb.type_(id_or_name)
+        coverage = TypeCoverage()
 
         for relation in DamageRelation:
             if relation.name.lower() in pb_type_.damage_relations.__dict__:
                 for t in pb_type_.damage_relations.__dict__[relation.name.lower()]:
                     name = t['name']
                     id = extract_id_or_name(t['url'])
-                    type_.set_damage_relation(relation, Type(id, name))
-        return type_
+                    coverage[relation].append(Type(id, name))
+        return Type.interned.add(id_or_name, cls(pb_type_.id, pb_type_.name, coverage).freeze())
+
+    def _fingerprint_fields(self):
+        return self.id, self.name
 
     def __eq__(self, other):
-        if type(other) is not Type:
+        # the id and name are the whole fingerprint, compare them directly
+        if not isinstance(other, Type):
             return False
         return self.id == other.id and self.name == other.name
 
-    def __hash__(self):
-        return hash(str(self.to_dict()))
+    __hash__ = Fingerprinted.__hash__
 
     def __cmp__(self, other):
         return self.name.__cmp__(other.name)
@@ -161,6 +191,27 @@ class Type(object):
         return CliFormatter().format(template, **template_data)
 
 
+class FrozenType(Frozen, Type):
+    """
+    A Type that can't be changed, as Type.search returns them. Its effective coverage is computed
+    once, type_coverage() and effective_coverage() return copies.
+    """
+    __slots__ = ('_memo',)
+
+    def __init__(self, id, name, type_coverage=None):
+        super(FrozenType, self).__init__(id, name, type_coverage)
+        self._freeze()
+
+    def type_coverage(self):
+        return self._type_coverage.clone()
+
+    def effective_coverage(self):
+        return self._memoized('effective_coverage', lambda: self._type_coverage.effective_coverage())
+
+    def set_damage_relation(self, relation, type_):
+        raise AttributeError('FrozenType is read only, can\'t set a damage relation')
+
+
 class TypeCoverage(dict):
 
     def __init__(self, coverage=None):
@@ -255,28 +306,32 @@ class TypeCoverage(dict):
             return DamageRelation.NORMAL_DAMAGE_FROM
 
     def effective_coverage(self):
-        coverage = TypeCoverage()
-        for damage_relation, types in self:
-            if damage_relation in DamageRelation.damage_from():
-                for type_ in types:
-                    effectiveness = self.damage_effectiveness_from_type(type_)
-                    if type_ not in coverage[effectiveness]:
-                        coverage[effectiveness].append(type_)
-            else:
-                coverage[damage_relation] = list(set(types))
-        return coverage.sorted()
+        with phase('coverage'):
+            coverage = TypeCoverage()
+            for damage_relation, types in self:
+                if damage_relation in DamageRelation.damage_from():
+                    for type_ in types:
+                        effectiveness = self.damage_effectiveness_from_type(type_)
+                        if type_ not in coverage[effectiveness]:
+                            coverage[effectiveness].append(type_)
+                else:
+                    coverage[damage_relation] = list(set(types))
+            return coverage.sorted()
 
     def effective_offensive_coverage(self):
-        coverage = self.effective_coverage()
-        for damage_relation in DamageRelation.damage_from():
-            del coverage[damage_relation]
-        return coverage
+        return self.effective_coverage().without(DamageRelation.damage_from())
 
     def effective_defensive_coverage(self):
-        coverage = self.effective_coverage()
-        for damage_relation in DamageRelation.damage_to():
-            del coverage[damage_relation]
-        return coverage
+        return self.effective_coverage().without(DamageRelation.damage_to())
+
+    def without(self, damage_relations) -> 'TypeCoverage':
+        """
+        Remove damage relations, e.g. DamageRelation.damage_from() to keep the offensive coverage.
+        :return: self
+        """
+        for damage_relation in damage_relations:
+            del self[damage_relation]
+        return self
 
     def sorted(self):
         for k, v in self:
@@ -303,6 +358,15 @@ class TypeCoverage(dict):
         coverage = self._coverage.copy()
         return TypeCoverage(coverage)
 
+    def clone(self) -> 'TypeCoverage':
+        """
+        Unlike copy(), the lists of types are copied too, so changing one doesn't change the other.
+        :return: new TypeCoverage object
+        """
+        coverage = TypeCoverage.__new__(TypeCoverage)
+        coverage._coverage = {k: list(v) for k, v in self._coverage.items()}
+        return coverage
+
     def has_key(self, k):
         return k in self._coverage
 
@@ -324,6 +388,15 @@ class TypeCoverage(dict):
         self._coverage.update(*args, **kwargs)
         return self.sorted()
 
+    def to_dict(self):
+        """
+        Plain data view of the coverage map, keyed by lower case DamageRelation name. Empty
+        damage relations are left out, matching what gets rendered by __str__.
+        :return: dict of relation name to sorted list of type names
+        """
+        return {damage_relation.name.lower(): [t.name for t in sorted(types)]
+                for damage_relation, types in self if len(types) > 0}
+
     def keys(self):
         return self._coverage.keys()
 
@@ -5,7 +5,9 @@ import inspect
 import string
 import textwrap
 import re
+import threading
 import fabulous.color as color
+import pokebase as pb
 from inspect import Signature
 
 
@@ -67,6 +69,142 @@ def non_ansi_str_length(text):
     return len(scrubbed)
 
 
+class Fingerprinted(object):
+    """
+    Equality and hashing by a fingerprint of the object's content, rather than by serializing
+    it with to_dict() on every comparison.
+
+    Subclasses return what identifies them from _fingerprint_fields(), which is cached until one
+    of their attributes is set, and what can change without that happening (the fingerprints of
+    objects they hold, StatSet values) from _fingerprint_children(), which is checked on each use.
+    Objects with different ids are unequal without looking any further. Subclasses of a
+    fingerprinted class (e.g. FrozenType of Type) compare as that class.
+    """
+    __slots__ = ('_fingerprint_cache',)  # (children, fingerprint, hash)
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if Fingerprinted in cls.__bases__:
+            cls._fingerprint_kind = cls
+
+    def _fingerprint_fields(self):
+        return ()
+
+    def _fingerprint_children(self):
+        return ()
+
+    def _fingerprint_state(self):
+        children = self._fingerprint_children()
+        state = self._fingerprint_cache  # set by __setattr__ as soon as __init__ sets an attribute
+        if state is None or state[0] != children:
+            fingerprint = (self._fingerprint_kind.__name__,) + self._fingerprint_fields() + children
+            state = (children, fingerprint, hash(fingerprint))
+            object.__setattr__(self, '_fingerprint_cache', state)
+        return state
+
+    def fingerprint(self):
+        """:return: hashable tuple equal for objects with equal content"""
+        return self._fingerprint_state()[1]
+
+    def __setattr__(self, name, value):
+        object.__setattr__(self, '_fingerprint_cache', None)
+        object.__setattr__(self, name, value)
+
+    def __eq__(self, other):
+        if self is other:
+            return True
+        if getattr(other, '_fingerprint_kind', None) is not self._fingerprint_kind \
+                or getattr(self, 'id', None) != getattr(other, 'id', None):
+            return False
+        return self._fingerprint_state()[1] == other._fingerprint_state()[1]
+
+    def __hash__(self):
+        return self._fingerprint_state()[2]
+
+
+class Frozen(object):
+    """
+    Read only variant of a fingerprinted class, e.g. FrozenType(Frozen, Type), as the searches
+    return them. Attributes can only be set until __init__ calls _freeze(). Since nothing can
+    change, the fingerprint is computed once, copies are the object itself, and what is derived
+    from the content can be computed once with _memoized(). Subclasses add a '_memo' slot.
+    """
+    __slots__ = ()
+
+    def _freeze(self):
+        object.__setattr__(self, '_memo', {})
+
+    def freeze(self):
+        return self
+
+    def _memoized(self, name, compute):
+        """
+        :param name: what is computed, e.g. 'effective_coverage'
+        :param compute: function computing it the first time
+        :return: the computed value, cloned so callers can't change the memoized one
+        """
+        memo = self._memo
+        if name not in memo:
+            memo[name] = compute()
+        return memo[name].clone()
+
+    def _fingerprint_state(self):
+        state = self._fingerprint_cache
+        return state if state is not None else super()._fingerprint_state()
+
+    def __setattr__(self, name, value):
+        if getattr(self, '_memo', None) is not None:
+            raise AttributeError('%s is read only, can\'t set %s' % (type(self).__name__, name))
+        super().__setattr__(name, value)
+
+    def __delattr__(self, name):
+        raise AttributeError('%s is read only, can\'t delete %s' % (type(self).__name__, name))
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+
+class Interned(object):
+    """
+    The frozen objects a search built, by id and by name, so searching for one again returns the
+    same object and what it memoized rather than building and computing it again. Objects are kept
+    per PokeAPI url and pokebase cache, what they were built from. Safe to use from several threads.
+    """
+
+    def __init__(self):
+        self._objects = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(id_or_name):
+        return pb.api.BASE_URL, pb.api.CACHE, str(id_or_name)
+
+    def get(self, id_or_name):
+        """:return: the object interned for `id_or_name`, or None"""
+        return self._objects.get(Interned._key(id_or_name))
+
+    def add(self, id_or_name, obj):
+        """
+        Intern `obj` for its id, its name and the `id_or_name` it was searched by.
+        :return: the interned object, `obj` unless another thread interned an equal one first
+        """
+        with self._lock:
+            obj = self._objects.setdefault(Interned._key(obj.id), obj)
+            self._objects[Interned._key(obj.name)] = obj
+            self._objects[Interned._key(id_or_name)] = obj
+        return obj
+
+    def clear(self):
+        with self._lock:
+            self._objects.clear()
+
+    def __len__(self):
+        return len(set(map(id, self._objects.values())))
+
+
 class Table(object):
     def __init__(self, tabular_data, first_row_header=False, indent_level=0, col_space=2):
         self.tabular_data = tabular_data
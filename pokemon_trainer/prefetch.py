@@ -0,0 +1,260 @@
+# -*- coding: utf-8 -*-
+
+"""
+Bulk download of PokeAPI resources into the pokebase cache, for the cli's warm command.
+
+pokebase fills its cache one resource at a time, as commands ask for them. A Prefetcher walks the
+resource lists of the kinds asked for, downloads every resource in them on a thread pool and
+writes them where pokebase looks (`<cache>/<kind>/<name>.json` and `<cache>/<kind>/resource.json`
+for the lists), so later commands don't touch the network. It also downloads the lists of every
+kind the resources refer to, which pokebase loads when it builds nested references, and the
+resources Species.search and Move.search read through those references (stats, damage classes,
+generations).
+
+Files are written to a temporary name and renamed into place once complete, and resources already
+in the cache are read rather than downloaded, so the cache is the checkpoint: an interrupted run
+picks up where it stopped.
+
+pokebase's own lookups change the working directory and aren't safe to run from threads, so the
+Prefetcher talks to the api with requests directly.
+"""
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pokebase as pb
+import requests
+
+from . import metrics
+
+KINDS = {'types': 'type', 'moves': 'move', 'species': 'pokemon'}
+
+# Kinds of resource the searches load through nested references.
+FOLLOWED_KINDS = ['stat', 'move-damage-class', 'generation']
+
+# Kinds a Pokemon's learnset (its moves' version group details) refers to.
+LEARNSET_KINDS = ['move-learn-method', 'version-group']
+
+RETRY_STATUSES = [429, 500, 502, 503, 504]
+
+
+class RateLimiter(object):
+    """Spaces out calls to `wait` across threads to at most `rate` a second, None for no limit."""
+
+    def __init__(self, rate=None):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._next = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self):
+        if self.interval <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next)
+            self._next = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class WarmResult(object):
+
+    def __init__(self):
+        self.fetched = {}  # kind -> resources downloaded
+        self.cached = {}  # kind -> resources already in the cache
+        self.failed = {}  # 'kind/name' -> error
+        self._lock = threading.Lock()
+
+    def add(self, counts, kind):
+        with self._lock:
+            counts[kind] = counts.get(kind, 0) + 1
+
+    def fail(self, key, error):
+        with self._lock:
+            self.failed[key] = str(error)
+
+    def summary(self):
+        lines = ['{:<24} {:>9} {:>9}'.format('kind', 'fetched', 'cached')]
+        for kind in sorted(set(self.fetched.keys()) | set(self.cached.keys())):
+            lines.append('{:<24} {:>9} {:>9}'.format(kind, self.fetched.get(kind, 0), self.cached.get(kind, 0)))
+        for key, error in sorted(self.failed.items()):
+            lines.append('failed {}: {}'.format(key, error))
+        return '\n'.join(lines)
+
+
+class Prefetcher(object):
+    """
+    :param base_url: api to download from, defaults to pokebase's
+    :param cache: pokebase cache directory to fill, defaults to pokebase's
+    :param workers: most downloads in flight at once
+    :param rate: most requests a second across all workers, None for no limit
+    :param retries: times a request is retried after a 429, 5xx or connection error
+    :param backoff: seconds before the first retry, doubling every retry, unless the response
+        has a Retry-After header
+    """
+
+    def __init__(self, base_url=None, cache=None, workers=8, rate=20.0, retries=5, backoff=0.5, timeout=30.0):
+        self.base_url = (pb.api.BASE_URL if base_url is None else base_url).rstrip('/')
+        self.cache = pb.api.CACHE if cache is None else cache
+        self.workers = workers
+        self.limiter = RateLimiter(rate)
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+
+    def get(self, path):
+        """
+        :param path: path under the base url, e.g. 'type/grass'
+        :return: the decoded json
+        """
+        url = '/'.join([self.base_url, path])
+        for attempt in range(self.retries + 1):
+            self.limiter.wait()
+            try:
+                metrics.counter('pokebase.requests').inc()
+                with metrics.timer('pokebase.request_seconds'):
+                    response = requests.get(url, timeout=self.timeout)
+            except requests.ConnectionError:
+                if attempt == self.retries:
+                    raise
+                time.sleep(self.backoff * 2 ** attempt)
+                continue
+
+            if response.status_code in RETRY_STATUSES and attempt < self.retries:
+                time.sleep(self._retry_after(response, attempt))
+                continue
+            response.raise_for_status()
+            return response.json()
+
+    def _retry_after(self, response, attempt):
+        try:
+            return float(response.headers.get('Retry-After'))
+        except (TypeError, ValueError):
+            return self.backoff * 2 ** attempt
+
+    def resource_list(self, kind):
+        """
+        :return: the resource list of `kind`, from the cache or downloaded into it
+        """
+        filename = os.path.join(self.cache, kind, 'resource.json')
+        if os.path.exists(filename):
+            with open(filename) as f:
+                return json.load(f)
+
+        listing = self.get(kind)
+        if listing['count'] != len(listing['results']):
+            # Paged, ask for all of them the way pokebase does.
+            listing = self.get('/'.join([kind, '?limit={}'.format(listing['count'])]))
+        self._write(filename, listing)
+        return listing
+
+    def resource(self, kind, name, result):
+        """
+        Read `kind`/`name` from the cache, downloading it first if it isn't there.
+
+        :return: set of (kind, id or name) the resource refers to
+        """
+        filename = os.path.join(self.cache, kind, '{}.json'.format(name))
+        if os.path.exists(filename):
+            with open(filename) as f:
+                data = json.load(f)
+            result.add(result.cached, kind)
+        else:
+            data = self.get('/'.join([kind, name]))
+            self._write(filename, data)
+            result.add(result.fetched, kind)
+        return references(data)
+
+    def warm(self, kinds, learnsets=False):
+        """
+        :param kinds: pokebase kinds to download every resource of, e.g. ['type', 'move', 'pokemon']
+        :param learnsets: also download the move learn methods and version groups of the learnsets
+        :return: WarmResult
+        """
+        followed = set(FOLLOWED_KINDS + (LEARNSET_KINDS if learnsets else []))
+        result = WarmResult()
+        lists = {}
+        list_kinds = set(kinds)
+        referred = set()
+        wanted = set()
+        done = set()
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            while True:
+                new_lists = sorted(list_kinds - set(lists.keys()))
+                for kind, listing in zip(new_lists, pool.map(lambda k: self._try(self.resource_list, result, k, k),
+                                                             new_lists)):
+                    lists[kind] = listing
+                    if kind in kinds and listing is not None:
+                        wanted |= {(kind, name) for name in _names(listing)}
+
+                for kind, id_or_name in referred:
+                    if kind in followed and lists.get(kind) is not None:
+                        name = _name(lists[kind], id_or_name)
+                        if name is not None:
+                            wanted.add((kind, name))
+
+                todo = sorted(wanted - done)
+                if len(todo) == 0 and len(new_lists) == 0:
+                    break
+
+                futures = [pool.submit(self._try, self.resource, result, '%s/%s' % key, key[0], key[1], result)
+                           for key in todo]
+                for key, future in zip(todo, futures):
+                    done.add(key)
+                    found = future.result() or set()
+                    referred |= found
+                    list_kinds |= {kind for kind, _ in found if kind in pb.api.RESOURCES}
+        return result
+
+    @staticmethod
+    def _try(func, result, key, *args):
+        try:
+            return func(*args)
+        except (requests.RequestException, IOError, ValueError) as e:
+            result.fail(key, e)
+            return None
+
+    @staticmethod
+    def _write(filename, data):
+        directory = os.path.dirname(filename)
+        os.makedirs(directory, exist_ok=True)
+        partial = '%s.%d.%d.partial' % (filename, os.getpid(), threading.get_ident())
+        with open(partial, 'w') as f:
+            json.dump(data, f, indent=2)
+        os.replace(partial, filename)
+
+
+def references(data):
+    """
+    :param data: decoded json of a resource
+    :return: set of (kind, id or name) of every resource it refers to by url
+    """
+    found = set()
+    stack = [data]
+    while len(stack) > 0:
+        value = stack.pop()
+        if isinstance(value, dict):
+            if isinstance(value.get('url'), str):
+                parts = value['url'].rstrip('/').split('/')
+                if len(parts) >= 2:
+                    found.add((parts[-2], parts[-1]))
+            stack.extend(value.values())
+        elif isinstance(value, list):
+            stack.extend(value)
+    return found
+
+
+def _names(listing):
+    return [r.get('name', r['url'].rstrip('/').split('/')[-1]) for r in listing['results']]
+
+
+def _name(listing, id_or_name):
+    """The name pokebase files `id_or_name` under, like APIResourceList.id_to_name."""
+    for r in listing['results']:
+        last = r['url'].rstrip('/').split('/')[-1]
+        if r.get('name', last) == id_or_name or last == id_or_name:
+            return r.get('name', last)
+    return None
@@ -0,0 +1,244 @@
+# -*- coding: utf-8 -*-
+
+"""
+Per phase timing for the cli's --profile option.
+
+Code marks the phases of a command (loading the roster, fetching from pokebase, coverage math,
+rendering) with `phase(name)`. While no Profiler is active `phase` hands back a shared do nothing
+context manager, so the marks cost a global lookup and two empty method calls.
+"""
+import cProfile
+import functools
+import os
+import sys
+import threading
+import time
+
+PROFILE_FORMATS = ['pstats', 'collapsed']
+
+_profiler = None
+
+
+class _NoPhase(object):
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NO_PHASE = _NoPhase()
+
+
+class _Phase(object):
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.profiler.enter(self.name)
+        return self
+
+    def __exit__(self, *exc_info):
+        self.profiler.exit(self.name)
+        return False
+
+
+def phase(name):
+    """
+    Context manager timing the enclosed block as `name` when profiling, otherwise a no-op.
+
+    :param name: phase name, e.g. 'fetch'
+    :return:
+    """
+    if _profiler is None:
+        return _NO_PHASE
+    return _Phase(_profiler, name)
+
+
+def start(output_format=None):
+    """
+    Install a Profiler so `phase` blocks are timed.
+
+    :param output_format: None to only time phases, or one of PROFILE_FORMATS to also record a
+    cProfile ('pstats') or a collapsed stack ('collapsed') profile that Profiler.write can dump
+    :return: Profiler
+    """
+    global _profiler
+    if _profiler is not None:
+        raise ValueError('A profiler is already running')
+    time_pokebase()
+    _profiler = Profiler(output_format)
+    _profiler.start()
+    return _profiler
+
+
+def time_pokebase():
+    """
+    Time pokebase's lookups as 'fetch'. Resources pokebase loads lazily, when an attribute of a
+    nested resource is first read (a move's damage class, a pokemon's stats and types), are fetched
+    long after pb.move() and friends return, so the lookups themselves are wrapped rather than the
+    calls in the searches. The wrappers stay installed, `phase` costs nothing once the profiler
+    stops. Safe to call more than once, and after the lookups were replaced again (e.g. by
+    metrics.uninstrument_pokebase).
+    """
+    import pokebase as pb
+
+    def timed(lookup):
+        @functools.wraps(lookup)
+        def wrapper(*args, **kwargs):
+            with phase('fetch'):
+                return lookup(*args, **kwargs)
+        wrapper.timed_as_fetch = True
+        return wrapper
+
+    for name in ['lookup_data', 'lookup_resource']:
+        lookup = getattr(pb.api, name)
+        if not getattr(lookup, 'timed_as_fetch', False):
+            setattr(pb.api, name, timed(lookup))
+
+
+def stop():
+    global _profiler
+    profiler = _profiler
+    _profiler = None
+    if profiler is not None:
+        profiler.stop()
+    return profiler
+
+
+class Profiler(object):
+    """
+    Times phases by their self time: while phases are nested the clock only runs for the innermost
+    one, so the summary adds up to the wall time spent inside phases. Only the thread that started
+    the profiler is timed.
+    """
+
+    def __init__(self, output_format=None):
+        if output_format is not None and output_format not in PROFILE_FORMATS:
+            raise ValueError("Invalid profile format '%s', expected one of %s" % (output_format, PROFILE_FORMATS))
+        self.output_format = output_format
+        self.timings = {}  # name -> [calls, total seconds, self seconds]
+        self._stack = []  # [name, started, seconds spent in nested phases]
+        self._thread = threading.get_ident()
+        self._started = None
+        self._stopped = None
+        self._cprofile = None
+        self._stacks = {}  # collapsed stack -> seconds
+        self._frames = []
+        self._last = None
+
+    def start(self):
+        self._started = time.perf_counter()
+        if self.output_format == 'pstats':
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+        elif self.output_format == 'collapsed':
+            # Seed with the frames already running so their returns unwind the stack properly.
+            frame = sys._getframe()
+            while frame is not None:
+                self._frames.insert(0, _frame_label(frame))
+                frame = frame.f_back
+            self._last = time.perf_counter()
+            sys.setprofile(self._sample)
+
+    def stop(self):
+        if self._cprofile is not None:
+            self._cprofile.disable()
+        elif self.output_format == 'collapsed':
+            sys.setprofile(None)
+        self._stopped = time.perf_counter()
+
+    def record(self, name, seconds, calls=1):
+        """Add time measured elsewhere, e.g. module imports that happen before the profiler exists."""
+        timing = self.timings.setdefault(name, [0, 0.0, 0.0])
+        timing[0] += calls
+        timing[1] += seconds
+        timing[2] += seconds
+
+    def enter(self, name):
+        if threading.get_ident() != self._thread:
+            return
+        self._stack.append([name, time.perf_counter(), 0.0])
+
+    def exit(self, name):
+        if threading.get_ident() != self._thread or len(self._stack) == 0:
+            return
+        _, started, nested = self._stack.pop()
+        elapsed = time.perf_counter() - started
+        timing = self.timings.setdefault(name, [0, 0.0, 0.0])
+        timing[0] += 1
+        # Re-entering a phase that is already open (e.g. a fetch inside a fetch) is timed once.
+        if not any(frame[0] == name for frame in self._stack):
+            timing[1] += elapsed
+        timing[2] += elapsed - nested
+        if len(self._stack) > 0:
+            self._stack[-1][2] += elapsed
+
+    def wall(self):
+        stopped = time.perf_counter() if self._stopped is None else self._stopped
+        return stopped - self._started + self.timings.get('import', [0, 0.0, 0.0])[2]
+
+    def summary(self):
+        """
+        :return: table of the phases sorted by self time, with whatever wasn't in a phase as 'other'
+        """
+        wall = self.wall()
+        rows = sorted(self.timings.items(), key=lambda item: item[1][2], reverse=True)
+        other = wall - sum([timing[2] for _, timing in rows])
+
+        lines = ['{:<12} {:>7} {:>11} {:>11} {:>7}'.format('phase', 'calls', 'total ms', 'self ms', '%')]
+        for name, (calls, total, self_time) in rows:
+            lines.append('{:<12} {:>7} {:>11.1f} {:>11.1f} {:>6.1f}%'.format(
+                name, calls, total * 1000, self_time * 1000, 100 * self_time / wall if wall > 0 else 0))
+        lines.append('{:<12} {:>7} {:>11} {:>11.1f} {:>6.1f}%'.format(
+            'other', '', '', max(0.0, other) * 1000, 100 * max(0.0, other) / wall if wall > 0 else 0))
+        lines.append('{:<12} {:>7} {:>11.1f}'.format('wall', '', wall * 1000))
+        return '\n'.join(lines)
+
+    def write(self, filename):
+        """
+        Dump the recorded profile: a pstats file for 'pstats', or one 'frame;frame;frame microseconds'
+        line per stack for 'collapsed', which flamegraph.pl, speedscope and inferno read.
+
+        :param filename: path to write to
+        :return:
+        """
+        if self.output_format == 'pstats':
+            self._cprofile.dump_stats(filename)
+        elif self.output_format == 'collapsed':
+            with open(filename, 'w') as f:
+                for stack, seconds in sorted(self._stacks.items()):
+                    micros = int(round(seconds * 1e6))
+                    if micros > 0:
+                        f.write('%s %d\n' % (stack, micros))
+        else:
+            raise ValueError('Profiler was started without an output format, nothing to write')
+
+    def _sample(self, frame, event, arg):
+        now = time.perf_counter()
+        if len(self._frames) > 0:
+            stack = ';'.join(self._frames)
+            self._stacks[stack] = self._stacks.get(stack, 0.0) + now - self._last
+
+        if event == 'call':
+            self._frames.append(_frame_label(frame))
+        elif event == 'c_call':
+            self._frames.append(_builtin_label(arg))
+        elif len(self._frames) > 0:  # return, c_return, c_exception
+            self._frames.pop()
+        self._last = time.perf_counter()
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    return '%s (%s:%d)' % (code.co_name, os.path.basename(code.co_filename), code.co_firstlineno)
+
+
+def _builtin_label(func):
+    module = getattr(func, '__module__', None) or ''
+    name = getattr(func, '__qualname__', None) or getattr(func, '__name__', repr(func))
+    label = '%s.%s' % (module, name) if module else name
+    return label.replace(';', ':').replace(' ', '_')
@@ -0,0 +1,249 @@
+# -*- coding: utf-8 -*-
+
+"""
+A local HTTP json api over the cli's lookups and coverage analysis, for tools that would
+otherwise shell out to the cli: `pokemon-trainer serve`.
+
+    GET /species/<id or name>           Species.describe()
+    GET /types/<id or name>             Type.describe()
+    GET /moves/<id or name>             Move.describe()
+    GET /teams/<id or name>/coverage    a roster team and its effective coverage, 'active' for the
+                                        active team
+    GET /coverage?species=..&move=..    effective coverage of any species and moves together (repeat
+                                        the parameters, up to six species and four moves)
+    GET /matchup?species=..&type=..&move=..
+                                        damage of each attacking type or move against each species
+    GET /metrics                        REGISTRY in the Prometheus text format
+
+Unknown paths, species, types and moves answer 404 Not Found, other bad requests (missing
+parameters, a team the roster doesn't have) 400 Bad Request.
+
+Connections are handled on one asyncio event loop. Searches go through one WarmCache shared by
+every request, and the searches and analysis run on a thread pool so a slow request doesn't hold
+up the others.
+"""
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from requests import HTTPError
+
+from . import metrics
+from .daemon import WarmCache, select_team
+from .pokemon.moves import MoveSet
+from .pokemon.types import TypeCoverage
+
+HISTOGRAM_LIMIT = 10000
+MAX_SPECIES = 6
+MAX_MOVES = 4
+
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+           500: 'Internal Server Error'}
+
+
+class HttpError(Exception):
+
+    def __init__(self, status, message):
+        super(HttpError, self).__init__(message)
+        self.status = status
+
+
+class NotFound(HttpError):
+    """An unknown path, or a species, type or move no search finds."""
+
+    def __init__(self, message):
+        super(NotFound, self).__init__(404, message)
+
+
+class Server(object):
+    """
+    :param filename: roster file the team endpoints read
+    :param host: address to listen on
+    :param port: port to listen on, 0 for any free one
+    :param workers: threads running searches and analysis
+    :param cache: WarmCache to answer from, a new one by default
+    """
+
+    def __init__(self, filename, host='127.0.0.1', port=8080, workers=4, cache=None):
+        self.filename = filename
+        self.host = host
+        self.port = port
+        self.cache = WarmCache() if cache is None else cache
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='pokemon-trainer-serve')
+        self._server = None
+        self._connections = set()
+        self._routes = {
+            'species': self.lookup,
+            'types': self.lookup,
+            'moves': self.lookup,
+            'teams': self.team_coverage,
+            'coverage': self.coverage,
+            'matchup': self.matchup,
+        }
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._connection, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def serve_forever(self):
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    def close(self):
+        """Stop listening and drop the open connections, see wait_closed."""
+        if self._server is not None:
+            self._server.close()
+        for task in self._connections:
+            task.cancel()
+        self._pool.shutdown(wait=False)
+
+    async def wait_closed(self):
+        """Wait for the connections close() dropped to finish."""
+        await asyncio.gather(*self._connections, return_exceptions=True)
+        if self._server is not None:
+            await self._server.wait_closed()
+
+    async def _connection(self, reader, writer):
+        task = asyncio.current_task()
+        self._connections.add(task)
+        try:
+            while True:
+                request_line = await reader.readline()
+                if len(request_line) == 0:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get('content-length') or 0)
+                if length > 0:
+                    await reader.readexactly(length)
+
+                parts = request_line.decode('latin-1').split()
+                version = parts[2] if len(parts) == 3 else 'HTTP/1.0'
+                status, content_type, body = await self.respond(parts)
+                keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+                writer.write(('%s %d %s\r\nContent-Type: %s\r\nContent-Length: %d\r\nConnection: %s\r\n\r\n' % (
+                    version, status, REASONS.get(status, ''), content_type, len(body),
+                    'keep-alive' if keep_alive else 'close')).encode('latin-1') + body)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        except asyncio.CancelledError:
+            pass  # dropped by close()
+        finally:
+            self._connections.discard(task)
+            writer.close()
+
+    async def respond(self, request_line):
+        """
+        :param request_line: the request line split on whitespace, e.g. ['GET', '/types/fire', 'HTTP/1.1']
+        :return: (status, content type, body bytes)
+        """
+        started = time.perf_counter()
+        route = 'unknown'
+        try:
+            if len(request_line) != 3:
+                raise HttpError(400, 'Malformed request line')
+            method, target, _ = request_line
+            url = urlsplit(target)
+            path = [unquote(p) for p in url.path.strip('/').split('/') if p]
+            route = path[0] if len(path) > 0 and (path[0] in self._routes or path[0] == 'metrics') else 'unknown'
+            if method != 'GET':
+                raise HttpError(405, 'Only GET is supported')
+
+            if route == 'metrics':
+                status, content_type, body = 200, 'text/plain; version=0.0.4', metrics.format_prometheus().encode('utf8')
+            elif route == 'unknown':
+                raise NotFound('Unknown path %s' % url.path)
+            else:
+                handler = self._routes[route]
+                query = parse_qs(url.query)
+                data = await asyncio.get_running_loop().run_in_executor(self._pool, handler, path, query)
+                status, content_type, body = 200, 'application/json', json.dumps(data, sort_keys=True).encode('utf8')
+        except HttpError as e:
+            status, content_type, body = e.status, 'application/json', json.dumps({'error': str(e)}).encode('utf8')
+        except ValueError as e:
+            status, content_type, body = 400, 'application/json', json.dumps({'error': str(e)}).encode('utf8')
+        except Exception as e:
+            status, content_type, body = 500, 'application/json', json.dumps(
+                {'error': '%s: %s' % (type(e).__name__, e)}).encode('utf8')
+
+        metrics.counter('http.requests').inc()
+        metrics.counter('http.responses.%d' % status).inc()
+        metrics.histogram('http.%s' % route).observe(time.perf_counter() - started)
+        return status, content_type, body
+
+    def search(self, kind, id_or_name):
+        """
+        The cache's search, raising NotFound when no `kind` is called `id_or_name`, either because
+        pokebase doesn't know the name or because the PokeAPI answered 404.
+        """
+        try:
+            return self.cache.search(kind, id_or_name)
+        except ValueError as e:
+            raise NotFound(str(e))
+        except HTTPError as e:
+            if e.response is not None and e.response.status_code == 404:
+                raise NotFound('%s %s not found' % (kind, id_or_name))
+            raise
+
+    def lookup(self, path, query):
+        if len(path) != 2:
+            raise NotFound('Expected /%s/<id or name>' % path[0])
+        kind = {'species': 'species', 'types': 'type', 'moves': 'move'}[path[0]]
+        return self.search(kind, path[1]).describe()
+
+    def team_coverage(self, path, query):
+        if len(path) != 3 or path[2] != 'coverage':
+            raise NotFound('Expected /teams/<id or name>/coverage')
+        team = select_team(self.cache.roster(self.filename), None if path[1] == 'active' else path[1])
+        members = []
+        for pokemon in team.team(ordered=False):
+            members.append({'id': pokemon.id, 'name': pokemon.name, 'species': pokemon.species.name,
+                            'types': [t.name for t in pokemon.species.types],
+                            'moves': [m.name for m in pokemon.move_set.moves()] if pokemon.move_set else []})
+        return {'id': team.id, 'name': team.name, 'members': members,
+                'coverage': team.type_coverage().effective_coverage().to_dict()}
+
+    def coverage(self, path, query):
+        species = query.get('species', [])
+        moves = query.get('move', [])
+        if len(species) + len(moves) == 0:
+            raise HttpError(400, 'Pass at least one species or move parameter')
+        if len(species) > MAX_SPECIES or len(moves) > MAX_MOVES:
+            raise HttpError(400, 'At most %d species and %d moves' % (MAX_SPECIES, MAX_MOVES))
+
+        coverage = TypeCoverage()
+        for s in species:
+            coverage += self.search('species', s).type_coverage()
+        if len(moves) > 0:
+            coverage += MoveSet(*[self.search('move', m) for m in moves]).type_coverage()
+        return {'species': species, 'moves': moves, 'coverage': coverage.effective_coverage().to_dict()}
+
+    def matchup(self, path, query):
+        species = query.get('species', [])
+        attacks = [('type', t, self.search('type', t)) for t in query.get('type', [])]
+        attacks += [('move', m, self.search('move', m).type_) for m in query.get('move', [])]
+        if len(species) == 0 or len(attacks) == 0:
+            raise HttpError(400, 'Pass at least one species and one type or move parameter')
+
+        matchups = []
+        for s in species:
+            defender = self.search('species', s)
+            coverage = defender.type_coverage()
+            for kind, name, type_ in attacks:
+                relation = coverage.damage_effectiveness_from_type(type_)
+                matchups.append({'species': defender.name, kind: name, 'type': type_.name,
+                                 'relation': relation.name.lower(), 'multiplier': relation.multiplier()})
+        return {'matchups': matchups}
@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+
+"""
+An interactive shell running the cli's commands in one process: `pokemon-trainer shell`.
+
+The roster is loaded once and species, type and move searches go through one WarmCache, so
+repeated queries don't fetch or parse anything again. Names complete from an index of the
+species, type and move names built the first time each is completed. Commands that change the
+roster mark it changed (cli.roster_changed), and it is saved once nothing has changed for
+`save_delay` seconds, on `save`, and on leaving the shell.
+"""
+import cmd
+import shlex
+import threading
+
+import click
+
+from . import cli
+
+SAVE_DELAY = 2.0
+SHELL_COMMANDS = ['exit', 'help', 'quit', 'save']
+
+
+class Shell(cmd.Cmd):
+    """
+    :param ctx: click context of the shell command, the parent of the commands it runs
+    :param save_delay: seconds without roster changes before they are saved
+    """
+    intro = 'pokemon-trainer shell, help lists the commands, exit or Ctrl-D leaves.'
+    prompt = 'pokemon-trainer> '
+
+    def __init__(self, ctx, save_delay=SAVE_DELAY, stdin=None, stdout=None):
+        super(Shell, self).__init__(stdin=stdin, stdout=stdout)
+        if stdin is not None:
+            self.use_rawinput = False
+        self.ctx = ctx
+        self.save_delay = save_delay
+        self.names = {}  # kind -> names for completion
+        self._timer = None
+        # Commands and the debounced save take turns with the roster.
+        self._lock = threading.RLock()
+
+    def commands(self):
+        return sorted([name for name in cli.main.list_commands(self.ctx) if name not in cli.BATCH_EXCLUDED_COMMANDS]
+                      + SHELL_COMMANDS)
+
+    def preloop(self):
+        try:
+            import readline
+            readline.set_completer_delims(' \t\n')  # names like mr-mime
+        except ImportError:
+            pass
+
+    def postloop(self):
+        self.save()
+
+    def emptyline(self):
+        pass  # rather than repeat the last command
+
+    def default(self, line):
+        try:
+            args = shlex.split(line, comments=True)
+        except ValueError as e:
+            click.echo('Error: {}'.format(e), err=True)
+            return False
+        if len(args) == 0:
+            return False
+
+        with self._lock:
+            error = cli.invoke_command(self.ctx, args)
+            if self.ctx.obj.get('roster_changed'):
+                self.schedule_save()
+        if error is not None:
+            error.show()
+        return False
+
+    def do_help(self, arg):
+        """List the commands, or show the help of one."""
+        if arg:
+            return self.default('{} --help'.format(arg))
+        click.echo('Commands: {}'.format(', '.join(self.commands())))
+        click.echo('help COMMAND shows the options of a command.')
+        return False
+
+    def do_save(self, arg):
+        """Save unsaved roster changes now."""
+        if not self.save():
+            click.echo('No unsaved changes')
+        return False
+
+    def do_exit(self, arg):
+        """Leave the shell, saving unsaved roster changes."""
+        return True
+
+    do_quit = do_exit
+
+    def do_EOF(self, arg):
+        click.echo()
+        return True
+
+    def schedule_save(self):
+        """Save in save_delay seconds, unless the roster changes again before then."""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = threading.Timer(self.save_delay, self.save)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def save(self):
+        """
+        Save the roster if it changed since the last save.
+
+        :return: True if it was saved
+        """
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self.ctx.obj.get('roster_changed'):
+                return False
+            cli.save(self.ctx.obj['roster'], self.ctx.obj['filename'])
+            self.ctx.obj['roster_changed'] = False
+            return True
+
+    def completenames(self, text, *ignored):
+        return [name + ' ' for name in self.commands() if name.startswith(text)]
+
+    def completedefault(self, text, line, begidx, endidx):
+        words = line[:begidx].split()
+        command = cli.main.get_command(self.ctx, words[0])
+        if command is None:
+            return []
+        previous = words[-1] if len(words) > 1 else None
+
+        if previous == '--format':
+            candidates = cli.OUTPUT_FORMATS
+        elif previous == '--id' and words[0] == 'team':
+            candidates = [t.name for t in self.ctx.obj['roster'].teams.values()] if 'roster' in self.ctx.obj else []
+        elif text.startswith('-'):
+            candidates = [o for p in command.params for o in p.opts if o.startswith('--')] + ['--help']
+        elif words[0] in ['species', 'type', 'move']:
+            candidates = self.kind_names(words[0])
+        else:
+            candidates = []
+        return [c for c in candidates if c.startswith(text)]
+
+    def complete_help(self, text, line, begidx, endidx):
+        return [name for name in self.commands() if name.startswith(text)]
+
+    def kind_names(self, kind):
+        """
+        :param kind: 'species', 'type' or 'move'
+        :return: the names of `kind`, from the tab completion data when it is installed or else
+        pokebase's resource list, loaded once
+        """
+        if kind not in self.names:
+            argument_type, resource = {
+                'species': (cli.species_argument_type, cli.Species),
+                'type': (cli.types_argument_type, cli.Type),
+                'move': (cli.moves_argument_type, cli.Move),
+            }[kind]
+            if isinstance(argument_type, cli.TabCompleteChoice):
+                names = list(argument_type.choices)
+            else:
+                try:
+                    names = [r['name'] for r in resource.resource_list()]
+                except (IOError, ValueError):
+                    names = []  # offline without a pokebase cache, complete nothing
+            self.names[kind] = sorted(names)
+        return self.names[kind]
@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+
+"""
+Nested tracing spans for the cli's --trace option, exported as Chrome trace event json that
+chrome://tracing, Perfetto and speedscope open.
+
+Code marks interesting calls with `span(name, **args)` or the `traced` decorator. Like
+`profiling.phase`, both do nothing but check a global while no Tracer is active.
+"""
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+
+_tracer = None
+
+
+class _NoSpan(object):
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NO_SPAN = _NoSpan()
+
+
+class _Span(object):
+
+    def __init__(self, tracer, name, args):
+        self.tracer = tracer
+        self.name = name
+        self.args = args
+        self._started = None
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is not None:
+            self.args['error'] = '%s: %s' % (exc_type.__name__, exc_value)
+        self.tracer.add(self.name, self._started, time.perf_counter(), self.args)
+        return False
+
+
+def span(name, **args):
+    """
+    Context manager recording the enclosed block as a span when tracing, otherwise a no-op.
+
+    :param name: span name, e.g. 'Species.search'
+    :param args: simple values shown with the span, e.g. id_or_name='bulbasaur'
+    :return:
+    """
+    if _tracer is None:
+        return _NO_SPAN
+    return _Span(_tracer, name, args)
+
+
+def traced(name, *arg_names):
+    """
+    Decorator recording each call as a span `name`, with the values of the parameters named in
+    `arg_names` as its args.
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _tracer is None:
+                return func(*args, **kwargs)
+            values = {}
+            if len(arg_names) > 0:
+                bound = signature.bind_partial(*args, **kwargs)
+                values = {n: _simple(bound.arguments[n]) for n in arg_names if n in bound.arguments}
+            with _Span(_tracer, name, values):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _simple(value):
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    return repr(value)
+
+
+def start():
+    global _tracer
+    if _tracer is not None:
+        raise ValueError('A tracer is already running')
+    _tracer = Tracer()
+    return _tracer
+
+
+def stop():
+    global _tracer
+    tracer = _tracer
+    _tracer = None
+    return tracer
+
+
+class Tracer(object):
+
+    def __init__(self):
+        self.events = []
+        self._origin = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def add(self, name, started, finished, args=None):
+        event = {
+            'name': name, 'cat': name.split('.')[0], 'ph': 'X', 'pid': os.getpid(), 'tid': threading.get_ident(),
+            'ts': round((started - self._origin) * 1e6, 3), 'dur': round((finished - started) * 1e6, 3),
+        }
+        if args:
+            event['args'] = args
+        with self._lock:
+            self.events.append(event)
+
+    def to_dict(self):
+        """:return: the Chrome trace event document, spans in start order"""
+        with self._lock:
+            events = sorted(self.events, key=lambda e: (e['ts'], -e['dur']))
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def write(self, filename):
+        with open(filename, 'w') as f:
+            json.dump(self.to_dict(), f)
+
+    def summary(self):
+        """
+        :return: spans per name with their total time and how many repeated an earlier span's
+        args exactly, which is how N+1 fetches of the same resource show up
+        """
+        totals = {}
+        seen = set()
+        with self._lock:
+            events = list(self.events)
+        for event in sorted(events, key=lambda e: e['ts']):
+            key = (event['name'], json.dumps(event.get('args', {}), sort_keys=True))
+            count, duration, repeated = totals.get(event['name'], (0, 0.0, 0))
+            totals[event['name']] = (count + 1, duration + event['dur'],
+                                     repeated + (1 if key in seen and 'args' in event else 0))
+            seen.add(key)
+
+        lines = ['{:<24} {:>7} {:>11} {:>9}'.format('span', 'count', 'total ms', 'repeated')]
+        for name, (count, duration, repeated) in sorted(totals.items(), key=lambda item: -item[1][1]):
+            lines.append('{:<24} {:>7} {:>11.1f} {:>9}'.format(name, count, duration / 1000, repeated))
+        return '\n'.join(lines)
@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+
+"""
+Team reports that follow a roster file as it is edited: `pokemon-trainer team --watch`.
+
+Each time the file changes its data is compared with the previous version's, Pokemon by Pokemon
+and team by team, the way Roster.to_dict writes them. Only the Pokemon whose data changed are
+built again (searching their species and moves), and only the teams that changed or have a
+changed member are built and rendered again, the rest keep their previous report.
+"""
+import copy
+import os
+import time
+
+import yaml
+
+from .pokemon.pokedex import Pokemon
+from .pokemon.teams import Team
+
+
+class IncrementalReport(object):
+    """
+    :param render: function rendering a Team as text, str by default
+    """
+
+    def __init__(self, render=str):
+        self.render = render
+        self.pokemon_data = {}  # pokemon id -> data as in the file
+        self.pokemon = {}  # pokemon id -> Pokemon
+        self.team_data = {}  # team id -> data as in the file
+        self.reports = {}  # team id -> rendered team, missing until rendered again
+        self.active_team = None
+
+    def update(self, data):
+        """
+        Compare roster data with the previous update's and drop what it changed.
+
+        :param data: roster dict as Roster.to_dict returns it, None for an empty roster
+        :return: set of the ids of the teams that changed
+        """
+        data = data or {}
+        pokemon_data = {p['id']: p for p in data.get('pokemon') or []}
+        changed_pokemon = set(self.pokemon_data) - set(pokemon_data)
+        for id, p in pokemon_data.items():
+            if self.pokemon_data.get(id) != p:
+                changed_pokemon.add(id)
+        for id in changed_pokemon:
+            self.pokemon.pop(id, None)
+            if id in pokemon_data:
+                # from_dict replaces the ids in the data it is given with objects
+                self.pokemon[id] = Pokemon.from_dict(copy.deepcopy(pokemon_data[id]))
+        self.pokemon_data = pokemon_data
+
+        team_data = {t['id']: t for t in data.get('teams') or []}
+        changed_teams = set(self.team_data) - set(team_data)
+        for id, t in team_data.items():
+            if self.team_data.get(id) != t or len(_members(t) & changed_pokemon) > 0:
+                changed_teams.add(id)
+        for id in changed_teams:
+            self.reports.pop(id, None)
+        self.team_data = team_data
+        self.active_team = data.get('active_team')
+        return changed_teams
+
+    def find_team(self, id_or_name=None):
+        """
+        :param id_or_name: team id or name, the active team when None
+        :return: id of the team
+        """
+        if id_or_name is None:
+            if self.active_team is None:
+                raise ValueError('No active team, pass a team id or name')
+            return self.active_team
+        try:
+            if int(id_or_name) in self.team_data:
+                return int(id_or_name)
+        except (TypeError, ValueError):
+            pass
+        for id, t in self.team_data.items():
+            if t['name'] == id_or_name:
+                return id
+        raise ValueError('Unknown team %s' % id_or_name)
+
+    def report(self, team_id):
+        """:return: the rendered team, rendered again only if it changed since it last was"""
+        if team_id not in self.reports:
+            if team_id not in self.team_data:
+                raise ValueError('Unknown team %s' % team_id)
+            data = copy.deepcopy(self.team_data[team_id])
+            members = [self.pokemon[id] for id in _members(data) if id in self.pokemon]
+            self.reports[team_id] = self.render(Team.from_dict(data, members))
+        return self.reports[team_id]
+
+
+def _members(team_data):
+    return set([id for id in (team_data.get('team') or {}).values() if id is not None])
+
+
+_UNPOLLED = object()
+
+
+class RosterWatcher(object):
+    """
+    Polls a roster file, keeping an IncrementalReport up to date with it.
+
+    :param filename: roster file
+    :param report: IncrementalReport to update, a new one by default
+    """
+
+    def __init__(self, filename, report=None):
+        self.filename = filename
+        self.report = IncrementalReport() if report is None else report
+        self._signature = _UNPOLLED
+
+    def poll(self):
+        """
+        Update the report if the file changed since the last poll.
+
+        :return: set of the ids of the teams that changed, None if the file didn't change
+        """
+        signature = _signature(self.filename)
+        if signature == self._signature:
+            return None
+        self._signature = signature
+        data = None
+        if signature is not None:
+            with open(self.filename) as f:
+                data = yaml.safe_load(f)
+        return self.report.update(data)
+
+    def watch(self, on_change, on_error, interval=1.0, polls=None):
+        """
+        Poll the file every `interval` seconds, calling on_change(changed team ids) after each
+        change, the first poll included, or on_error(exception) when the changed file can't be
+        loaded, e.g. while it is half written. Runs until interrupted, or for `polls` polls.
+        """
+        count = 0
+        while polls is None or count < polls:
+            try:
+                changed = self.poll()
+            except (yaml.YAMLError, KeyError, TypeError, ValueError) as e:
+                on_error(e)
+            else:
+                if changed is not None:
+                    on_change(changed)
+            count += 1
+            if polls is None or count < polls:
+                time.sleep(interval)
+
+
+def _signature(filename):
+    """:return: what changes when the file is written, None if it doesn't exist"""
+    try:
+        stat = os.stat(filename)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size, stat.st_ino
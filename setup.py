@@ -55,7 +55,7 @@ setup(
     packages=find_packages(include=['pokemon_trainer']),
     entry_points={
         'console_scripts': [
-            'pokemon-trainer=pokemon_trainer.cli:main',
+            'pokemon-trainer=pokemon_trainer.launcher:main',
         ],
     },
     install_requires=requirements,
@@ -0,0 +1,357 @@
+# -*- coding: utf-8 -*-
+"""
+A local stand-in for https://pokeapi.co that serves recorded responses over real HTTP, so pokebase
+(and the pokemon-trainer cli, through --api-url) can run offline.
+
+Responses come from a corpus: the hand picked files under tests/resources (MappedCorpus, the
+default) or a directory of recorded responses (DirectoryCorpus). In record mode requests the corpus
+can't answer are forwarded to an upstream PokeAPI and the responses saved, and Faults adds latency,
+jitter, 429s and 5xx errors to test and benchmark under realistic conditions:
+
+    python tests/helpers/standin.py --corpus /tmp/corpus --record --port 8000
+    python tests/helpers/standin.py --corpus /tmp/corpus --latency 0.05 --jitter 0.02 --error-rate 0.01
+"""
+import json
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.error import HTTPError
+from urllib.parse import quote, unquote, urlsplit
+from urllib.request import Request, urlopen
+
+import click
+
+API_PATH = '/api/v2/'
+RESOURCES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'resources')
+
+# PokeAPI path (relative to /api/v2/, with the query string pokebase sends) -> file in RESOURCES_DIR
+RESOURCES = {
+    'pokemon': 'pokemon.json',
+    'pokemon/?limit=964': 'pokemon_limit.json',
+    'ability': 'ability.json',
+    'ability/?limit=293': 'ability_limit.json',
+    'pokemon-form': 'pokemon-form.json',
+    'pokemon-form/?limit=1123': 'pokemon-form_limit.json',
+    'version': 'version.json',
+    'version/?limit=30': 'version_limit.json',
+    'move': 'move.json',
+    'move/?limit=746': 'move_limit.json',
+    'pokemon-species': 'pokemon-species.json',
+    'pokemon-species/?limit=807': 'pokemon-species_limit.json',
+    'stat': 'stat.json',
+    'type': 'type.json',
+    'stat/speed': 'speed.json',
+    'characteristic': 'characteristic.json',
+    'characteristic/?limit=30': 'characteristic_limit.json',
+    'language': 'language.json',
+    'stat/special-defense': 'special-defense.json',
+    'move-damage-class': 'move-damage-class.json',
+    'stat/special-attack': 'special-attack.json',
+    'stat/defense': 'defense.json',
+    'stat/attack': 'attack.json',
+    'stat/hp': 'hp.json',
+    'generation': 'generation.json',
+    'move/pound': 'pound.json',
+    'contest-effect': 'contest-effect.json',
+    'contest-effect/?limit=33': 'contest-effect_limit.json',
+    'contest-type': 'contest-type.json',
+    'version-group': 'version-group.json',
+    'move-ailment': 'move-ailment.json',
+    'move-ailment/?limit=21': 'move-ailment_limit.json',
+    'move-category': 'move-category.json',
+    'super-contest-effect': 'super-contest-effect.json',
+    'super-contest-effect/?limit=22': 'super-contest-effect_limit.json',
+    'move-target': 'move-target.json',
+    'move-damage-class/physical': 'physical.json',
+    'generation/generation-i': 'generation-i.json',
+    'region': 'region.json',
+    'type/grass': 'grass.json',
+    'type/poison': 'poison.json',
+    'type/normal': 'normal.json',
+    'pokemon/bulbasaur': 'bulbasaur.json',
+    'contest-effect/1': 'contest-effect-1.json',
+    'super-contest-effect/5': 'super-contest-effect-5.json',
+    'contest-type/tough': 'contest-type_tough.json',
+    'berry-flavor': 'berry-flavor.json',
+    'move-target/selected-pokemon': 'move-target-selected-pokemon.json'
+}
+
+
+def resource_key(path):
+    """Normalize a request path like /api/v2/pokemon/?limit=964 to the RESOURCES key pokemon/?limit=964."""
+    parsed = urlsplit(path)
+    key = parsed.path[len(API_PATH):] if parsed.path.startswith(API_PATH) else parsed.path.lstrip('/')
+    key = key.rstrip('/')
+    if parsed.query:
+        key += '/?' + parsed.query
+    return key
+
+
+class MappedCorpus(object):
+    """Read only corpus of resource keys mapped to files, like RESOURCES."""
+
+    def __init__(self, resources=None, resources_dir=RESOURCES_DIR):
+        self.resources = RESOURCES if resources is None else resources
+        self.resources_dir = resources_dir
+
+    def get(self, key):
+        """:return: the recorded body for `key`, or None"""
+        if key not in self.resources:
+            return None
+        with open(os.path.join(self.resources_dir, self.resources[key]), 'rb') as f:
+            return f.read()
+
+    def put(self, key, body):
+        raise ValueError('Cannot record %s, the corpus in %s is read only' % (key, self.resources_dir))
+
+    def keys(self):
+        return sorted(self.resources.keys())
+
+
+class DirectoryCorpus(object):
+    """Corpus storing every resource key as one file, named by the url quoted key, in `root`."""
+
+    SUFFIX = '.json'
+
+    def __init__(self, root):
+        self.root = root
+        self._lock = threading.Lock()
+
+    def filename(self, key):
+        return os.path.join(self.root, quote(key, safe='') + self.SUFFIX)
+
+    def get(self, key):
+        try:
+            with open(self.filename(key), 'rb') as f:
+                return f.read()
+        except IOError:
+            return None
+
+    def put(self, key, body):
+        with self._lock:
+            os.makedirs(self.root, exist_ok=True)
+            temporary = self.filename(key) + '.tmp'
+            with open(temporary, 'wb') as f:
+                f.write(body)
+            os.replace(temporary, self.filename(key))
+
+    def keys(self):
+        if not os.path.isdir(self.root):
+            return []
+        return sorted([unquote(name[:-len(self.SUFFIX)]) for name in os.listdir(self.root)
+                       if name.endswith(self.SUFFIX)])
+
+
+class Faults(object):
+    """
+    What can go wrong with a request, decided independently for each one:
+
+    :param latency: seconds to wait before answering
+    :param jitter: up to this many extra seconds, uniformly at random
+    :param throttle_rate: chance of answering 429 Too Many Requests with a Retry-After header
+    :param error_rate: chance of answering one of `error_statuses`
+    :param error_statuses: 5xx statuses to pick from
+    :param retry_after: seconds sent in Retry-After
+    :param sequence: statuses forced on the first requests, in order, before the rates apply,
+        e.g. [429, 503] to test a retry deterministically
+    :param seed: seed for the random choices, for repeatable runs
+    """
+
+    def __init__(self, latency=0.0, jitter=0.0, throttle_rate=0.0, error_rate=0.0, error_statuses=(500, 502, 503),
+                 retry_after=1, sequence=None, seed=None):
+        for name, rate in [('throttle_rate', throttle_rate), ('error_rate', error_rate)]:
+            if not 0 <= rate <= 1:
+                raise ValueError('%s should be between 0 and 1, got %s' % (name, rate))
+        self.latency = latency
+        self.jitter = jitter
+        self.throttle_rate = throttle_rate
+        self.error_rate = error_rate
+        self.error_statuses = list(error_statuses)
+        self.retry_after = retry_after
+        self.sequence = list(sequence or [])
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def delay(self):
+        with self._lock:
+            return self.latency + (self._random.uniform(0, self.jitter) if self.jitter > 0 else 0.0)
+
+    def status(self):
+        """:return: the status to fail this request with, or None to answer it normally"""
+        with self._lock:
+            if len(self.sequence) > 0:
+                return self.sequence.pop(0)
+            if self.throttle_rate > 0 and self._random.random() < self.throttle_rate:
+                return 429
+            if self.error_rate > 0 and self._random.random() < self.error_rate:
+                return self._random.choice(self.error_statuses)
+        return None
+
+
+NO_FAULTS = Faults()
+
+
+class PokeApiStandIn(object):
+    """
+    Threaded HTTP server answering GET /api/v2/<resource> from a corpus. Use as a context manager,
+    and point pokebase at it with `use()` or at `base_url` from a subprocess
+    (`pokemon-trainer --api-url`).
+
+    :param resources: RESOURCES style mapping for the default MappedCorpus
+    :param resources_dir: directory the mapping's files are in
+    :param corpus: corpus to serve instead, e.g. a DirectoryCorpus
+    :param upstream: base url of a real PokeAPI, e.g. https://pokeapi.co/api/v2, to forward
+        requests the corpus can't answer to and record the responses (record mode)
+    :param faults: Faults to inject
+    """
+
+    def __init__(self, resources=None, resources_dir=RESOURCES_DIR, host='127.0.0.1', port=0, corpus=None,
+                 upstream=None, faults=None):
+        self.corpus = MappedCorpus(resources, resources_dir) if corpus is None else corpus
+        self.upstream = upstream.rstrip('/') if upstream is not None else None
+        self.faults = NO_FAULTS if faults is None else faults
+        self.requests = []
+        self.statuses = {}
+        self.recorded = []
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+        self._previous_base_url = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return 'http://%s:%d%s' % (host, port, API_PATH.rstrip('/'))
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.restore()
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+
+    def use(self):
+        """Send this process's pokebase requests to the stand-in until restore() or stop()."""
+        from pokebase import api
+        if self._previous_base_url is None:
+            self._previous_base_url = api.BASE_URL
+        api.BASE_URL = self.base_url
+        return self
+
+    def restore(self):
+        if self._previous_base_url is not None:
+            from pokebase import api
+            api.BASE_URL = self._previous_base_url
+            self._previous_base_url = None
+
+    def respond(self, path):
+        """
+        :param path: request path
+        :return: (status, body bytes, dict of extra headers)
+        """
+        key = resource_key(path)
+        delay = self.faults.delay()
+        if delay > 0:
+            time.sleep(delay)
+
+        status = self.faults.status()
+        headers = {}
+        if status == 429:
+            headers['Retry-After'] = str(self.faults.retry_after)
+            body = json.dumps({'detail': 'Request was throttled.'}).encode('utf8')
+        elif status is not None:
+            body = json.dumps({'detail': 'Injected error.'}).encode('utf8')
+        else:
+            body = self.corpus.get(key)
+            status = 200
+            if body is None and self.upstream is not None:
+                status, body = self._record(key, path)
+            elif body is None:
+                status, body = 404, json.dumps({'detail': 'Not found.'}).encode('utf8')
+
+        with self._lock:
+            self.requests.append(key)
+            self.statuses[status] = self.statuses.get(status, 0) + 1
+        return status, body, headers
+
+    def _record(self, key, path):
+        parsed = urlsplit(path)
+        relative = parsed.path[len(API_PATH):] if parsed.path.startswith(API_PATH) else parsed.path.lstrip('/')
+        url = '%s/%s' % (self.upstream, relative) + ('?' + parsed.query if parsed.query else '')
+        try:
+            with urlopen(Request(url, headers={'User-Agent': 'pokemon-trainer-standin'}), timeout=30) as response:
+                status, body = response.status, response.read()
+        except HTTPError as e:
+            return e.code, e.read()
+
+        if status == 200:
+            self.corpus.put(key, body)
+            with self._lock:
+                self.recorded.append(key)
+        return status, body
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _handler_class(self):
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                status, body, headers = stand_in.respond(self.path)
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # keep test and benchmark output quiet
+
+        return Handler
+
+
+@click.command()
+@click.option('--host', default='127.0.0.1', show_default=True)
+@click.option('--port', default=8000, show_default=True)
+@click.option('--corpus', type=click.Path(file_okay=False),
+              help='Directory of recorded responses. Defaults to the files under tests/resources.')
+@click.option('--record', is_flag=True, default=False,
+              help='Forward requests the corpus is missing to --upstream and save the responses in --corpus.')
+@click.option('--upstream', default='https://pokeapi.co/api/v2', show_default=True)
+@click.option('--latency', default=0.0, show_default=True, help='Seconds to wait before every response.')
+@click.option('--jitter', default=0.0, show_default=True, help='Up to this many more seconds, at random.')
+@click.option('--throttle-rate', default=0.0, show_default=True, help='Share of requests answered with 429.')
+@click.option('--error-rate', default=0.0, show_default=True, help='Share of requests answered with a 5xx.')
+@click.option('--seed', type=int, help='Seed the injected faults for a repeatable run.')
+def main(host, port, corpus, record, upstream, latency, jitter, throttle_rate, error_rate, seed):
+    if record and corpus is None:
+        raise click.UsageError('--record needs a --corpus directory to save the responses in')
+    faults = Faults(latency=latency, jitter=jitter, throttle_rate=throttle_rate, error_rate=error_rate, seed=seed)
+    stand_in = PokeApiStandIn(host=host, port=port, corpus=DirectoryCorpus(corpus) if corpus else None,
+                              upstream=upstream if record else None, faults=faults)
+    with stand_in:
+        click.echo('Serving PokeAPI at {}, stop with Ctrl+C'.format(stand_in.base_url))
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
+    click.echo('{} requests, statuses {}, recorded {}'.format(
+        len(stand_in.requests), stand_in.statuses, len(stand_in.recorded)))
+
+
+if __name__ == '__main__':
+    main()
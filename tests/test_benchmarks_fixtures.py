@@ -0,0 +1,21 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `benchmarks.fixtures`."""
+
+import unittest
+
+from benchmarks.fixtures import TYPE_CHART, TYPE_NAMES
+
+
+class TestFixtures(unittest.TestCase):
+
+    def test_000_type_chart_is_consistent(self):
+        assert sorted(TYPE_CHART.keys()) == sorted(TYPE_NAMES)
+        for attacker, (double, half, none) in TYPE_CHART.items():
+            for defenders in (double, half, none):
+                assert set(defenders) <= set(TYPE_NAMES), attacker
+                assert len(set(defenders)) == len(defenders), attacker
+            assert set(double) & set(half) == set(), attacker
+            assert set(double) & set(none) == set(), attacker
+            assert set(half) & set(none) == set(), attacker
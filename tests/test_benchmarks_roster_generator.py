@@ -0,0 +1,53 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `benchmarks.roster_generator`."""
+
+import copy
+import unittest
+
+from benchmarks.roster_generator import LocalCorpus, generate
+from pokemon_trainer.pokemon.pokedex import Species, StatSet
+from pokemon_trainer.pokemon.moves import Move
+from pokemon_trainer.pokemon.teams import Roster
+
+
+class TestRosterGenerator(unittest.TestCase):
+
+    def setUp(self):
+        self.corpus = LocalCorpus(species_count=20, move_count=30)
+
+    def test_000_generate_is_repeatable(self):
+        assert generate(50, 8, self.corpus, seed=3) == generate(50, 8, self.corpus, seed=3)
+        assert generate(50, 8, self.corpus, seed=3) != generate(50, 8, self.corpus, seed=4)
+
+    def test_001_generated_roster_is_valid(self):
+        data = generate(60, 10, self.corpus, seed=1)
+        assert len(data['pokemon']) == 60
+        assert len(data['teams']) == 10
+        for p in data['pokemon']:
+            evs = StatSet(**p['evs'])
+            assert evs.total() <= StatSet.MAX_EV
+            assert max(evs.values()) <= 252
+            assert p['species'] in self.corpus.species
+        for t in data['teams']:
+            members = [pid for pid in t['team'].values() if pid is not None]
+            assert len(members) == len(set(members))
+            assert all(1 <= pid <= 60 for pid in members)
+
+        with self.corpus.installed():
+            roster = Roster.from_dict(copy.deepcopy(data))
+        assert len(roster.pokemon) == 60
+        assert len(roster.teams) == 10
+        assert roster.to_dict()['teams'] == data['teams']
+        assert roster.get_pokemon(1).species is self.corpus.species[data['pokemon'][0]['species']]
+
+    def test_002_installed_restores_search(self):
+        species_search, move_search = Species.search, Move.search
+        with self.corpus.installed():
+            assert Species.search(1) is self.corpus.species[1]
+            assert Move.search('%s' % self.corpus.moves[2].name) is self.corpus.moves[2]
+            with self.assertRaises(ValueError):
+                Species.search(999)
+        assert Species.search == species_search
+        assert Move.search == move_search
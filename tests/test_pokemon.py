@@ -6,7 +6,7 @@ import os
 import shutil
 import httpretty
 
-from pokemon_trainer import pokemon
+from pokemon_trainer import pokemon, ev_trainer
 from pokebase import api
 from httpretty import httprettified
 
@@ -83,6 +83,67 @@ class TestPokemonStatSet(unittest.TestCase):
         }
         assert ev_dict == excepted_dict
 
+    def test_009_stat_set_from_values(self):
+        ev1 = pokemon.StatSet.from_values([1, 2, 3, 4, 5, 6])
+        assert ev1 == pokemon.StatSet(1, 2, 3, 4, 5, 6)
+        assert ev1.values() == (1, 2, 3, 4, 5, 6)
+        assert ev1.total() == 21
+        self.assertRaises(ValueError, pokemon.StatSet.from_values, [1, 2, 3, 4, 5])
+        self.assertRaises(ValueError, pokemon.StatSet.from_values, [1, 2, 3, 4, 5, 6, 7])
+        self.assertRaises(ValueError, pokemon.FrozenStatSet.from_values, [1, 2, 3, 4, 5])
+
+    def test_010_stat_set_attribute_assignment(self):
+        ev1 = pokemon.StatSet()
+        ev1.speed = '4'
+        assert ev1.speed == 4
+        assert ev1.to_dict()['speed'] == 4
+        self.assertRaises(AttributeError, setattr, ev1, 'luck', 1)
+
+
+class TestPokemonStatMatrix(unittest.TestCase):
+
+    def test_000_stat_matrix_round_trip(self):
+        stat_sets = [pokemon.StatSet(hp=1), pokemon.StatSet(speed=2)]
+        matrix = pokemon.StatMatrix.from_stat_sets(stat_sets)
+        assert len(matrix) == 2
+        assert matrix.to_stat_sets() == stat_sets
+        assert matrix[-1] == pokemon.StatSet(speed=2)
+        self.assertRaises(IndexError, matrix.__getitem__, 2)
+
+    def test_001_stat_matrix_add(self):
+        matrix = pokemon.StatMatrix.from_stat_sets([pokemon.StatSet(hp=1), pokemon.StatSet(hp=2)])
+        gains = pokemon.StatMatrix.from_stat_sets([pokemon.StatSet(attack=3), pokemon.StatSet(hp=4)])
+        matrix.add(gains)
+        assert matrix.to_stat_sets() == [pokemon.StatSet(hp=1, attack=3), pokemon.StatSet(hp=6)]
+        self.assertRaises(ValueError, matrix.add, pokemon.StatMatrix(3))
+
+    def test_002_stat_matrix_battle_matches_pokemon_battle(self):
+        species = pokemon.Species(1, 'bulbasaur', evs=pokemon.StatSet(special_attack=1))
+        tracked = [ev_trainer.Pokemon(1, species),
+                   ev_trainer.Pokemon(2, species, item='Macho Brace'),
+                   ev_trainer.Pokemon(3, species, item='Power Anklet', pokerus=True),
+                   ev_trainer.Pokemon(4, species, pokerus=True)]
+
+        matrix = pokemon.StatMatrix(len(tracked))
+        matrix.battle(species.evs, 3, items=[p.item for p in tracked], pokerus=[p.pokerus for p in tracked],
+                      item_effects=ev_trainer.EV_ITEMS)
+        for p in tracked:
+            p.battle(species, 3)
+        assert matrix.to_stat_sets() == [p.evs for p in tracked]
+
+    def test_003_stat_matrix_battle_caps(self):
+        matrix = pokemon.StatMatrix.from_stat_sets([pokemon.StatSet(hp=250),
+                                                    pokemon.StatSet(hp=255, attack=250, defense=3)])
+        matrix.battle(pokemon.StatSet(hp=3, attack=3, defense=3), 2)
+        assert matrix[0] == pokemon.StatSet(hp=255, attack=6, defense=6)
+        assert matrix[1] == pokemon.StatSet(hp=255, attack=252, defense=3)
+        assert matrix.totals() == [267, pokemon.StatSet.MAX_EV]
+
+    def test_004_stat_matrix_battle_uncapped(self):
+        matrix = pokemon.StatMatrix.from_stat_sets([pokemon.StatSet(hp=255)])
+        matrix.battle(pokemon.StatSet(hp=3), cap=False)
+        assert matrix[0] == pokemon.StatSet(hp=258)
+
 
 class TestPokemonSpecies(unittest.TestCase):
     """Tests for `pokemon_trainer` package."""
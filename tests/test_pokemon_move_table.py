@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `pokemon_trainer.pokemon.moves.MoveTable`."""
+
+import copy
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from pokemon_trainer.pokemon.moves import DamageClass, MoveTable
+from pokemon_trainer.pokemon.types import Type
+from pokemon_trainer.pokemon.versions import Generation
+
+RESOURCES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'resources')
+TYPE_IDS = {'normal': 1, 'fire': 10, 'water': 11}
+
+# name, type, damage class, power, generation
+MOVES = [
+    ('ember', 'fire', 'special', 40, 'generation-i'),
+    ('flamethrower', 'fire', 'special', 90, 'generation-i'),
+    ('fire-blast', 'fire', 'special', 110, 'generation-i'),
+    ('heat-wave', 'fire', 'special', 95, 'generation-iii'),
+    ('flare-blitz', 'fire', 'physical', 120, 'generation-iv'),
+    ('blue-flare', 'fire', 'special', 130, 'generation-v'),
+    ('will-o-wisp', 'fire', 'status', None, 'generation-iii'),
+    ('surf', 'water', 'special', 90, 'generation-i'),
+    ('max-flare', 'fire', 'physical', 100, 'generation-viii'),  # a generation Move doesn't know
+]
+
+
+def move_data(id, name, type_, damage_class, power, generation):
+    with open(os.path.join(RESOURCES_DIR, 'pound.json')) as f:
+        data = json.load(f)
+    data.update({'id': id, 'name': name, 'power': power,
+                 'type': {'name': type_, 'url': 'https://pokeapi.co/api/v2/type/%d/' % TYPE_IDS[type_]},
+                 'damage_class': {'name': damage_class, 'url': 'https://pokeapi.co/api/v2/move-damage-class/1/'},
+                 'generation': {'name': generation, 'url': 'https://pokeapi.co/api/v2/generation/1/'}})
+    return data
+
+
+class TestPokemonMoveTable(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix='pokemon-trainer-move-table-')
+        os.makedirs(os.path.join(self.directory, 'move'))
+        for i, move in enumerate(MOVES):
+            self.write(move[0], move_data(i + 1, *move))
+        self.write('2', move_data(2, *MOVES[1]))  # looked up by id as well as by name
+        self.write('resource', {'count': len(MOVES), 'results': []})
+        self.searched = []
+
+        def search(name):
+            self.searched.append(name)
+            return name
+        self.table = MoveTable.from_cache(self.directory, search=search)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def write(self, name, data):
+        with open(os.path.join(self.directory, 'move', '%s.json' % name), 'w') as f:
+            json.dump(data, f)
+
+    def names(self, **conditions):
+        return [self.table.names[row] for row in self.table.query(**conditions)]
+
+    def test_000_from_cache(self):
+        assert len(self.table) == len(MOVES) - 1
+        assert sorted(self.table.names) == sorted([m[0] for m in MOVES[:-1]])
+        row = self.table.names.index('will-o-wisp')
+        assert self.table.row(row) == {'name': 'will-o-wisp', 'id': 7, 'power': None, 'accuracy': 100, 'pp': 35,
+                                       'type_id': 10, 'type': 'fire', 'damage_class': 'status',
+                                       'generation': 'generation_iii'}
+        assert self.table.add(copy.deepcopy(move_data(1, *MOVES[0]))) is None
+        assert len(MoveTable.from_cache(os.path.join(self.directory, 'missing'))) == 0
+
+    def test_001_query(self):
+        assert self.names(type_='fire', damage_class=DamageClass.special, min_power=90,
+                          max_generation=Generation.generation_iv) == ['flamethrower', 'heat-wave', 'fire-blast']
+        assert self.names(type_=Type(10, 'fire'), damage_class='special', min_power=90, max_generation=4,
+                          order_by='power', descending=True, limit=2) == ['fire-blast', 'heat-wave']
+        assert self.names(max_power=95, order_by='name') == ['ember', 'flamethrower', 'heat-wave', 'surf']
+        assert self.names(type_=11) == ['surf']
+        assert self.names(type_='grass') == []
+        assert self.names(min_generation=Generation.generation_iv, order_by='id') == ['flare-blitz', 'blue-flare']
+        assert self.names(order_by='power')[0] == 'will-o-wisp'  # no power sorts first
+        assert 'will-o-wisp' not in self.names(min_power=0)
+        self.assertRaises(ValueError, self.table.query, order_by='priority')
+
+    def test_002_moves_built_for_results_only(self):
+        assert self.table.find(damage_class='physical') == ['flare-blitz']
+        assert self.searched == ['flare-blitz']
+        self.table.add(move_data(20, 'flame-wheel', 'fire', 'physical', 60, 'generation-ii'))
+        assert self.names(damage_class='physical', order_by='power') == ['flame-wheel', 'flare-blitz']
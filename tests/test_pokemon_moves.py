@@ -103,8 +103,7 @@ class TestPokemonMove(unittest.TestCase):
         move = Move.search(1)
         assert move == expected
         for k, v in meta.items():
-            assert k in move.__dict__
-            assert v == move.__dict__[k]
+            assert v == getattr(move, k)
 
     @httprettified(allow_net_connect=False)
     def test_006_move_from_dict(self):
@@ -133,8 +132,7 @@ class TestPokemonMove(unittest.TestCase):
         move = Move.from_dict(expected.to_dict())
         assert move == expected
         for k, v in meta.items():
-            assert k in move.__dict__
-            assert v == move.__dict__[k]
+            assert v == getattr(move, k)
 
 
 class TestPokemonMoveSet(unittest.TestCase):
@@ -0,0 +1,167 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `pokemon_trainer.pokemon.teams`."""
+
+import unittest
+from unittest.mock import patch
+
+from pokemon_trainer import ev_trainer
+from pokemon_trainer.pokemon.moves import DamageClass, Move, MoveSet
+from pokemon_trainer.pokemon.pokedex import Pokemon, Species, StatSet
+from pokemon_trainer.pokemon.teams import Roster, Team, TeamPosition
+from pokemon_trainer.pokemon.types import DamageRelation, Type, TypeCoverage
+from pokemon_trainer.pokemon.versions import Generation
+
+
+def make_type(id, name, weak_to=None, strong_against=None):
+    type_ = Type(id, name)
+    if weak_to is not None:
+        type_.set_damage_relation(DamageRelation.DOUBLE_DAMAGE_FROM, weak_to)
+    if strong_against is not None:
+        type_.set_damage_relation(DamageRelation.DOUBLE_DAMAGE_TO, strong_against)
+    return type_
+
+
+class TestPokemonTeamCoverage(unittest.TestCase):
+
+    def setUp(self):
+        fire, water, grass = Type(10, 'fire'), Type(11, 'water'), Type(12, 'grass')
+        self.types = {
+            'fire': make_type(10, 'fire', weak_to=water, strong_against=grass),
+            'water': make_type(11, 'water', weak_to=grass, strong_against=fire),
+            'grass': make_type(12, 'grass', weak_to=fire, strong_against=water),
+        }
+        self.pokemon = [
+            Pokemon(1, Species(1, 'bulbasaur', types=[self.types['grass']])),
+            Pokemon(2, Species(4, 'charmander', types=[self.types['fire']])),
+            Pokemon(3, Species(7, 'squirtle', types=[self.types['water']])),
+        ]
+        self.ember = Move(52, 'ember', DamageClass.special, self.types['fire'], Generation.generation_i)
+        self.bubble = Move(145, 'bubble', DamageClass.special, self.types['water'], Generation.generation_i)
+
+    def summed(self, team):
+        coverage = TypeCoverage()
+        for pokemon in team.team(ordered=False):
+            coverage += pokemon.type_coverage()
+        return coverage
+
+    def test_000_set_position_updates_coverage(self):
+        team = Team(1, 'starters', first=self.pokemon[0], second=self.pokemon[1])
+        assert team.type_coverage() == self.summed(team)
+        with patch.object(Pokemon, 'type_coverage', autospec=True, side_effect=Pokemon.type_coverage) as computed:
+            team.set_position(3, self.pokemon[2])
+            team.set_position(TeamPosition.first, None)
+            team.set_position(2, self.pokemon[2])
+            coverage = team.type_coverage()
+        assert [c[0][0].id for c in computed.call_args_list] == [3, 3]
+        assert coverage == self.summed(team)
+        assert coverage[DamageRelation.DOUBLE_DAMAGE_FROM] == [Type(12, 'grass'), Type(12, 'grass')]
+
+        coverage += self.pokemon[0].type_coverage()  # a copy, the team's is untouched
+        assert team.type_coverage() == self.summed(team)
+
+    def test_001_move_set_changes_invalidate(self):
+        team = Team(1, 'starters', first=self.pokemon[0])
+        team.type_coverage()
+        self.pokemon[0].move_set = MoveSet(self.ember)
+        assert team.type_coverage() == self.summed(team)
+        assert Type(12, 'grass') in team.type_coverage()[DamageRelation.DOUBLE_DAMAGE_TO]
+
+        self.pokemon[0].move_set.second = self.bubble
+        assert team.type_coverage() == self.summed(team)
+        assert Type(10, 'fire') in team.type_coverage()[DamageRelation.DOUBLE_DAMAGE_TO]
+
+        self.pokemon[0].species = self.pokemon[1].species
+        assert team.type_coverage() == self.summed(team)
+        # charmander's water weakness on top of ember's
+        assert team.type_coverage()[DamageRelation.DOUBLE_DAMAGE_FROM].count(Type(11, 'water')) == 2
+
+    def test_002_coverage_with(self):
+        team = Team(1, 'starters', first=self.pokemon[0], second=self.pokemon[1])
+        before = team.type_coverage()
+        with patch.object(Pokemon, 'type_coverage', autospec=True, side_effect=Pokemon.type_coverage) as computed:
+            swapped = team.coverage_with(2, self.pokemon[2])
+            emptied = team.coverage_with(TeamPosition.second, None)
+        assert [c[0][0].id for c in computed.call_args_list] == [3]
+        assert team.type_coverage() == before
+        assert team.get_position(2) is self.pokemon[1]
+
+        assert swapped == self.summed(Team(2, 'swapped', first=self.pokemon[0], second=self.pokemon[2]))
+        assert emptied == self.summed(Team(3, 'emptied', first=self.pokemon[0]))
+        with self.assertRaises(ValueError):
+            team.coverage_with('2', None)
+
+
+class TestPokemonRosterPositions(unittest.TestCase):
+
+    def setUp(self):
+        self.pokemon = [Pokemon(i, Species(i, 'species-%d' % i)) for i in range(1, 5)]
+        p = self.pokemon
+        self.roster = Roster(p, [Team(1, 'one', first=p[0], second=p[1]), Team(2, 'two', first=p[1], third=p[0])])
+
+    def test_000_positions_follow_the_teams(self):
+        p = self.pokemon
+        assert self.roster.positions_of(p[0]) == [(1, TeamPosition.first), (2, TeamPosition.third)]
+        assert self.roster.positions_of(2) == [(1, TeamPosition.second), (2, TeamPosition.first)]
+        assert self.roster.positions_of(p[2]) == []
+
+        self.roster.get_team(1).set_position(TeamPosition.first, p[2])
+        assert self.roster.positions_of(p[0]) == [(2, TeamPosition.third)]
+        assert self.roster.positions_of(p[2]) == [(1, TeamPosition.first)]
+
+        self.roster.add_team(Team(3, 'three', sixth=p[3]))
+        assert self.roster.positions_of(p[3]) == [(3, TeamPosition.sixth)]
+        self.roster.add_team(Team(3, 'three again', fifth=p[2]))
+        assert self.roster.positions_of(p[3]) == []
+        assert self.roster.positions_of(p[2]) == [(1, TeamPosition.first), (3, TeamPosition.fifth)]
+
+        removed = self.roster.get_team(2)
+        self.roster.remove_team(removed)
+        assert self.roster.positions_of(p[1]) == [(1, TeamPosition.second)]
+        removed.set_position(1, p[3])  # no longer part of the roster
+        assert self.roster.positions_of(p[3]) == []
+
+    def test_001_remove_pokemon(self):
+        p = self.pokemon
+        with patch.object(Pokemon, 'to_dict', side_effect=AssertionError('compared by serializing')):
+            self.roster.remove_pokemon(p[0])
+        assert 1 not in self.roster.pokemon
+        assert self.roster.get_team(1).get_position(1) is None
+        assert self.roster.get_team(2).get_position(3) is None
+        assert self.roster.get_team(2).get_position(1) is p[1]
+        assert self.roster.positions_of(p[0]) == []
+        self.roster.remove_pokemon(None)
+
+
+class TestPokemonCompact(unittest.TestCase):
+
+    def setUp(self):
+        grass = make_type(12, 'grass')
+        self.move = Move(22, 'vine-whip', DamageClass.physical, grass, Generation.generation_i, power=45)
+        self.species = Species(1, 'bulbasaur', types=[grass])
+        self.pokemon = Pokemon(7, self.species, nick_name='bulby', evs=StatSet(hp=4), move_set=MoveSet(self.move))
+
+    def test_000_no_instance_dicts(self):
+        team = Team(1, 'starters', third=self.pokemon)
+        for obj in [self.move, self.pokemon.move_set, self.pokemon, team, ev_trainer.Pokemon(7, self.species)]:
+            assert not hasattr(obj, '__dict__'), obj
+            self.assertRaises(AttributeError, setattr, obj, 'level', 5)
+        assert self.move.power == 45 and self.move.pp is None
+        self.assertRaises(TypeError, Move, 1, 'pound', DamageClass.physical, Type(1, 'normal'), Generation.generation_i,
+                          level=5)
+
+    def test_001_team_dict_round_trip(self):
+        team = Team(1, 'starters', third=self.pokemon)
+        data = team.to_dict()
+        assert data == {'id': 1, 'name': 'starters', 'team': {'first': None, 'second': None, 'third': 7,
+                                                              'fourth': None, 'fifth': None, 'sixth': None}}
+        loaded = Team.from_dict(data, [self.pokemon])
+        assert loaded == team
+        assert loaded.team() == [None, None, self.pokemon, None, None, None]
+        assert loaded.team(ordered=False) == [self.pokemon]
+        assert loaded.get_position(TeamPosition.third) is self.pokemon and not loaded.is_full()
+
+        with patch.object(Species, 'search', return_value=self.species), \
+                patch.object(Move, 'search', return_value=self.move):
+            assert Pokemon.from_dict(self.pokemon.to_dict()) == self.pokemon
@@ -9,6 +9,7 @@ import httpretty
 from httpretty import httprettified
 import os
 import shutil
+from unittest.mock import patch
 
 from pokemon_trainer import ev_trainer
 from pokebase import api
@@ -275,4 +276,70 @@ def https_redirect(url, status, body):
     httpretty.register_uri(httpretty.GET, url, match_querystring=True, status=301, location=target)
 
     with open(body) as f:
-        httpretty.register_uri(httpretty.GET, target, match_querystring=True, status=status, body=f.read())
\ No newline at end of file
+        httpretty.register_uri(httpretty.GET, target, match_querystring=True, status=status, body=f.read())
+
+
+class TestPokemonTrainerBattleLog(unittest.TestCase):
+    """Tests for `pokemon_trainer.ev_trainer` battle log ingestion."""
+
+    def setUp(self):
+        """Set up test fixtures, if any."""
+        self.pokedex = {
+            'bulbasaur': ev_trainer.Species(1, 'bulbasaur', evs=ev_trainer.StatSet(special_attack=1)),
+            'pidgey': ev_trainer.Species(16, 'pidgey', evs=ev_trainer.StatSet(speed=1)),
+            'machamp': ev_trainer.Species(68, 'machamp', evs=ev_trainer.StatSet(attack=3)),
+        }
+        self.pokedex['16'] = self.pokedex['pidgey']
+        self.searches = []
+
+    def search(self, id_or_name):
+        self.searches.append(id_or_name)
+        return self.pokedex[id_or_name]
+
+    def test_000_read_battle_log(self):
+        log = ['# route 1', 'pidgey 3', '', 'Bulbasaur', 'pidgey 2']
+        assert ev_trainer.read_battle_log(log) == {'pidgey': 5, 'bulbasaur': 1}
+
+    def test_001_read_battle_log_invalid(self):
+        self.assertRaises(ValueError, ev_trainer.read_battle_log, ['pidgey three'])
+        self.assertRaises(ValueError, ev_trainer.read_battle_log, ['pidgey 3 4'])
+
+    def test_002_ingest_matches_battle(self):
+        trainer = ev_trainer.EvTrainer()
+        tracked = [ev_trainer.Pokemon(1, self.pokedex['bulbasaur']),
+                   ev_trainer.Pokemon(2, self.pokedex['bulbasaur'], item='Power Anklet', pokerus=True)]
+        expected = [ev_trainer.Pokemon(1, self.pokedex['bulbasaur']),
+                    ev_trainer.Pokemon(2, self.pokedex['bulbasaur'], item='Power Anklet', pokerus=True)]
+        for p in tracked:
+            trainer.track(p)
+            trainer.add_active(p)
+        for p in expected:
+            p.battle(self.pokedex['pidgey'], 4)
+            p.battle(self.pokedex['machamp'], 2)
+
+        battles = trainer.ingest(['pidgey 3', 'machamp 2', '16'], self.search)
+        assert battles == 6
+        assert sorted(self.searches) == ['16', 'machamp', 'pidgey']
+        assert [p.evs for p in tracked] == [p.evs for p in expected]
+
+    def test_003_ingest_caps_once_at_end(self):
+        trainer = ev_trainer.EvTrainer()
+        p = ev_trainer.Pokemon(1, self.pokedex['bulbasaur'], evs=ev_trainer.StatSet(attack=250, speed=250))
+        trainer.track(p)
+        trainer.active = p
+        trainer.ingest(['machamp 10', 'pidgey 10'], self.search)
+        assert p.evs == ev_trainer.StatSet(attack=255, speed=255)
+
+    def test_004_ingest_requires_active(self):
+        trainer = ev_trainer.EvTrainer()
+        self.assertRaises(ev_trainer.NoActivePokemon, trainer.ingest, ['pidgey'], self.search)
+
+    def test_005_ingest_searches_species_by_default(self):
+        trainer = ev_trainer.EvTrainer()
+        p = ev_trainer.Pokemon(1, self.pokedex['bulbasaur'])
+        trainer.track(p)
+        trainer.active = p
+        with patch.object(ev_trainer.Species, 'search', side_effect=self.search):
+            assert trainer.ingest(['machamp 2']) == 2
+        assert self.searches == ['machamp']
+        assert p.evs == ev_trainer.StatSet(attack=6)
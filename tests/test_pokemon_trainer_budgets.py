@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Request budgets: how many PokeAPI requests commands and roster loads may make.
+
+Slowdowns in pokemon_trainer mostly come from extra fetches rather than cpu, so these fail when a
+change makes more requests than it used to. The budgets are the exact counts made today, so any
+extra request fails; lower them when a change saves requests.
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import yaml
+from click.testing import CliRunner
+from pokebase import api
+
+from pokemon_trainer import cli
+from pokemon_trainer.pokemon.pokedex import Species
+
+from tests.helpers.standin import PokeApiStandIn
+from tests.helpers.utils import request_budget
+
+STATS = {'hp': 45, 'attack': 49, 'defense': 49, 'special_attack': 65, 'special_defense': 65, 'speed': 45}
+MOVE_SET = {'first': {'id': 1}, 'second': None, 'third': None, 'fourth': None}
+ROSTER = {
+    'pokemon': [{'id': i, 'species': 1, 'evs': {}, 'stats': dict(STATS), 'move_set': dict(MOVE_SET)}
+                for i in range(1, 7)],
+    'teams': [{'id': 1, 'name': 'starters',
+               'team': {'first': 1, 'second': 2, 'third': 3, 'fourth': 4, 'fifth': 5, 'sixth': 6}}],
+    'active_team': 1,
+}
+
+
+class TestPokemonTrainerBudgets(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix='pokemon-trainer-budgets-')
+        self.cache = api.CACHE
+        self.base_url = api.BASE_URL
+        api.set_cache(os.path.join(self.directory, 'cache'))
+        self.stand_in = PokeApiStandIn().start()
+        self.stand_in.use()
+        self.roster = os.path.join(self.directory, 'roster.yml')
+        with open(self.roster, 'w') as f:
+            yaml.dump(ROSTER, f)
+
+    def tearDown(self):
+        self.stand_in.stop()
+        api.BASE_URL = self.base_url
+        api.set_cache(self.cache)
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def species(self, *args):
+        result = CliRunner().invoke(cli.main, ['--api-url', self.stand_in.base_url, 'species'] + list(args))
+        assert result.exit_code == 0, result.output
+        return result
+
+    def test_000_budget_counts_requests(self):
+        with request_budget() as budget:
+            api.lookup_data('type', 'grass')
+        assert budget.count == len(self.stand_in.requests)
+        assert budget.urls[-1].endswith('/type/grass')
+
+        with self.assertRaises(AssertionError) as raised:
+            with request_budget(0):
+                api.lookup_data('type', 'poison')
+        assert 'budget is 0' in str(raised.exception)
+        assert 'type/poison' in str(raised.exception)
+
+    def test_001_species_cold_cache(self):
+        with request_budget(28):
+            self.species('bulbasaur')
+
+    def test_002_species_warm_cache(self):
+        self.species('bulbasaur')
+        with request_budget(0):
+            self.species('bulbasaur')
+
+    def test_003_species_repeated_in_one_command(self):
+        with request_budget(28):
+            self.species('bulbasaur', 'bulbasaur', '1')
+
+    def test_004_roster_load_cold_cache(self):
+        with request_budget(43):
+            roster = cli.load(self.roster)
+        assert len(roster.pokemon) == 6
+
+    def test_005_roster_load_warm_cache(self):
+        cli.load(self.roster)
+        with request_budget(0):
+            roster = cli.load(self.roster)
+        assert roster.get_pokemon(6).species == Species.search(1)
@@ -4,10 +4,18 @@
 """Tests for `pokemon_trainer` package."""
 
 
+import json
+import os
+import tempfile
 import unittest
+from unittest.mock import patch
 from click.testing import CliRunner
+from pokebase import api
 
 from pokemon_trainer import cli
+from pokemon_trainer.pokemon.types import Type, DamageRelation
+from pokemon_trainer.pokemon.pokedex import Pokemon, Species, StatSet
+from pokemon_trainer.pokemon.teams import Team
 
 
 class TestPokemonTrainerCli(unittest.TestCase):
@@ -25,3 +33,230 @@ class TestPokemonTrainerCli(unittest.TestCase):
         result = runner.invoke(cli.main, ['--help'])
         assert result.exit_code == 0
         assert 'Usage' in result.output
+
+    def test_001_type_json_format(self):
+        normal = Type(1, 'normal')
+        normal.set_damage_relation(DamageRelation.NO_DAMAGE_TO, Type(8, 'ghost'))
+        runner = CliRunner()
+        with patch.object(cli.Type, 'search', side_effect=lambda id_or_name: normal):
+            result = runner.invoke(cli.main, ['type', 'normal', '1', '--format', 'json'])
+        assert result.exit_code == 0
+        records = json.loads(result.output)
+        assert len(records) == 2
+        assert records[0] == {'id': 1, 'name': 'normal', 'coverage': {'no_damage_to': ['ghost']}}
+        assert records[0]['coverage'] == normal.effective_coverage().to_dict()
+        assert '\x1b' not in result.output
+
+    def test_002_species_ndjson_format(self):
+        species = Species(1, 'bulbasaur', types=[Type(12, 'grass')], evs=StatSet(special_attack=1))
+        runner = CliRunner()
+        with patch.object(cli.Species, 'search', side_effect=lambda id_or_name: species):
+            result = runner.invoke(cli.main, ['species', 'bulbasaur', 'ivysaur', '--format', 'ndjson'])
+        assert result.exit_code == 0
+        lines = result.output.splitlines()
+        assert len(lines) == 2
+        record = json.loads(lines[0])
+        assert record['name'] == 'bulbasaur'
+        assert record['types'] == ['grass']
+        assert record['evs']['special_attack'] == 1
+
+    def test_003_json_format_reports_failures(self):
+        runner = CliRunner()
+        with patch.object(cli.Move, 'search', side_effect=ValueError('resource not found')):
+            result = runner.invoke(cli.main, ['move', 'not-a-move', '--format', 'json'])
+        assert result.exit_code == 0
+        assert json.loads(result.output) == [{'id_or_name': 'not-a-move', 'error': 'resource not found'}]
+
+    def test_004_json_format_no_ids(self):
+        runner = CliRunner()
+        result = runner.invoke(cli.main, ['move', '--format', 'json'])
+        assert result.exit_code == 0
+        assert json.loads(result.output) == []
+
+    def test_005_profile_summary(self):
+        runner = CliRunner()
+        with patch.object(cli.Type, 'search', side_effect=lambda id_or_name: Type(1, 'normal')):
+            result = runner.invoke(cli.main, ['--profile', 'type', 'normal'])
+        assert result.exit_code == 0
+        for name in ['phase', 'import', 'load', 'render', 'other', 'wall']:
+            assert name in result.output
+
+    def test_006_profile_output_collapsed(self):
+        runner = CliRunner()
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, 'profile.txt')
+            with patch.object(cli.Type, 'search', side_effect=lambda id_or_name: Type(1, 'normal')):
+                result = runner.invoke(cli.main, ['--profile-output', filename, '--profile-format', 'collapsed',
+                                                  'type', 'normal'])
+            assert result.exit_code == 0
+            assert 'profile written to' in result.output
+            with open(filename) as f:
+                lines = f.read().splitlines()
+        assert len(lines) > 0
+        for line in lines:
+            stack, micros = line.rsplit(' ', 1)
+            assert int(micros) > 0
+            assert len(stack) > 0
+
+    def test_007_metrics_file_and_stats(self):
+        runner = CliRunner()
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, 'metrics.jsonl')
+            with patch.object(cli.Type, 'search', side_effect=lambda id_or_name: Type(1, 'normal')):
+                for _ in range(2):
+                    result = runner.invoke(cli.main, ['--metrics-file', filename, 'type', 'normal'])
+                    assert result.exit_code == 0
+            result = runner.invoke(cli.main, ['--metrics-file', filename, 'stats'])
+            assert result.exit_code == 0
+            assert 'type: 2 runs' in result.output
+            assert 'roster.load' in result.output
+            assert 'render' in result.output
+            with open(filename) as f:
+                assert len(f.read().splitlines()) == 2
+
+    def test_008_stats_needs_metrics_file(self):
+        runner = CliRunner()
+        result = runner.invoke(cli.main, ['stats'], env={'POKEMON_TRAINER_METRICS_FILE': None})
+        assert result.exit_code != 0
+        assert 'No metrics file' in result.output
+
+    def test_009_trace(self):
+        runner = CliRunner()
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, 'trace.json')
+            with patch.object(cli.Type, 'search', side_effect=lambda id_or_name: Type(1, 'normal')):
+                result = runner.invoke(cli.main, ['--trace', filename, 'type', 'normal', 'normal'])
+            assert result.exit_code == 0
+            assert 'trace written to' in result.output
+            with open(filename) as f:
+                events = json.load(f)['traceEvents']
+        names = [e['name'] for e in events]
+        assert names.count('render') == 2
+        assert 'load' in names
+
+    def test_010_memory(self):
+        runner = CliRunner()
+        with patch.object(cli.Type, 'search', side_effect=lambda id_or_name: Type(1, 'normal')):
+            result = runner.invoke(cli.main, ['--memory', 'type', 'normal'])
+        assert result.exit_code == 0
+        assert 'load: ' in result.output
+        assert 'analysis: ' in result.output
+        assert 'allocation site' in result.output
+
+    def test_011_save_backs_up_existing_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, 'roster.yml')
+            cli.save(cli.Roster(), filename)
+            assert not os.path.exists(filename + '.bak')
+            cli.save(cli.Roster(), filename)
+            assert os.path.exists(filename + '.bak')
+            assert cli.load(filename) == cli.Roster()
+
+    def test_012_warm(self):
+        done = cli.prefetch.WarmResult()
+        done.fetched['type'] = 18
+        failed = cli.prefetch.WarmResult()
+        failed.fail('pokemon/bulbasaur', 'connection refused')
+        runner = CliRunner()
+        with patch.object(cli.prefetch.Prefetcher, 'warm', side_effect=[done, failed]) as warm:
+            result = runner.invoke(cli.main, ['warm', '--kind', 'types'])
+            assert result.exit_code == 0
+            assert 'type' in result.output
+            assert warm.call_args_list[0][0][0] == ['type']
+
+            result = runner.invoke(cli.main, ['warm', '--learnsets'])
+            assert result.exit_code == 1
+            assert 'failed pokemon/bulbasaur' in result.output
+            assert warm.call_args_list[1][0][0] == ['move', 'pokemon', 'type']
+            assert warm.call_args_list[1][1] == {'learnsets': True}
+
+    def test_013_team(self):
+        species = Species(1, 'bulbasaur', types=[Type(12, 'grass')])
+        pokemon = Pokemon(1, species, evs=StatSet(), stats=StatSet())
+        roster = cli.Roster([pokemon], [Team(1, 'starters', first=pokemon), Team(2, 'rivals')],
+                            active_team_id=1)
+        runner = CliRunner()
+        with tempfile.TemporaryDirectory() as directory, \
+                patch.object(cli.Species, 'search', side_effect=lambda id_or_name: species):
+            filename = os.path.join(directory, 'roster.yml')
+            cli.save(roster, filename)
+            args = ['--no-daemon', '-f', filename, 'team']
+            result = runner.invoke(cli.main, args)
+            assert result.exit_code == 0
+            assert 'starters' in result.output
+            assert '1: bulbasaur' in result.output
+            result = runner.invoke(cli.main, args + ['--id', 'rivals'])
+            assert result.exit_code == 0
+            assert '1: Empty' in result.output
+            result = runner.invoke(cli.main, args + ['--id', '3'])
+            assert result.exit_code == 1
+            assert 'Unknown team 3' in result.output
+
+    def test_014_batch(self):
+        species = Species(1, 'bulbasaur', types=[Type(12, 'grass')])
+        pokemon = Pokemon(1, species, evs=StatSet(), stats=StatSet())
+        roster = cli.Roster([pokemon], [Team(1, 'starters', first=pokemon)], active_team_id=1)
+        commands = '\n'.join([
+            '# lookups',
+            'type normal',
+            'type normal 1 --format json',
+            '',
+            'team',
+            'species "bulbasaur"',
+        ])
+        runner = CliRunner()
+        with tempfile.TemporaryDirectory() as directory, \
+                patch.object(cli, 'load', side_effect=lambda filename: roster) as load, \
+                patch.object(cli, 'save') as save, \
+                patch.object(cli.Type, 'search', side_effect=lambda id_or_name: Type(1, 'normal')) as search, \
+                patch.object(cli.Species, 'search', side_effect=lambda id_or_name: species):
+            filename = os.path.join(directory, 'roster.yml')
+            result = runner.invoke(cli.main, ['--no-daemon', '-f', filename, 'batch'], input=commands)
+            assert result.exit_code == 0, result.output
+            assert load.call_count == 1
+            assert [c[0][0] for c in search.call_args_list] == ['normal', '1']
+            assert '"name": "normal"' in result.output
+            assert 'starters' in result.output
+            assert 'bulbasaur' in result.output
+            save.assert_not_called()
+
+            def change(*args, **kwargs):
+                cli.roster_changed(cli.click.get_current_context())
+            with patch.object(cli, 'echo_lookups', side_effect=change):
+                result = runner.invoke(cli.main, ['--no-daemon', '-f', filename, 'batch'],
+                                       input='type normal\ntype grass\n')
+            assert result.exit_code == 0
+            assert save.call_count == 1
+
+            result = runner.invoke(cli.main, ['--no-daemon', '-f', filename, 'batch'],
+                                   input='type normal\nbogus\nbatch\ntype --format xml\ntype normal\n')
+            assert result.exit_code == 1
+            assert 'line 2: bogus is not a command that can run in a batch' in result.output
+            assert 'line 3' not in result.output
+            result = runner.invoke(cli.main, ['--no-daemon', '-f', filename, 'batch', '--keep-going'],
+                                   input='type normal\nbogus\nbatch\ntype --format xml\ntype normal\n')
+            assert result.exit_code == 1
+            assert 'line 3: batch is not a command' in result.output
+            assert "line 4: Invalid value for '--format'" in result.output
+            assert '3 batch commands failed' in result.output
+            assert result.output.count('normal') >= 2
+
+    def test_015_pokebase_unpatched_without_metrics_file(self):
+        lookups = []
+
+        def search(id_or_name):
+            lookups.append(api.lookup_data)
+            return Type(1, 'normal')
+        unpatched = api.lookup_data
+        runner = CliRunner()
+        with patch.object(cli.Type, 'search', side_effect=search):
+            result = runner.invoke(cli.main, ['--no-daemon', 'type', 'normal'],
+                                   env={'POKEMON_TRAINER_METRICS_FILE': None})
+            assert result.exit_code == 0
+            with tempfile.TemporaryDirectory() as directory:
+                filename = os.path.join(directory, 'metrics.jsonl')
+                result = runner.invoke(cli.main, ['--no-daemon', '--metrics-file', filename, 'type', 'normal'])
+                assert result.exit_code == 0
+        assert lookups[0] is unpatched
+        assert lookups[1] is not unpatched
+        assert api.lookup_data is unpatched
@@ -0,0 +1,175 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `pokemon_trainer.daemon`."""
+
+import io
+import json
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+from click.testing import CliRunner
+from pokebase import api
+
+from pokemon_trainer import cli, daemon, launcher
+from pokemon_trainer.pokemon.pokedex import Pokemon, Species, StatSet
+from pokemon_trainer.pokemon.teams import Roster, Team
+from pokemon_trainer.pokemon.types import Type
+
+
+class TestPokemonTrainerDaemon(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix='pokemon-trainer-daemon-')
+        self.path = os.path.join(self.directory, 'daemon.sock')
+        self.roster_file = os.path.join(self.directory, 'roster.yml')
+        self.searches = []
+        self.daemon = daemon.Daemon(self.path)
+        self.daemon.cache.searches = {'type': self.search_type, 'species': self.search_type, 'move': self.search_type}
+        self.thread = None
+
+    def tearDown(self):
+        if self.thread is not None:
+            self.daemon.shutdown()
+            self.thread.join(5)
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def search_type(self, id_or_name):
+        self.searches.append(id_or_name)
+        if id_or_name == 'missingno':
+            raise ValueError('resource not found (missingno), check spelling')
+        return Type(1, 'normal')
+
+    def start(self):
+        self.thread = threading.Thread(target=self.daemon.serve_forever, daemon=True)
+        self.thread.start()
+        for _ in range(100):
+            if daemon.connect(self.path) is not None:
+                return daemon.connect(self.path)
+            time.sleep(0.02)
+        self.fail('The daemon did not start')
+
+    def test_000_no_daemon(self):
+        assert daemon.connect(self.path) is None
+
+    def test_001_lookups_are_cached(self):
+        client = self.start()
+        normal = str(Type(1, 'normal'))
+        assert client.lookups('type', ['normal']) == normal + '\n'
+        assert client.lookups('type', ['normal', '1']) == normal + '\n' + normal + '\n'
+        assert self.searches == ['normal', '1']
+        records = json.loads(client.lookups('type', ['normal', 'missingno'], 'json'))
+        assert records[0] == Type(1, 'normal').describe()
+        assert records[1]['error'] == 'resource not found (missingno), check spelling'
+
+        with self.assertRaises(ValueError) as raised:
+            client.lookups('pokemon', ['bulbasaur'])
+        assert 'Unknown kind pokemon' in str(raised.exception)
+
+    def test_002_team_reloads_changed_roster(self):
+        species = Species(1, 'bulbasaur', types=[Type(12, 'grass')])
+        pokemon = Pokemon(1, species, evs=StatSet(), stats=StatSet())
+        roster = Roster([pokemon], [Team(1, 'starters', first=pokemon)], active_team_id=1)
+        with patch.object(cli.Species, 'search', side_effect=lambda id_or_name: species):
+            cli.save(roster, self.roster_file)
+            client = self.start()
+            assert 'starters' in client.team(self.roster_file)
+            assert 'starters' in client.team(self.roster_file, 'starters')
+            with self.assertRaises(ValueError):
+                client.team(self.roster_file, 'rivals')
+
+            roster.get_team(1).name = 'rivals'
+            cli.save(roster, self.roster_file)
+            os.utime(self.roster_file, ns=(0, time.time_ns() + 10 ** 9))
+            assert 'rivals' in client.team(self.roster_file, 'rivals')
+
+    def test_003_stale_socket_and_shutdown(self):
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+            s.bind(self.path)  # nothing listens on it
+        client = self.start()
+        with self.assertRaises(ValueError):
+            daemon.Daemon(self.path).serve_forever()
+
+        client.shutdown()
+        self.thread.join(5)
+        self.thread = None
+        assert not os.path.exists(self.path)
+
+    def test_004_cli_uses_daemon(self):
+        self.start()
+        runner = CliRunner()
+        with patch.object(cli, 'load', side_effect=AssertionError('the roster should not be loaded')), \
+                patch.object(cli.Type, 'search', side_effect=AssertionError('the daemon should search')):
+            result = runner.invoke(cli.main, ['--socket', self.path, '-f', self.roster_file, 'type', 'normal'])
+        assert result.exit_code == 0, result.output
+        assert 'normal' in result.output
+        assert self.searches == ['normal']
+
+        with patch.object(cli.Type, 'search', side_effect=lambda id_or_name: Type(1, 'normal')):
+            result = runner.invoke(cli.main, ['--socket', self.path, '--no-daemon', '-f', self.roster_file,
+                                              'type', 'normal'])
+        assert result.exit_code == 0
+        assert self.searches == ['normal']
+
+    def test_005_cli_options_skip_daemon(self):
+        self.start()
+        runner = CliRunner()
+        self.addCleanup(setattr, api, 'BASE_URL', api.BASE_URL)
+        for options in [['--api-url', 'http://127.0.0.1:1/api/v2'], ['--profile'], ['--memory'],
+                        ['--trace', os.path.join(self.directory, 'trace.json')]]:
+            with patch.object(cli.Type, 'search', side_effect=lambda id_or_name: Type(1, 'normal')) as search:
+                result = runner.invoke(cli.main, options + ['--socket', self.path, '-f', self.roster_file,
+                                                            'type', 'normal'])
+            assert result.exit_code == 0, result.output
+            assert search.call_count == 1, options
+        assert self.searches == []
+
+    def test_006_connect_times_out(self):
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+            s.bind(self.path)
+            s.listen(1)  # accepted by the kernel, never answered
+            started = time.perf_counter()
+            assert daemon.connect(self.path) is None
+            assert time.perf_counter() - started < 1
+
+    def test_007_launcher_parse(self):
+        with patch.dict(os.environ, {'POKEMON_TRAINER_SOCKET': self.path, 'POKEMON_TRAINER_NO_DAEMON': ''}):
+            options = launcher.parse(['-f', self.roster_file, 'species', 'bulbasaur', '--format=json', '1'])
+            assert options['socket'] == self.path
+            assert options['file'] == os.path.realpath(self.roster_file)
+            assert options['command'] == 'species'
+            assert options['format'] == 'json'
+            assert options['id_or_name'] == ['bulbasaur', '1']
+            assert launcher.parse(['team', '--id', 'starters'])['id_or_name'] == 'starters'
+            assert launcher.parse(['team'])['id_or_name'] is None
+            assert launcher.parse(['--profile', 'species', 'bulbasaur']) is None
+            assert launcher.parse(['species', '--help']) is None
+            assert launcher.parse(['stats']) is None
+            assert launcher.parse([]) is None
+        with patch.dict(os.environ, {'POKEMON_TRAINER_NO_DAEMON': 'true'}):
+            assert launcher.parse(['species', 'bulbasaur']) is None
+        with patch.dict(os.environ, {'POKEMON_TRAINER_NO_DAEMON': '', 'POKEMON_TRAINER_API_URL': 'http://127.0.0.1:1'}):
+            assert launcher.parse(['species', 'bulbasaur']) is None
+        assert launcher.TRAINER_PATH == cli.TRAINER_PATH
+        assert launcher.OUTPUT_FORMATS == cli.OUTPUT_FORMATS
+
+    def test_008_launcher_answer(self):
+        options = {'socket': self.path, 'file': self.roster_file, 'command': 'type', 'format': 'plain',
+                   'id_or_name': ['normal']}
+        assert launcher.answer(options) is None  # no daemon
+
+        self.start()
+        stdout, stderr = io.StringIO(), io.StringIO()
+        assert launcher.answer(options, stdout, stderr) == 0
+        assert stdout.getvalue() == launcher._ANSI_ESCAPE.sub('', str(Type(1, 'normal'))) + '\n'
+        assert '\x1b' not in stdout.getvalue()
+
+        options.update({'command': 'team', 'id_or_name': 'rivals'})
+        assert launcher.answer(options, stdout, stderr) == 1
+        assert 'Unknown team rivals' in stderr.getvalue()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `pokemon_trainer.ev_planner`."""
+
+import random
+import time
+import unittest
+
+from pokemon_trainer import ev_planner
+from pokemon_trainer.pokemon.pokedex import Species, StatSet
+
+
+class TestPokemonTrainerEvPlanner(unittest.TestCase):
+
+    def setUp(self):
+        """Set up test fixtures, if any."""
+        self.pokedex = [
+            Species(1, 'bulbasaur', evs=StatSet(special_attack=1)),
+            Species(16, 'pidgey', evs=StatSet(speed=1)),
+            Species(19, 'rattata', evs=StatSet(speed=1)),
+            Species(21, 'spearow', evs=StatSet(speed=1)),
+            Species(22, 'fearow', evs=StatSet(speed=2)),
+            Species(66, 'machop', evs=StatSet(attack=1)),
+            Species(68, 'machamp', evs=StatSet(attack=3)),
+            Species(3, 'venusaur', evs=StatSet(special_attack=2, special_defense=1)),
+        ]
+
+    def tearDown(self):
+        """Tear down test fixtures, if any."""
+
+    def test_000_plan_nothing_to_train(self):
+        plan = ev_planner.plan(StatSet(speed=4), self.pokedex, current=StatSet(speed=4))
+        assert plan.battles() == 0
+        assert plan.evs() == StatSet(speed=4)
+
+    def test_001_plan_without_items(self):
+        plan = ev_planner.plan(StatSet(attack=7, speed=4), self.pokedex, items=[])
+        assert plan.evs() == StatSet(attack=7, speed=4)
+        assert plan.battles() == 5
+        assert [(s.species.name, s.count) for s in plan.steps] == [('machamp', 2), ('machop', 1), ('fearow', 2)]
+
+    def test_002_plan_prefers_items(self):
+        plan = ev_planner.plan(StatSet(attack=252), self.pokedex, items=['Macho Brace', 'Power Bracer'])
+        assert plan.battles() == 36
+        assert plan.evs() == StatSet(attack=252)
+        assert all(step.item == 'Power Bracer' for step in plan.steps)
+
+    def test_003_plan_pokerus(self):
+        plan = ev_planner.plan(StatSet(speed=8), self.pokedex, items=[], pokerus=True)
+        assert plan.battles() == 2
+        assert plan.steps[0].species.name == 'fearow'
+        assert plan.steps[0].evs == StatSet(speed=4)
+
+    def test_004_plan_uses_spare_evs_to_save_battles(self):
+        plan = ev_planner.plan(StatSet(attack=5), self.pokedex, items=[])
+        assert plan.evs() == StatSet(attack=6)
+        assert plan.battles() == 2
+        plan = ev_planner.plan(StatSet(attack=4), self.pokedex, items=[], current=StatSet(hp=255, defense=251))
+        assert plan.evs() == StatSet(hp=255, attack=4, defense=251)
+        assert plan.battles() == 2
+
+        plan = ev_planner.plan(StatSet(attack=5), self.pokedex, items=[], current=StatSet(hp=255, defense=250))
+        assert plan.evs() == StatSet(hp=255, attack=5, defense=250)
+        assert plan.battles() == 3
+
+    def test_005_plan_respects_max_stat(self):
+        plan = ev_planner.plan(StatSet(attack=254), self.pokedex, items=[])
+        assert plan.evs().attack <= StatSet.MAX_STAT
+        assert plan.evs().attack >= 254
+
+    def test_006_plan_invalid_targets(self):
+        self.assertRaises(ValueError, ev_planner.plan, StatSet(attack=256), self.pokedex)
+        self.assertRaises(ValueError, ev_planner.plan, StatSet(attack=255, hp=255, speed=1), self.pokedex)
+        self.assertRaises(ValueError, ev_planner.plan, StatSet(attack=4), self.pokedex, items=['Lucky Egg'])
+        self.assertRaises(ValueError, ev_planner.plan, StatSet(hp=4), self.pokedex, items=[])
+
+    def test_007_plan_to_string(self):
+        plan = ev_planner.plan(StatSet(speed=4), self.pokedex, items=['Power Anklet'])
+        assert str(plan) == '1x pidgey (Power Anklet)\n1 battles'
+
+    def test_008_plan_full_pokedex_under_a_second(self):
+        rng = random.Random(28)
+        pokedex = []
+        for id in range(1, 901):
+            stats = rng.sample(StatSet.STATS, rng.choice([1, 1, 2]))
+            pokedex.append(Species(id, 'species-%d' % id, evs=StatSet(**{s: rng.randint(1, 3) for s in stats})))
+        target = StatSet(hp=4, attack=252, speed=252)
+        started = time.perf_counter()
+        plan = ev_planner.plan(target, pokedex)
+        assert time.perf_counter() - started < 1
+        assert plan.evs() == target
@@ -0,0 +1,43 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `pokemon_trainer.memory`."""
+
+import json
+import tracemalloc
+import unittest
+
+from pokemon_trainer import memory
+
+
+class TestPokemonTrainerMemory(unittest.TestCase):
+
+    def tearDown(self):
+        memory.stop()
+
+    def test_000_mark_noop_when_inactive(self):
+        memory.mark('load')
+        assert not tracemalloc.is_tracing()
+
+    def test_001_report(self):
+        tracer = memory.start()
+        held = [json.loads('{"name": "bulbasaur %d"}' % i) for i in range(2000)]
+        memory.mark('load')
+        memory.stop()
+        assert not tracemalloc.is_tracing()
+
+        assert [label for label, _, _, _ in tracer.marks] == ['start', 'load']
+        report = tracer.report(limit=3)
+        assert report.startswith('load: +')
+        assert 'json.decoder' in report
+        assert len(held) == 2000
+
+    def test_002_module_name(self):
+        assert memory.module_name(memory.__file__) == 'pokemon_trainer.memory'
+        assert memory.module_name(tracemalloc.__file__) == 'tracemalloc'
+        assert memory.module_name('<string>') == '<string>'
+
+    def test_003_only_one_tracer(self):
+        memory.start()
+        with self.assertRaises(ValueError):
+            memory.start()
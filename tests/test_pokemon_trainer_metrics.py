@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `pokemon_trainer.metrics`."""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from pokebase import api
+
+from pokemon_trainer import metrics
+
+from tests.helpers.standin import PokeApiStandIn
+
+
+class TestPokemonTrainerMetrics(unittest.TestCase):
+
+    def setUp(self):
+        self.registry = metrics.Registry()
+        self.directory = tempfile.mkdtemp(prefix='pokemon-trainer-metrics-')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_000_counter(self):
+        c = self.registry.counter('requests')
+        c.inc()
+        c.inc(2)
+        assert self.registry.counter('requests').value == 3
+
+    def test_001_percentile(self):
+        values = [float(v) for v in range(1, 101)]
+        assert metrics.percentile(values, 50) == 50
+        assert metrics.percentile(values, 90) == 90
+        assert metrics.percentile(values, 99) == 99
+        assert metrics.percentile(values, 100) == 100
+        assert metrics.percentile([3.0], 50) == 3.0
+        assert metrics.percentile([], 50) is None
+
+    def test_002_timer(self):
+        with self.registry.timer('render'):
+            pass
+        h = self.registry.histogram('render')
+        assert h.count() == 1
+        assert h.values[0] >= 0
+
+    def test_003_timed(self):
+        @metrics.timed('test.search')
+        def search(id_or_name):
+            if id_or_name == 'missingno':
+                raise ValueError('not found')
+            return id_or_name
+
+        metrics.REGISTRY.clear()
+        assert search('bulbasaur') == 'bulbasaur'
+        with self.assertRaises(ValueError):
+            search('missingno')
+        assert metrics.histogram('test.search').count() == 2
+        assert metrics.counter('test.search.errors').value == 1
+        metrics.REGISTRY.clear()
+
+    def test_004_runs_round_trip(self):
+        filename = os.path.join(self.directory, 'metrics.jsonl')
+        self.registry.counter('pokebase.requests').inc(4)
+        self.registry.counter('pokebase.cache_hits').inc(3)
+        self.registry.counter('pokebase.cache_misses').inc(1)
+        self.registry.histogram('species.search').observe(0.25)
+        metrics.append_run(filename, 'species', 0.5, registry=self.registry)
+        metrics.append_run(filename, 'species', 1.5, registry=self.registry)
+        with open(filename, 'a') as f:
+            f.write('{"command": "spec\n')  # truncated by a crash
+
+        runs = metrics.read_runs(filename)
+        assert len(runs) == 2
+        assert runs[0]['command'] == 'species'
+        assert runs[0]['counters']['pokebase.requests'] == 4
+        assert runs[0]['histograms']['species.search'] == [0.25]
+
+        summary = metrics.summarize(runs)
+        assert summary['species']['runs'] == 2
+        assert summary['species']['seconds'] == [0.5, 1.5, 1.5]
+        assert summary['species']['counters']['pokebase.requests'] == 8
+        assert summary['species']['histograms']['species.search'] == (2, [0.25, 0.25, 0.25])
+
+        text = metrics.format_summary(summary)
+        assert 'species: 2 runs, 4.0 pokebase fetches/run, cache hit rate 75%' in text
+        assert 'species.search' in text
+
+    def test_005_instrument_pokebase(self):
+        cache = api.CACHE
+        metrics.REGISTRY.clear()
+        metrics.instrument_pokebase()
+        metrics.instrument_pokebase()
+        try:
+            with PokeApiStandIn() as stand_in:
+                stand_in.use()
+                api.set_cache(os.path.join(self.directory, 'cache'))
+                api.lookup_data('type', 'grass')
+                api.lookup_data('type', 'grass')
+            assert metrics.counter('pokebase.cache_misses').value == 1
+            assert metrics.counter('pokebase.cache_hits').value == 1
+            assert metrics.counter('pokebase.requests').value == len(stand_in.requests)
+            assert metrics.histogram('pokebase.lookup_seconds').count() == 2
+        finally:
+            metrics.uninstrument_pokebase()
+            api.set_cache(cache)
+            metrics.REGISTRY.clear()
+        assert not isinstance(api.requests, metrics._CountingRequests)
+
+    def test_006_histogram_limit(self):
+        registry = metrics.Registry(histogram_limit=3)
+        h = registry.histogram('http.types')
+        for v in range(1, 6):
+            h.observe(float(v))
+        assert list(h.values) == [3.0, 4.0, 5.0]
+        assert h.count() == 5
+        assert h.sum() == 15.0
+        assert h.percentile(50) == 4.0
+
+    def test_007_format_prometheus(self):
+        self.registry.counter('http.responses.200').inc(2)
+        for v in [0.1, 0.2, 0.3]:
+            self.registry.histogram('http.species').observe(v)
+        text = metrics.format_prometheus(self.registry)
+        assert '# TYPE pokemon_trainer_http_responses_200_total counter\n' in text
+        assert 'pokemon_trainer_http_responses_200_total 2\n' in text
+        assert '# TYPE pokemon_trainer_http_species summary\n' in text
+        assert 'pokemon_trainer_http_species{quantile="0.5"} 0.2\n' in text
+        assert 'pokemon_trainer_http_species_count 3\n' in text
+        assert text.endswith('\n')
@@ -0,0 +1,135 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `pokemon_trainer.prefetch`."""
+
+import json
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from pokebase import api
+
+from pokemon_trainer import prefetch
+from pokemon_trainer.pokemon.moves import Move
+from pokemon_trainer.pokemon.pokedex import Species
+from pokemon_trainer.pokemon.types import Type
+
+from tests.helpers.standin import DirectoryCorpus, Faults, MappedCorpus, PokeApiStandIn
+from tests.helpers.utils import request_budget
+
+# Resources the test resources refer to but don't include.
+MISSING = ['generation/generation-ii', 'generation/generation-iii', 'generation/generation-iv',
+           'generation/generation-v', 'generation/generation-vi', 'move-damage-class/special']
+MISSING_LISTS = ['move-learn-method', 'nature']
+
+
+class TestPokemonTrainerPrefetch(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix='pokemon-trainer-prefetch-')
+        self.cache = os.path.join(self.directory, 'cache')
+        self.corpus = self.small_corpus(os.path.join(self.directory, 'corpus'))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    @staticmethod
+    def small_corpus(root):
+        """
+        The test resources, with the type, move and pokemon lists cut down to what they include and
+        what they refer to, so a warm doesn't ask for the rest of the api. The resources referred
+        to but not included are stubs.
+        """
+        resources = MappedCorpus()
+        corpus = DirectoryCorpus(root)
+        referred = set()
+        for key in resources.keys():
+            corpus.put(key, resources.get(key))
+            if '/' in key and '?' not in key:
+                referred |= prefetch.references(json.loads(resources.get(key).decode('utf8')))
+
+        for kind in ['type', 'move', 'pokemon']:
+            listing = json.loads(corpus.get(kind).decode('utf8'))
+            if listing['count'] != len(listing['results']):
+                listing = json.loads(corpus.get('%s/?limit=%d' % (kind, listing['count'])).decode('utf8'))
+            kept = {i for k, i in referred if k == kind} | {key.split('/')[1] for key in resources.keys()
+                                                            if key.startswith(kind + '/') and '?' not in key}
+            listing['results'] = [r for r in listing['results']
+                                  if r['name'] in kept or r['url'].rstrip('/').split('/')[-1] in kept]
+            listing['count'] = len(listing['results'])
+            corpus.put(kind, json.dumps(listing).encode('utf8'))
+            for r in listing['results']:
+                if corpus.get('%s/%s' % (kind, r['name'])) is None:
+                    corpus.put('%s/%s' % (kind, r['name']), json.dumps({'id': 0, 'name': r['name']}).encode('utf8'))
+        for key in MISSING:
+            corpus.put(key, json.dumps({'id': 0, 'name': key.split('/')[-1]}).encode('utf8'))
+        for key in MISSING_LISTS:
+            corpus.put(key, json.dumps({'count': 0, 'results': []}).encode('utf8'))
+        return corpus
+
+    def listed(self, kind):
+        return json.loads(self.corpus.get(kind).decode('utf8'))['count']
+
+    def warm(self, stand_in, **kwargs):
+        prefetcher = prefetch.Prefetcher(base_url=stand_in.base_url, cache=self.cache, rate=None, backoff=0, **kwargs)
+        return prefetcher.warm(['type', 'move', 'pokemon'])
+
+    def test_000_references(self):
+        data = {'id': 1, 'types': [{'slot': 1, 'type': {'name': 'grass', 'url': 'https://pokeapi.co/api/v2/type/12/'}}],
+                'stats': [{'stat': {'name': 'speed', 'url': 'https://pokeapi.co/api/v2/stat/speed/'}}]}
+        assert prefetch.references(data) == {('type', '12'), ('stat', 'speed')}
+
+    def test_001_rate_limiter(self):
+        limiter = prefetch.RateLimiter(100)
+        started = time.monotonic()
+        for _ in range(6):
+            limiter.wait()
+        assert time.monotonic() - started >= 0.05
+
+    def test_002_warm_then_offline(self):
+        with PokeApiStandIn(corpus=self.corpus) as stand_in:
+            result = self.warm(stand_in)
+        assert result.failed == {}
+        assert result.fetched['type'] == self.listed('type')
+        assert result.fetched['move'] == self.listed('move')
+        assert result.fetched['pokemon'] == self.listed('pokemon')
+        assert result.fetched['stat'] == 6
+        assert os.path.exists(os.path.join(self.cache, 'pokemon', 'bulbasaur.json'))
+        assert os.path.exists(os.path.join(self.cache, 'ability', 'resource.json'))
+
+        cache = api.CACHE
+        try:
+            api.set_cache(self.cache)
+            with request_budget(0):
+                assert Species.search('bulbasaur').name == 'bulbasaur'
+                assert Species.search(1).name == 'bulbasaur'
+                assert Move.search('pound').type_.name == 'normal'
+                assert Type.search('poison').name == 'poison'
+        finally:
+            api.set_cache(cache)
+
+    def test_003_resume(self):
+        with PokeApiStandIn(corpus=self.corpus) as stand_in:
+            self.warm(stand_in)
+            os.remove(os.path.join(self.cache, 'type', 'poison.json'))
+            made = len(stand_in.requests)
+            result = self.warm(stand_in)
+            assert stand_in.requests[made:] == ['type/poison']
+        assert result.fetched == {'type': 1}
+        assert result.cached['pokemon'] == self.listed('pokemon')
+
+    def test_004_retries(self):
+        with PokeApiStandIn(corpus=self.corpus, faults=Faults(sequence=[429, 503, 500], retry_after=0)) as stand_in:
+            result = self.warm(stand_in)
+        assert result.failed == {}
+        assert stand_in.statuses[429] == 1
+        assert result.fetched['pokemon'] == self.listed('pokemon')
+
+    def test_005_failures_are_reported(self):
+        with PokeApiStandIn(corpus=self.corpus, faults=Faults(error_rate=1, seed=1)) as stand_in:
+            result = self.warm(stand_in, retries=1)
+        assert sorted(result.failed.keys()) == ['move', 'pokemon', 'type']
+        assert 'failed pokemon' in result.summary()
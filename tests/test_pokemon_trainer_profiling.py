@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `pokemon_trainer.profiling`."""
+
+import json
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from pokebase import api
+
+from pokemon_trainer import profiling
+
+
+class TestPokemonTrainerProfiling(unittest.TestCase):
+
+    def tearDown(self):
+        profiling.stop()
+
+    def test_000_phase_noop_when_inactive(self):
+        assert profiling.phase('fetch') is profiling.phase('render')
+        with profiling.phase('fetch'):
+            pass
+
+    def test_001_nested_phases_self_time(self):
+        profiler = profiling.start()
+        with profiling.phase('render'):
+            time.sleep(0.01)
+            with profiling.phase('coverage'):
+                time.sleep(0.02)
+        profiling.stop()
+
+        render_calls, render_total, render_self = profiler.timings['render']
+        coverage_calls, coverage_total, coverage_self = profiler.timings['coverage']
+        assert render_calls == 1 and coverage_calls == 1
+        assert coverage_total == coverage_self
+        assert render_total >= render_self + coverage_self - 1e-6
+        assert render_self < render_total
+        assert 'render' in profiler.summary()
+
+    def test_002_reentered_phase_counted_once(self):
+        profiler = profiling.start()
+        with profiling.phase('fetch'):
+            with profiling.phase('fetch'):
+                time.sleep(0.01)
+        profiling.stop()
+        calls, total, self_time = profiler.timings['fetch']
+        assert calls == 2
+        assert abs(total - self_time) < 1e-3
+
+    def test_003_only_one_profiler(self):
+        profiling.start()
+        with self.assertRaises(ValueError):
+            profiling.start()
+
+    def test_004_invalid_format(self):
+        with self.assertRaises(ValueError):
+            profiling.Profiler('svg')
+
+    def test_005_write_without_format(self):
+        profiler = profiling.start()
+        profiling.stop()
+        with self.assertRaises(ValueError):
+            profiler.write('profile.out')
+
+    def test_006_record(self):
+        profiler = profiling.Profiler()
+        profiler.record('import', 0.5)
+        profiler.record('import', 0.25)
+        assert profiler.timings['import'] == [2, 0.75, 0.75]
+
+    def test_007_pokebase_lookups_are_fetches(self):
+        # a resource read when an attribute of a nested resource is first used, after the call
+        # that returned its parent
+        directory = tempfile.mkdtemp(prefix='pokemon-trainer-profiling-')
+        cache = api.CACHE
+        try:
+            api.set_cache(directory)
+            os.makedirs(os.path.join(directory, 'move-damage-class'))
+            with open(os.path.join(directory, 'move-damage-class', 'special.json'), 'w') as f:
+                json.dump({'id': 3, 'name': 'special'}, f)
+            profiler = profiling.start()
+            assert api.lookup_data('move-damage-class', 'special')['id'] == 3
+            profiling.stop()
+        finally:
+            api.set_cache(cache)
+            shutil.rmtree(directory, ignore_errors=True)
+        assert profiler.timings['fetch'][0] == 1
@@ -0,0 +1,169 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `pokemon_trainer.server`."""
+
+import asyncio
+import http.client
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import Mock, patch
+
+import requests
+
+from pokemon_trainer import cli, metrics
+from pokemon_trainer.daemon import WarmCache
+from pokemon_trainer.pokemon.moves import DamageClass, Move, MoveSet
+from pokemon_trainer.pokemon.pokedex import Pokemon, Species, StatSet
+from pokemon_trainer.pokemon.teams import Roster, Team
+from pokemon_trainer.pokemon.types import DamageRelation, Type
+from pokemon_trainer.pokemon.versions import Generation
+from pokemon_trainer.server import Server
+
+
+def make_types():
+    fire, water, grass = Type(10, 'fire'), Type(11, 'water'), Type(12, 'grass')
+    fire.set_damage_relation(DamageRelation.DOUBLE_DAMAGE_TO, Type(12, 'grass'))
+    fire.set_damage_relation(DamageRelation.HALF_DAMAGE_TO, Type(11, 'water'))
+    water.set_damage_relation(DamageRelation.DOUBLE_DAMAGE_TO, Type(10, 'fire'))
+    grass.set_damage_relation(DamageRelation.DOUBLE_DAMAGE_FROM, Type(10, 'fire'))
+    grass.set_damage_relation(DamageRelation.HALF_DAMAGE_FROM, Type(11, 'water'))
+    return {t.name: t for t in [fire, water, grass]}
+
+
+class TestPokemonTrainerServer(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix='pokemon-trainer-server-')
+        self.roster_file = os.path.join(self.directory, 'roster.yml')
+        types = make_types()
+        self.species = {'bulbasaur': Species(1, 'bulbasaur', types=[types['grass']], evs=StatSet(special_attack=1))}
+        self.moves = {'ember': Move(52, 'ember', DamageClass.special, types['fire'], Generation.generation_i)}
+        self.slow = threading.Event()
+
+        def search(found):
+            def search(id_or_name):
+                if id_or_name == 'slowpoke':
+                    self.slow.wait(5)
+                if id_or_name not in found:
+                    raise ValueError('resource not found (%s), check spelling' % id_or_name)
+                return found[id_or_name]
+            return search
+
+        cache = WarmCache()
+        cache.searches = {'species': search(self.species), 'type': search(types), 'move': search(self.moves)}
+        self.server = Server(self.roster_file, port=0, cache=cache)
+        self.loop = asyncio.new_event_loop()
+        self.loop.run_until_complete(self.server.start())
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+
+    def tearDown(self):
+        self.slow.set()
+        self.loop.call_soon_threadsafe(self.server.close)
+        asyncio.run_coroutine_threadsafe(self.server.wait_closed(), self.loop).result(5)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(5)
+        self.loop.close()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def get(self, path, connection=None):
+        """:return: (status, decoded json or text)"""
+        c = connection or http.client.HTTPConnection('127.0.0.1', self.server.port, timeout=10)
+        c.request('GET', path)
+        response = c.getresponse()
+        body = response.read().decode('utf8')
+        if connection is None:
+            c.close()
+        if response.getheader('Content-Type') == 'application/json':
+            return response.status, json.loads(body)
+        return response.status, body
+
+    def test_000_lookups(self):
+        status, body = self.get('/species/bulbasaur')
+        assert status == 200
+        assert body == self.species['bulbasaur'].describe()
+        status, body = self.get('/types/fire')
+        assert status == 200
+        assert body['coverage']['double_damage_to'] == ['grass']
+        status, body = self.get('/moves/missingno')
+        assert status == 404
+        assert 'missingno' in body['error']
+        assert self.get('/pokedex/1')[0] == 404
+
+        response = requests.Response()
+        response.status_code = 404
+        self.server.cache.searches['move'] = Mock(side_effect=requests.HTTPError('404', response=response))
+        status, body = self.get('/moves/struggle-bug')
+        assert status == 404
+        assert body['error'] == 'move struggle-bug not found'
+
+    def test_001_coverage(self):
+        status, body = self.get('/coverage?species=bulbasaur&move=ember')
+        assert status == 200
+        assert body['coverage']['double_damage_to'] == ['grass']
+        assert body['coverage']['double_damage_from'] == ['fire']
+        assert self.get('/coverage')[0] == 400
+        assert self.get('/coverage?' + '&'.join(['species=bulbasaur'] * 7))[0] == 400
+        assert self.get('/coverage?species=missingno')[0] == 404
+
+    def test_002_matchup(self):
+        status, body = self.get('/matchup?species=bulbasaur&type=fire&type=water&move=ember')
+        assert status == 200
+        assert body['matchups'] == [
+            {'species': 'bulbasaur', 'type': 'fire', 'relation': 'double_damage_from', 'multiplier': '2x'},
+            {'species': 'bulbasaur', 'type': 'water', 'relation': 'half_damage_from', 'multiplier': '1/2x'},
+            {'species': 'bulbasaur', 'move': 'ember', 'type': 'fire', 'relation': 'double_damage_from',
+             'multiplier': '2x'},
+        ]
+        assert self.get('/matchup?species=bulbasaur')[0] == 400
+
+    def test_003_team_coverage(self):
+        pokemon = Pokemon(1, self.species['bulbasaur'], move_set=MoveSet(self.moves['ember']))
+        roster = Roster([pokemon], [Team(1, 'starters', first=pokemon)], active_team_id=1)
+        with patch.object(cli.Species, 'search', side_effect=lambda id_or_name: self.species['bulbasaur']), \
+                patch.object(cli.Move, 'search', side_effect=lambda id_or_name: self.moves['ember']):
+            cli.save(roster, self.roster_file)
+            status, body = self.get('/teams/active/coverage')
+        assert status == 200
+        assert body['name'] == 'starters'
+        assert body['members'] == [{'id': 1, 'name': 'bulbasaur', 'species': 'bulbasaur', 'types': ['grass'],
+                                    'moves': ['ember']}]
+        assert body['coverage']['double_damage_to'] == ['grass']
+        assert self.get('/teams/starters/coverage')[0] == 200
+        status, body = self.get('/teams/rivals/coverage')
+        assert status == 400
+        assert 'Unknown team rivals' in body['error']
+        assert self.get('/teams/abc/coverage')[0] == 400
+        assert self.get('/teams/1/roster')[0] == 404
+
+    def test_004_keep_alive_and_metrics(self):
+        metrics.REGISTRY.clear()
+        connection = http.client.HTTPConnection('127.0.0.1', self.server.port, timeout=10)
+        for _ in range(3):
+            assert self.get('/types/grass', connection)[0] == 200
+        status, body = self.get('/metrics', connection)
+        connection.close()
+        assert status == 200
+        assert 'pokemon_trainer_http_requests_total 3' in body
+        assert 'pokemon_trainer_http_responses_200_total 3' in body
+        assert 'pokemon_trainer_http_types_count 3' in body
+        assert 'pokemon_trainer_http_types{quantile="0.99"}' in body
+        metrics.REGISTRY.clear()
+
+    def test_005_slow_search_does_not_block(self):
+        results = []
+        slow = threading.Thread(target=lambda: results.append(self.get('/species/slowpoke')))
+        slow.start()
+        time.sleep(0.1)
+        started = time.perf_counter()
+        assert self.get('/metrics')[0] == 200
+        assert time.perf_counter() - started < 1
+        self.slow.set()
+        slow.join(5)
+        assert results[0][0] == 404
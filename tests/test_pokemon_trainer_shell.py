@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `pokemon_trainer.shell`."""
+
+import io
+import os
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+
+import click
+from click.testing import CliRunner
+
+from pokemon_trainer import cli
+from pokemon_trainer.pokemon.pokedex import Pokemon, Species, StatSet
+from pokemon_trainer.pokemon.teams import Roster, Team
+from pokemon_trainer.pokemon.types import Type
+from pokemon_trainer.shell import Shell
+
+
+class TestPokemonTrainerShell(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.directory.name, 'roster.yml')
+        species = Species(1, 'bulbasaur', types=[Type(12, 'grass')])
+        pokemon = Pokemon(1, species, evs=StatSet(), stats=StatSet())
+        self.roster = Roster([pokemon], [Team(1, 'starters', first=pokemon), Team(2, 'rivals')], active_team_id=1)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def context(self):
+        ctx = click.Context(cli.main, info_name='shell', obj={'filename': self.filename, 'roster': self.roster})
+        cli.start_batch(ctx)
+        return ctx
+
+    def test_000_commands_share_state(self):
+        runner = CliRunner()
+        with patch.object(cli, 'load', side_effect=lambda filename: self.roster) as load, \
+                patch.object(cli.Type, 'search', side_effect=lambda id_or_name: Type(1, 'normal')) as search:
+            result = runner.invoke(cli.main, ['--no-daemon', '-f', self.filename, 'shell'],
+                                   input='type normal\ntype normal --format json\n\nteam --id rivals\nbogus\n'
+                                         'help\nhelp type\nexit\n')
+        assert result.exit_code == 0, result.output
+        assert load.call_count == 1
+        assert search.call_count == 1
+        assert '"name": "normal"' in result.output
+        assert '1: Empty' in result.output
+        assert 'bogus is not a command that can run in a shell' in result.output
+        assert 'Commands: exit, help, move, quit, save, species, stats, team, type, warm' in result.output
+        assert '--format [plain|json|ndjson]' in result.output
+
+    def test_001_debounced_save(self):
+        ctx = self.context()
+        shell = Shell(ctx, save_delay=0.1, stdin=io.StringIO(''), stdout=io.StringIO())
+        with patch.object(cli, 'save') as save, \
+                patch.object(cli, 'echo_lookups', side_effect=lambda *args: cli.roster_changed(ctx)):
+            for _ in range(3):
+                shell.onecmd('type normal')
+            save.assert_not_called()
+            time.sleep(0.3)
+            assert save.call_count == 1
+
+            shell.onecmd('type normal')
+            shell.onecmd('save')
+            assert save.call_count == 2
+            shell.onecmd('type normal')
+            shell.postloop()  # leaving the shell
+            assert save.call_count == 3
+            time.sleep(0.3)
+            assert save.call_count == 3
+
+    def test_002_completion(self):
+        shell = Shell(self.context())
+        shell.names['species'] = ['bulbasaur', 'mr-mime', 'mr-rime']
+        assert shell.completenames('ty') == ['type ']
+        assert shell.completenames('ba') == []
+        assert shell.completedefault('mr', 'species mr', 8, 10) == ['mr-mime', 'mr-rime']
+        assert shell.completedefault('js', 'species --format js', 17, 19) == ['json']
+        assert shell.completedefault('--f', 'type --f', 5, 8) == ['--format']
+        assert shell.completedefault('r', 'team --id r', 10, 11) == ['rivals']
+        assert shell.completedefault('x', 'bogus x', 6, 7) == []
+        assert shell.complete_help('sp', 'help sp', 5, 7) == ['species']
+        with patch.object(cli, 'types_argument_type', cli.TabCompleteChoice(['normal', 'grass'])):
+            assert shell.completedefault('', 'type ', 5, 5) == ['grass', 'normal']
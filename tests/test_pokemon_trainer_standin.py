@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for the PokeAPI stand-in in tests/helpers/standin.py."""
+
+import json
+import os
+import tempfile
+import time
+import unittest
+from urllib.error import HTTPError
+from urllib.request import urlopen
+
+from tests.helpers.standin import DirectoryCorpus, Faults, MappedCorpus, PokeApiStandIn, resource_key
+
+
+def get(url):
+    """:return: (status, headers, parsed json body)"""
+    try:
+        with urlopen(url, timeout=10) as response:
+            return response.status, response.headers, json.loads(response.read().decode('utf8'))
+    except HTTPError as e:
+        return e.code, e.headers, json.loads(e.read().decode('utf8'))
+
+
+class TestPokeApiStandIn(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_000_resource_key(self):
+        assert resource_key('/api/v2/pokemon/bulbasaur/') == 'pokemon/bulbasaur'
+        assert resource_key('/api/v2/pokemon/?limit=964') == 'pokemon/?limit=964'
+        assert resource_key('/api/v2/type') == 'type'
+
+    def test_001_serves_mapped_corpus(self):
+        with PokeApiStandIn() as stand_in:
+            status, _, body = get(stand_in.base_url + '/pokemon/bulbasaur/')
+            missing, _, _ = get(stand_in.base_url + '/pokemon/missingno/')
+        assert status == 200
+        assert body['name'] == 'bulbasaur'
+        assert missing == 404
+        assert stand_in.requests == ['pokemon/bulbasaur', 'pokemon/missingno']
+        assert stand_in.statuses == {200: 1, 404: 1}
+
+    def test_002_directory_corpus(self):
+        corpus = DirectoryCorpus(os.path.join(self.directory.name, 'corpus'))
+        assert corpus.get('pokemon/?limit=964') is None
+        assert corpus.keys() == []
+        corpus.put('pokemon/?limit=964', b'{"count": 964}')
+        corpus.put('type/grass', b'{"name": "grass"}')
+        assert corpus.get('pokemon/?limit=964') == b'{"count": 964}'
+        assert corpus.keys() == ['pokemon/?limit=964', 'type/grass']
+
+    def test_003_mapped_corpus_read_only(self):
+        with self.assertRaises(ValueError):
+            MappedCorpus().put('type/fire', b'{}')
+
+    def test_004_record_mode(self):
+        corpus = DirectoryCorpus(os.path.join(self.directory.name, 'corpus'))
+        with PokeApiStandIn() as upstream:
+            with PokeApiStandIn(corpus=corpus, upstream=upstream.base_url) as recorder:
+                first, _, body = get(recorder.base_url + '/type/grass/')
+                again, _, _ = get(recorder.base_url + '/type/grass/')
+                missing, _, _ = get(recorder.base_url + '/type/fire/')
+        assert (first, again, missing) == (200, 200, 404)
+        assert body['name'] == 'grass'
+        assert recorder.recorded == ['type/grass']
+        assert upstream.requests == ['type/grass', 'type/fire']
+        assert corpus.keys() == ['type/grass']
+
+        with PokeApiStandIn(corpus=corpus) as replay:
+            status, _, body = get(replay.base_url + '/type/grass/')
+        assert status == 200
+        assert body['name'] == 'grass'
+
+    def test_005_latency(self):
+        with PokeApiStandIn(faults=Faults(latency=0.1, jitter=0.05, seed=1)) as stand_in:
+            started = time.perf_counter()
+            status, _, _ = get(stand_in.base_url + '/type/grass/')
+            elapsed = time.perf_counter() - started
+        assert status == 200
+        assert elapsed >= 0.1
+
+    def test_006_throttle(self):
+        with PokeApiStandIn(faults=Faults(throttle_rate=1.0, retry_after=3)) as stand_in:
+            status, headers, body = get(stand_in.base_url + '/type/grass/')
+        assert status == 429
+        assert headers['Retry-After'] == '3'
+        assert 'throttled' in body['detail']
+
+    def test_007_errors(self):
+        with PokeApiStandIn(faults=Faults(error_rate=1.0, error_statuses=[502])) as stand_in:
+            status, _, _ = get(stand_in.base_url + '/type/grass/')
+        assert status == 502
+
+    def test_008_sequence(self):
+        with PokeApiStandIn(faults=Faults(sequence=[429, 503])) as stand_in:
+            statuses = [get(stand_in.base_url + '/type/grass/')[0] for _ in range(3)]
+        assert statuses == [429, 503, 200]
+        assert stand_in.statuses == {429: 1, 503: 1, 200: 1}
+
+    def test_009_seeded_faults_repeat(self):
+        def statuses(seed):
+            faults = Faults(throttle_rate=0.3, error_rate=0.3, seed=seed)
+            return [faults.status() for _ in range(50)]
+        assert statuses(7) == statuses(7)
+        assert set(statuses(7)) > {None}
+
+    def test_010_invalid_rate(self):
+        with self.assertRaises(ValueError):
+            Faults(error_rate=1.5)
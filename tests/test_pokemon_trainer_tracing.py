@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `pokemon_trainer.tracing`."""
+
+import json
+import os
+import tempfile
+import unittest
+
+from pokemon_trainer import tracing
+
+
+@tracing.traced('search', 'id_or_name')
+def search(id_or_name, fail=False):
+    with tracing.span('fetch', id_or_name=id_or_name):
+        if fail:
+            raise ValueError('Unknown %s' % id_or_name)
+    return id_or_name
+
+
+class TestPokemonTrainerTracing(unittest.TestCase):
+
+    def tearDown(self):
+        tracing.stop()
+
+    def test_000_span_noop_when_inactive(self):
+        assert tracing.span('fetch') is tracing.span('render', id_or_name=1)
+        assert search('bulbasaur') == 'bulbasaur'
+
+    def test_001_nested_spans(self):
+        tracer = tracing.start()
+        search('bulbasaur')
+        tracing.stop()
+
+        events = tracer.to_dict()['traceEvents']
+        assert [e['name'] for e in events] == ['search', 'fetch']
+        outer, inner = events
+        assert outer['args'] == {'id_or_name': 'bulbasaur'}
+        assert outer['ph'] == 'X' and inner['ph'] == 'X'
+        assert outer['ts'] <= inner['ts']
+        assert inner['ts'] + inner['dur'] <= outer['ts'] + outer['dur']
+
+    def test_002_span_records_errors(self):
+        tracer = tracing.start()
+        with self.assertRaises(ValueError):
+            search('missingno', fail=True)
+        tracing.stop()
+        errors = [e['args']['error'] for e in tracer.events]
+        assert errors == ['ValueError: Unknown missingno', 'ValueError: Unknown missingno']
+
+    def test_003_summary_counts_repeats(self):
+        tracer = tracing.start()
+        for name in ['bulbasaur', 'grass', 'bulbasaur', 'bulbasaur']:
+            search(name)
+        tracing.stop()
+        lines = {line.split()[0]: line.split()[1:] for line in tracer.summary().splitlines()[1:]}
+        assert lines['search'][0] == '4'
+        assert lines['search'][2] == '2'
+        assert lines['fetch'][2] == '2'
+
+    def test_004_write(self):
+        tracer = tracing.start()
+        search('bulbasaur')
+        tracing.stop()
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, 'trace.json')
+            tracer.write(filename)
+            with open(filename) as f:
+                document = json.load(f)
+        assert len(document['traceEvents']) == 2
+        assert document['displayTimeUnit'] == 'ms'
+
+    def test_005_only_one_tracer(self):
+        tracing.start()
+        with self.assertRaises(ValueError):
+            tracing.start()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `pokemon_trainer.watch`."""
+
+import copy
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import yaml
+from click.testing import CliRunner
+
+from pokemon_trainer import cli
+from pokemon_trainer.pokemon.pokedex import Pokemon, Species, StatSet
+from pokemon_trainer.pokemon.teams import Roster, Team
+from pokemon_trainer.pokemon.types import Type
+from pokemon_trainer.watch import IncrementalReport, RosterWatcher
+
+SPECIES = {
+    1: Species(1, 'bulbasaur', types=[Type(12, 'grass')]),
+    4: Species(4, 'charmander', types=[Type(10, 'fire')]),
+    7: Species(7, 'squirtle', types=[Type(11, 'water')]),
+}
+
+
+def roster_data():
+    pokemon = [Pokemon(i, SPECIES[species], evs=StatSet(), stats=StatSet()) for i, species in [(1, 1), (2, 4), (3, 7)]]
+    teams = [Team(1, 'grass', first=pokemon[0]), Team(2, 'others', first=pokemon[1], second=pokemon[2])]
+    return Roster(pokemon, teams, active_team_id=1).to_dict()
+
+
+class TestPokemonTrainerWatch(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.directory.name, 'roster.yml')
+        self.search = patch.object(Species, 'search', side_effect=lambda id_or_name: SPECIES[int(id_or_name)])
+        self.searched = self.search.start()
+        self.rendered = []
+
+    def tearDown(self):
+        self.search.stop()
+        self.directory.cleanup()
+
+    def render(self, team):
+        self.rendered.append(team.name)
+        return str(team)
+
+    def test_000_only_changes_are_rebuilt(self):
+        report = IncrementalReport(render=self.render)
+        data = roster_data()
+        assert report.update(copy.deepcopy(data)) == {1, 2}
+        assert self.searched.call_count == 3
+        assert 'bulbasaur' in report.report(report.find_team())
+        assert 'squirtle' in report.report(report.find_team('others'))
+        assert report.report(1) == report.report(1)
+        assert self.rendered == ['grass', 'others']
+
+        data = roster_data()
+        data['pokemon'][2]['nick_name'] = 'shelly'
+        assert report.update(copy.deepcopy(data)) == {2}
+        assert self.searched.call_count == 4
+        assert 'shelly' in report.report(2)
+        report.report(1)
+        assert self.rendered == ['grass', 'others', 'others']
+
+        data['teams'][0]['name'] = 'leafy'
+        data['active_team'] = 2
+        assert report.update(copy.deepcopy(data)) == {1}
+        assert self.searched.call_count == 4
+        assert report.find_team() == 2
+        assert report.find_team('leafy') == 1
+
+        del data['teams'][1]
+        assert report.update(copy.deepcopy(data)) == {2}
+        with self.assertRaises(ValueError):
+            report.report(2)
+        assert report.update(None) == {1}
+        with self.assertRaises(ValueError):
+            report.find_team()
+
+    def test_001_watcher_polls_the_file(self):
+        watcher = RosterWatcher(self.filename, IncrementalReport(render=self.render))
+        assert watcher.poll() == set()  # no file yet
+        assert watcher.poll() is None
+        data = roster_data()
+        with open(self.filename, 'w') as f:
+            yaml.dump(data, f)
+        assert watcher.poll() == {1, 2}
+        assert watcher.poll() is None
+
+        data['pokemon'][0]['item'] = 'miracle-seed'
+        with open(self.filename, 'w') as f:
+            yaml.dump(data, f)
+        os.utime(self.filename, ns=(0, os.stat(self.filename).st_mtime_ns + 10 ** 9))
+        assert watcher.poll() == {1}
+
+        changes, errors = [], []
+        with open(self.filename, 'w') as f:
+            f.write('pokemon: [')  # half written
+        watcher.watch(changes.append, errors.append, interval=0, polls=2)
+        assert changes == []
+        assert len(errors) == 1
+
+    def test_002_cli_watch(self):
+        with open(self.filename, 'w') as f:
+            yaml.dump(roster_data(), f)
+        with patch('time.sleep', side_effect=KeyboardInterrupt) as sleep:
+            result = CliRunner().invoke(cli.main, ['--no-daemon', '-f', self.filename, 'team', '--watch',
+                                                   '--id', 'others', '--interval', '5'])
+        assert result.exit_code == 0, result.output
+        assert 'Team - others' in result.output
+        assert 'Watching {}'.format(self.filename) in result.output
+        sleep.assert_called_once_with(5.0)
@@ -0,0 +1,177 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `pokemon_trainer.pokemon.util`."""
+
+import copy
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from pokemon_trainer.pokemon.moves import DamageClass, FrozenMove, Move, MoveSet
+from pokemon_trainer.pokemon.pokedex import FrozenSpecies, FrozenStatSet, Pokemon, Species, StatSet
+from pokemon_trainer.pokemon.teams import Roster, Team
+from pokemon_trainer.pokemon.types import DamageRelation, FrozenType, Type, TypeCoverage
+from pokemon_trainer.pokemon.versions import Generation
+
+
+def make_pokemon(id=1, nick_name=None):
+    grass = Type(12, 'grass')
+    vine_whip = Move(22, 'vine-whip', DamageClass.physical, grass, Generation.generation_i)
+    return Pokemon(id, Species(1, 'bulbasaur', types=[grass], evs=StatSet(special_attack=1)), nick_name=nick_name,
+                   evs=StatSet(hp=4), move_set=MoveSet(vine_whip))
+
+
+class TestPokemonFingerprinted(unittest.TestCase):
+
+    def test_000_equal_content_is_equal(self):
+        for make in [lambda: Type(12, 'grass'), lambda: make_pokemon().species, lambda: make_pokemon().move_set,
+                     lambda: make_pokemon().move_set.first, make_pokemon,
+                     lambda: Team(1, 'starters', first=make_pokemon()),
+                     lambda: Roster([make_pokemon()], [Team(1, 'starters')], active_team_id=1)]:
+            a, b = make(), make()
+            assert a == b, a
+            assert hash(a) == hash(b), a
+            assert a.fingerprint() == b.fingerprint()
+            assert len(set([a, b])) == 1
+        assert Type(12, 'grass') != Type(12, 'leaf')
+        assert make_pokemon() != make_pokemon(id=2)
+        assert make_pokemon() != make_pokemon().species
+        assert Species(1, 'bulbasaur').__hash__ is not None  # used to fail looking for Species.to_dict
+
+    def test_001_mutations_change_the_fingerprint(self):
+        a, b = make_pokemon(), make_pokemon()
+        hash(a)
+        a.nick_name = 'bulby'
+        assert a != b
+        a.nick_name = None
+        assert a == b and hash(a) == hash(b)
+
+        a.evs.hp = 8  # in place, not through an attribute of the Pokemon
+        assert a != b
+        a.evs.hp = 4
+        a.move_set.second = a.move_set.first
+        assert a != b
+        a.move_set.second = None
+        assert a == b
+
+        team, other = Team(1, 'starters', first=a), Team(1, 'starters', first=b)
+        assert team == other
+        team.set_position(2, make_pokemon(id=3))
+        assert team != other
+        roster, other_roster = Roster([a], [team]), Roster([b], [team])
+        assert roster == other_roster
+        a.item = 'miracle-seed'
+        assert roster != other_roster
+
+    def test_002_no_serializing(self):
+        pokemon = [make_pokemon(i) for i in range(6)]
+        with patch.object(Pokemon, 'to_dict', side_effect=AssertionError('serialized')), \
+                patch.object(MoveSet, 'to_dict', side_effect=AssertionError('serialized')), \
+                patch.object(Team, 'to_dict', side_effect=AssertionError('serialized')):
+            assert make_pokemon(5) in pokemon
+            assert len(set(pokemon + [make_pokemon(0)])) == 6
+            assert Team(1, 'a', *pokemon).position_on_team(make_pokemon(4)).value == 5
+
+
+def make_grass():
+    grass = Type(12, 'grass')
+    grass.set_damage_relation(DamageRelation.DOUBLE_DAMAGE_FROM, Type(10, 'fire'))
+    grass.set_damage_relation(DamageRelation.HALF_DAMAGE_FROM, Type(11, 'water'))
+    grass.set_damage_relation(DamageRelation.DOUBLE_DAMAGE_TO, Type(11, 'water'))
+    return grass
+
+
+class TestPokemonFrozen(unittest.TestCase):
+
+    def setUp(self):
+        for searched in [Type, Species, Move]:
+            searched.interned.clear()
+
+    def tearDown(self):
+        for searched in [Type, Species, Move]:
+            searched.interned.clear()
+
+    def test_000_frozen_equals_thawed(self):
+        grass = make_grass()
+        species = Species(1, 'bulbasaur', types=[grass], evs=StatSet(special_attack=1))
+        move = Move(22, 'vine-whip', DamageClass.physical, grass, Generation.generation_i, power=45)
+        for thawed, frozen_class in [(grass, FrozenType), (species, FrozenSpecies), (move, FrozenMove)]:
+            frozen = thawed.freeze()
+            assert type(frozen) is frozen_class
+            assert frozen == thawed and thawed == frozen
+            assert hash(frozen) == hash(thawed)
+            assert frozen.freeze() is frozen
+            assert copy.deepcopy(frozen) is frozen
+            assert frozen.effective_coverage() == thawed.effective_coverage()
+        frozen = species.freeze()
+        assert type(frozen.types) is tuple and type(frozen.types[0]) is FrozenType
+        assert frozen.evs == species.evs and type(frozen.evs) is FrozenStatSet
+        assert frozen.weak_to_types() == species.weak_to_types() == [Type(10, 'fire')]
+        assert frozen.describe() == species.describe()
+        assert move.freeze().power == 45
+
+    def test_001_read_only(self):
+        species = Species(1, 'bulbasaur', types=[make_grass()]).freeze()
+        for change in [lambda: setattr(species, 'name', 'ivysaur'), lambda: delattr(species, 'name'),
+                       lambda: setattr(species, 'nick_name', 'bulby'), lambda: setattr(species.evs, 'hp', 1),
+                       lambda: species.types[0].set_damage_relation(DamageRelation.NO_DAMAGE_TO, Type(1, 'normal'))]:
+            self.assertRaises(AttributeError, change)
+        evs = species.evs
+        evs += StatSet(hp=1)
+        assert evs.hp == 1 and species.evs.hp == 0
+
+        # what is returned is a copy, changing it doesn't change the species
+        coverage = species.type_coverage()
+        coverage[DamageRelation.NO_DAMAGE_TO].append(Type(1, 'normal'))
+        species.effective_coverage()[DamageRelation.DOUBLE_DAMAGE_FROM].clear()
+        assert species.type_coverage()[DamageRelation.NO_DAMAGE_TO] == []
+        assert species.effective_coverage()[DamageRelation.DOUBLE_DAMAGE_FROM] == [Type(10, 'fire')]
+
+    def test_002_memoized_coverage(self):
+        grass = make_grass().freeze()
+        species = FrozenSpecies(1, 'bulbasaur', types=[grass])
+        move = FrozenMove(22, 'vine-whip', DamageClass.physical, grass, Generation.generation_i)
+        effective_coverage = TypeCoverage.effective_coverage
+        with patch.object(TypeCoverage, 'effective_coverage', autospec=True,
+                          side_effect=effective_coverage) as computed:
+            for _ in range(3):
+                species.describe()
+                species.is_weak_to(Type(10, 'fire'))
+                move.describe()
+                grass.effective_coverage()
+            assert computed.call_count == 2  # the species', and its type's shared with the move
+
+    def test_003_searches_return_frozen(self):
+        fire = {'name': 'fire', 'url': 'https://pokeapi.co/api/v2/type/10/'}
+        damage_relations = SimpleNamespace(double_damage_from=[fire])
+        found = SimpleNamespace(id=12, name='grass', damage_relations=damage_relations)
+        with patch('pokemon_trainer.pokemon.types.pb.type_', return_value=found):
+            grass = Type.search('grass')
+        assert type(grass) is FrozenType
+        assert grass == Type(12, 'grass')
+        assert grass.type_coverage()[DamageRelation.DOUBLE_DAMAGE_FROM] == [Type(10, 'fire')]
+
+    def test_004_searches_are_interned(self):
+        fire = {'name': 'fire', 'url': 'https://pokeapi.co/api/v2/type/10/'}
+        grass = SimpleNamespace(id=12, name='grass', damage_relations=SimpleNamespace(double_damage_from=[fire]))
+        stats = [SimpleNamespace(stat=SimpleNamespace(name='special-attack'), effort=1)]
+        bulbasaur = SimpleNamespace(id=1, name='bulbasaur', stats=stats,
+                                    types=[SimpleNamespace(type=SimpleNamespace(name='grass'))])
+        effective_coverage = TypeCoverage.effective_coverage
+        with patch('pokemon_trainer.pokemon.types.pb.type_', return_value=grass) as type_, \
+                patch('pokemon_trainer.pokemon.pokedex.pb.pokemon', return_value=bulbasaur) as pokemon, \
+                patch.object(TypeCoverage, 'effective_coverage', autospec=True,
+                             side_effect=effective_coverage) as computed:
+            species = Species.search('bulbasaur')
+            assert Species.search('bulbasaur') is species
+            assert Species.search(1) is species
+            for id in [1, 2]:
+                assert Pokemon.from_dict({'id': id, 'species': 'bulbasaur', 'evs': {}, 'stats': {}}).species is species
+            for _ in range(3):
+                Species.search('bulbasaur').effective_coverage()
+            assert Type.search(12) is species.types[0]
+        assert pokemon.call_count == 1
+        assert type_.call_count == 1
+        assert computed.call_count == 1
+        assert len(Species.interned) == 1